@@ -1,23 +1,30 @@
+import time
+_STARTED = time.perf_counter() # For --startup-benchmark, before the other imports
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, Listbox, Scrollbar
-import requests
 import json
-from datetime import datetime
-import time
 import configparser
 import os
 import sys
-from base64 import urlsafe_b64encode, urlsafe_b64decode
 import glob # Import for finding files easily
 import threading # Import the threading module
-
-# API Constants
-API_BASE_URL = "https://retroachievements.org/API/"
-API_USER_PROFILE_URL = API_BASE_URL + "API_GetUserProfile.php"
-API_CONSOLE_IDS_URL = API_BASE_URL + "API_GetConsoleIDs.php"
-API_GAME_LIST_URL = API_BASE_URL + "API_GetGameList.php"
-API_GET_GAME_HASHES_URL = API_BASE_URL + "API_GetGameHashes.php"
-API_GET_GAME_EXTENDED_URL = API_BASE_URL + "API_GetGameExtended.php"
+from concurrent.futures import ThreadPoolExecutor
+
+from ra_api import (API_USER_PROFILE_URL, API_CONSOLE_IDS_URL, API_GAME_LIST_URL,
+                    ApiClient, ApiHttpClient, ApiRequestCancelled, ApiRequestError, RateLimiter)
+from ra_config import (DEFAULT_API_CACHE_TTLS, DEFAULT_BATOCERA_BASE_PATH, DEFAULT_CACHE_BACKEND,
+                       DEFAULT_FETCH_MAX_WORKERS, DEFAULT_HTTP_POOL_SIZE, DEFAULT_REQUESTS_PER_SECOND,
+                       DEFAULT_RETROPIE_BASE_PATH, decode_secret, encode_secret, read_settings)
+from ra_cache import CacheFormatError, open_cache_store
+from ra_export import (CollectionSink, DatSink, ExportCancelled, ExportPlan, configure_console_names,
+                       filter_games_with_achievements, get_collection_filename, get_dat_filename, get_system_short_name,
+                       get_typical_extension, write_collection_file, write_dat_file)
+from ra_fetch import BatchFetchPipeline, ConsoleFetchJob, GameFetchEngine, load_console_job
+from ra_http_cache import ApiResponseCache
+from ra_i18n import MessageCatalog, load_catalog, read_language_name
+from ra_index import HashIndex
+from ra_progress import PROGRESS_TICK_MS, ProgressChannel
+from ra_telemetry import RequestTelemetry, format_summary
 
 class RetroAchievementsDATGenerator:
     def __init__(self, master):
@@ -34,10 +41,9 @@ class RetroAchievementsDATGenerator:
         # Language directory
         self.lang_dir = os.path.join(self.script_dir, "lang")
 
-        # Create cache directory if it doesn't exist
-        os.makedirs(self.cache_dir, exist_ok=True)
-        # Ensure language directory exists (optional, but good practice)
-        os.makedirs(self.lang_dir, exist_ok=True)
+        # Created in load_config, the backend is a settings.ini option.
+        # The cache directory is created by the cache store when it first writes.
+        self.cache_store = None
 
 
         # --- Initialize ALL Tkinter variables FIRST ---
@@ -51,9 +57,9 @@ class RetroAchievementsDATGenerator:
         # PATHS
         self.dat_save_path = tk.StringVar(value=self.script_dir)
         self.collection_cfg_save_path = tk.StringVar(value=self.script_dir)
-        self.retropie_base_path = tk.StringVar(value="/home/pi/RetroPie/roms")
+        self.retropie_base_path = tk.StringVar(value=DEFAULT_RETROPIE_BASE_PATH)
         # Add Batocera base path variable
-        self.batocera_base_path = tk.StringVar(value="/userdata/roms") # Common Batocera path
+        self.batocera_base_path = tk.StringVar(value=DEFAULT_BATOCERA_BASE_PATH) # Common Batocera path
 
 
         # OPTIONS
@@ -62,10 +68,21 @@ class RetroAchievementsDATGenerator:
         self.rom_extension_var = tk.StringVar(value=".zip")
         self.include_achievements_var = tk.BooleanVar(value=True)
         self.include_patch_urls_var = tk.BooleanVar(value=True)
+        # Refresh an existing cache file by only fetching new/changed games
+        self.incremental_refresh_var = tk.BooleanVar(value=False)
 
         # Language variable (initialized here with default 'en')
         self.selected_language_code_var = tk.StringVar(value='en')
 
+        # FETCH tuning (no UI, only configurable in settings.ini)
+        self.fetch_max_workers = DEFAULT_FETCH_MAX_WORKERS
+        self.api_requests_per_second = DEFAULT_REQUESTS_PER_SECOND
+        self.http_pool_size = DEFAULT_HTTP_POOL_SIZE
+        # CACHE (no UI, only configurable in settings.ini)
+        self.cache_backend = DEFAULT_CACHE_BACKEND
+        # API_CACHE: seconds per endpoint (no UI, only configurable in settings.ini)
+        self.api_cache_ttls = dict(DEFAULT_API_CACHE_TTLS)
+
         # Other internal variables
         self.status_bar_text_var = tk.StringVar(value="") # Will be set by localization
         self.status_bar = None # Will be initialized in setup_ui
@@ -80,6 +97,13 @@ class RetroAchievementsDATGenerator:
 
         # Variable to hold the fetch worker thread
         self._fetch_worker_thread = None
+        # Shared single worker for the DAT/collection exports, created on first use
+        self._export_executor = None
+        self._export_future = None
+        self._export_cancel_event = threading.Event()
+        self._cancel_fetch_flag = False
+        # ProgressChannel of the running fetch/export, the API status of worker threads goes there too
+        self._progress_channel = None
 
 
         # Map to store console ID to Name mapping (populated after login/load_consoles)
@@ -89,6 +113,8 @@ class RetroAchievementsDATGenerator:
 
         # In-memory cache for fetched game data
         self.cached_data = {}
+        # Global MD5 index over all cached consoles, created on first lookup
+        self.hash_index = None
         # --- End Initialize ALL Tkinter variables ---
 
 
@@ -113,6 +139,18 @@ class RetroAchievementsDATGenerator:
         self.load_language(saved_lang_code)
         # --- End Language Initialization ---
 
+        # Shared limiter for every API request, including the fetch worker pool
+        self.rate_limiter = RateLimiter(self.api_requests_per_second)
+        # One pooled keep-alive session for all requests, closed in on_close
+        self.http_client = ApiHttpClient(self.http_pool_size)
+        # One JSON line per API call in logs/api_requests.jsonl, summarised after each fetch
+        self.telemetry = RequestTelemetry(os.path.join(self.script_dir, "logs"))
+        # Console and game lists are reused across sessions instead of being downloaded on every login/fetch
+        self.response_cache = ApiResponseCache(self.cache_dir, self.api_cache_ttls)
+        self.api_client = ApiClient(self.http_client, self.rate_limiter, telemetry=self.telemetry,
+                                    response_cache=self.response_cache)
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
+
 
         # Setup UI
         self.setup_ui()
@@ -130,19 +168,7 @@ class RetroAchievementsDATGenerator:
 
     def translate(self, key, *args):
         """Looks up a translation key and formats it with args."""
-        translation = self.translations.get(key, f"MISSING_TRANSLATION:{key}")
-        try:
-            # Apply arguments if any
-            if args:
-                 # Use %s formatting for simplicity with configparser values
-                 # Note: configparser reads values as strings, so formatting with %s is generally safe
-                 # For numbers (like %d, %.2f), the translation string must contain the correct format specifier
-                 return translation % args
-            return translation
-        except (TypeError, ValueError) as e:
-            # Handle cases where formatting fails (e.g., wrong number/type of args)
-            print(f"Warning: Failed to format translation for key '{key}' with args {args}. Translation: '{translation}'. Error: {e}")
-            return translation # Return the raw translation string
+        return self.message_catalog.format(key, *args)
 
 
     def find_available_languages(self):
@@ -164,14 +190,9 @@ class RetroAchievementsDATGenerator:
             lang_files = glob.glob(os.path.join(self.lang_dir, "*.ini"))
             for lang_file in lang_files:
                 lang_code = os.path.splitext(os.path.basename(lang_file))[0].lower()
-                # Read the language name from the file itself if available
-                lang_config = configparser.ConfigParser()
+                # Only the [Language] header is read here, the chosen file is loaded by load_language
                 try:
-                    # Use read(filename, encoding) for better compatibility
-                    with open(lang_file, 'r', encoding='utf-8') as f:
-                         lang_config.read_file(f)
-                    # Get language name from [Language] section
-                    lang_name = lang_config.get('Language', 'name', fallback=lang_code) # Section [Language], key 'name'
+                    lang_name = read_language_name(lang_file) or lang_code
                     self.available_languages[lang_code] = lang_name
                 except Exception as e:
                     print(f"Warning: Could not read language name from {lang_file}: {e}")
@@ -194,52 +215,27 @@ class RetroAchievementsDATGenerator:
 
     def load_language(self, lang_code):
         """Loads translations from the specified language code's INI file."""
-        lang_file = os.path.join(self.lang_dir, f"{lang_code}.ini")
-        new_translations = {}
-        success = False
-
-        # Try loading the specified language
-        if os.path.exists(lang_file):
-            lang_config = configparser.ConfigParser()
-            try:
-                 with open(lang_file, 'r', encoding='utf-8') as f:
-                    lang_config.read_file(f)
-                 if 'Translations' in lang_config:
-                    new_translations = dict(lang_config['Translations'])
-                    self.translations = new_translations # Update the main translations dictionary
-                    # self.selected_language_code_var.set(lang_code) # Variable is already set before calling this
-                    success = True
-                    print(f"DEBUG: Successfully loaded language: {lang_code}")
-                 else:
-                     print(f"Warning: '{lang_file}' is missing the '[Translations]' section.")
-            except Exception as e:
-                 print(f"Error reading language file '{lang_file}': {e}")
+        # Try loading the specified language (compiled catalogue from the cache if the ini is unchanged)
+        new_catalog = load_catalog(self.lang_dir, lang_code, self.cache_dir)
+        success = new_catalog is not None
+        if success:
+            self.message_catalog = new_catalog
+            print(f"DEBUG: Successfully loaded language: {lang_code}")
 
         # If loading the specified language failed AND it wasn't already 'en', try the default ('en')
         if not success and lang_code != 'en':
             print(f"Warning: Failed to load language '{lang_code}'. Attempting to load default 'en'.")
-            default_lang_file = os.path.join(self.lang_dir, "en.ini")
-            if os.path.exists(default_lang_file):
-                 default_lang_config = configparser.ConfigParser()
-                 try:
-                      with open(default_lang_file, 'r', encoding='utf-8') as f:
-                        default_lang_config.read_file(f)
-                      if 'Translations' in default_lang_config:
-                         self.translations = dict(default_lang_config['Translations'])
-                         self.selected_language_code_var.set('en') # Set variable to default on success
-                         success = True
-                         print("DEBUG: Successfully loaded default language: en")
-                      else:
-                          print(f"Warning: '{default_lang_file}' is missing the '[Translations]' section.")
-                 except Exception as e:
-                     print(f"Error reading default language file '{default_lang_file}': {e}")
-            else:
-                 print(f"Warning: Default language file 'en.ini' not found.")
+            default_catalog = load_catalog(self.lang_dir, 'en', self.cache_dir)
+            if default_catalog is not None:
+                self.message_catalog = default_catalog
+                self.selected_language_code_var.set('en') # Set variable to default on success
+                success = True
+                print("DEBUG: Successfully loaded default language: en")
 
         # If both fail, use empty translations (will show keys)
         if not success:
              print("Error: Could not load any language file. Using empty translations.")
-             self.translations = {}
+             self.message_catalog = MessageCatalog({})
              self.selected_language_code_var.set('en') # Still set to 'en' logically as fallback
 
 
@@ -295,9 +291,13 @@ class RetroAchievementsDATGenerator:
              self.include_achievements_cb.config(text=self.translate("include_achievements_checkbox"))
         if hasattr(self, 'include_patch_urls_cb'):
              self.include_patch_urls_cb.config(text=self.translate("include_patch_urls_checkbox"))
+        if hasattr(self, 'incremental_refresh_cb'):
+             self.incremental_refresh_cb.config(text=self.translate("incremental_refresh_checkbox"))
 
         if hasattr(self, 'fetch_data_button'):
             self.fetch_data_button.config(text=self.translate("fetch_data_button"))
+        if hasattr(self, 'fetch_all_button'):
+            self.fetch_all_button.config(text=self.translate("fetch_all_button"))
 
 
         # DAT Creation Frame
@@ -343,6 +343,8 @@ class RetroAchievementsDATGenerator:
             self.create_retropie_collection_button.config(text=self.translate("create_retropie_collection_button")) # Updated translation key
         if hasattr(self, 'create_batocera_collection_button'):
             self.create_batocera_collection_button.config(text=self.translate("create_batocera_collection_button")) # New translation key
+        if hasattr(self, 'create_all_button'):
+            self.create_all_button.config(text=self.translate("create_all_button"))
 
         # NEW: About Button update
         if hasattr(self, 'about_button'): # Ensure the button exists before trying to update it
@@ -410,45 +412,15 @@ class RetroAchievementsDATGenerator:
         if hasattr(self, '_cache_manager_popup') and self._cache_manager_popup and tk.Toplevel.winfo_exists(self._cache_manager_popup):
              self._cache_manager_popup.title(self.translate("cache_dialog_title"))
              # Assuming labels within the cache manager have attributes
-             if hasattr(self, 'cache_count_label') and hasattr(self, '_cache_file_paths'):
-                 self.cache_count_label.config(text=self.translate("cache_file_count_label", len(self._cache_file_paths)))
-             if hasattr(self, 'cache_size_label') and hasattr(self, 'total_size_mb_cache_dialog'): # Assuming you store total size
-                 # Re-calculate total size if needed or store it
-                 cache_files_recheck = glob.glob(os.path.join(self.cache_dir, "console_*.json"))
-                 total_size_mb_recheck = sum(os.path.getsize(f) for f in cache_files_recheck if os.path.isfile(f)) / (1024 * 1024)
-                 self.cache_size_label.config(text=self.translate("cache_total_size_label", total_size_mb_recheck))
              if hasattr(self, 'cache_listbox'):
-                 # Rebuild listbox content display strings
-                 cache_info_list_recheck = []
-                 cache_files_recheck = glob.glob(os.path.join(self.cache_dir, "console_*.json"))
-                 if os.path.isdir(self.cache_dir):
-                    for file_path in cache_files_recheck:
-                         if os.path.isfile(file_path):
-                            filename = os.path.basename(file_path)
-                            try:
-                                file_size_bytes = os.path.getsize(file_path)
-                                file_size_mb = file_size_bytes / (1024 * 1024)
-                                console_id = filename.replace("console_", "").replace(".json", "")
-                                console_id_str = str(console_id) if console_id else None
-                                console_name = self.console_id_to_name_map.get(console_id_str, f"ID {console_id if console_id else 'N/A'}")
-                                display_text = f"{console_name} ({filename} - {file_size_mb:.2f} MB)"
-                                cache_info_list_recheck.append((display_text, file_path))
-                            except Exception as e:
-                                print(self.translate("cache_processing_error_display", filename, e))
-                                try:
-                                    file_size_bytes = os.path.getsize(file_path)
-                                    file_size_mb = file_size_bytes / (1024 * 1024)
-                                    display_text = f"{filename} ({self.translate('cache_size_label', file_size_mb):s})"
-                                    cache_info_list_recheck.append((display_text, file_path))
-                                except:
-                                     display_text = f"{filename} ({self.translate('cache_unknown_size')})"
-                                     cache_info_list_recheck.append((display_text, file_path))
-
-                 cache_info_list_recheck.sort(key=lambda item: item[0])
+                 # Rebuild summary and listbox content display strings
+                 cache_info_list, total_size_mb = self._get_cache_manager_entries()
+                 self.cache_count_label.config(text=self.translate("cache_file_count_label", len(cache_info_list)))
+                 self.cache_size_label.config(text=self.translate("cache_total_size_label", total_size_mb))
                  self.cache_listbox.delete(0, tk.END)
-                 for display_text, _ in cache_info_list_recheck:
+                 for display_text, _ in cache_info_list:
                      self.cache_listbox.insert(tk.END, display_text)
-                 self._cache_file_paths = [file_path for _, file_path in cache_info_list_recheck]
+                 self._cache_console_ids = [console_id for _, console_id in cache_info_list]
 
              # Update buttons within the cache dialog if you stored references to them
              if hasattr(self, 'cache_select_all_cb'): # Example, assuming you store the checkbox
@@ -482,20 +454,28 @@ class RetroAchievementsDATGenerator:
             self.config['PATHS'] = {
                 'dat_save_path': self.script_dir,
                 'collection_cfg_save_path': self.script_dir,
-                'retropie_base_path': "/home/pi/RetroPie/roms",
-                'batocera_base_path': "/userdata/roms" # Add default Batocera path
+                'retropie_base_path': DEFAULT_RETROPIE_BASE_PATH,
+                'batocera_base_path': DEFAULT_BATOCERA_BASE_PATH # Add default Batocera path
             }
             self.config['OPTIONS'] = {
                 # OLD: 'roms_are_zipped': 'no',
                 # NEW: Default rom extension
                 'rom_extension': '.zip',
                 'include_achievements': 'yes',
-                'include_patch_urls': 'yes'
+                'include_patch_urls': 'yes',
+                'incremental_refresh': 'no'
             }
             # Add SETTINGS section for language
             self.config['SETTINGS'] = {
                  'language': 'en' # Default language in new config
             }
+            self.config['FETCH'] = {
+                'max_workers': str(self.fetch_max_workers),
+                'requests_per_second': str(self.api_requests_per_second),
+                'http_pool_size': str(self.http_pool_size)
+            }
+            self.config['CACHE'] = {'backend': self.cache_backend}
+            self.config['API_CACHE'] = {endpoint: str(ttl) for endpoint, ttl in self.api_cache_ttls.items()}
             # Save the newly created default config
             # Ensure save_config uses newline='' for INI if needed (not requested, keep as is)
             self.save_config()
@@ -504,29 +484,43 @@ class RetroAchievementsDATGenerator:
             # No need to update other variables from config here, as they already have defaults
 
         # If file exists, read values and update Tkinter variables
-        # Use get() methods with fallbacks to handle missing sections/keys gracefully
+        # read_settings falls back to the defaults for missing sections/keys
+        settings = read_settings(self.config, self.script_dir)
         if 'AUTH' in self.config:
-            self.username.set(self._decrypt(self.config.get('AUTH', 'username', fallback='')))
-            self.api_key.set(self._decrypt(self.config.get('AUTH', 'api_key', fallback='')))
+            self.username.set(settings['username'])
+            self.api_key.set(settings['api_key'])
 
         if 'PATHS' in self.config:
-            self.dat_save_path.set(os.path.normpath(self.config.get('PATHS', 'dat_save_path', fallback=self.script_dir)))
-            self.collection_cfg_save_path.set(os.path.normpath(self.config.get('PATHS', 'collection_cfg_save_path', fallback=self.script_dir)))
-            self.retropie_base_path.set(os.path.normpath(self.config.get('PATHS', 'retropie_base_path', fallback="/home/pi/RetroPie/roms")))
+            self.dat_save_path.set(settings['dat_save_path'])
+            self.collection_cfg_save_path.set(settings['collection_cfg_save_path'])
+            self.retropie_base_path.set(settings['retropie_base_path'])
             # Load Batocera base path
-            self.batocera_base_path.set(os.path.normpath(self.config.get('PATHS', 'batocera_base_path', fallback="/userdata/roms")))
+            self.batocera_base_path.set(settings['batocera_base_path'])
 
         if 'OPTIONS' in self.config:
-            # OLD: self.roms_are_zipped_var.set(self.config.getboolean('OPTIONS', 'roms_are_zipped', fallback=False))
-            # NEW: Load rom extension
-            self.rom_extension_var.set(self.config.get('OPTIONS', 'rom_extension', fallback='.zip').strip())
-            self.include_achievements_var.set(self.config.getboolean('OPTIONS', 'include_achievements', fallback=True))
-            self.include_patch_urls_var.set(self.config.getboolean('OPTIONS', 'include_patch_urls', fallback=True))
+            self.rom_extension_var.set(settings['rom_extension'])
+            self.include_achievements_var.set(settings['include_achievements'])
+            self.include_patch_urls_var.set(settings['include_patch_urls'])
+            self.incremental_refresh_var.set(settings['incremental_refresh'])
+
+        if 'FETCH' in self.config:
+            self.fetch_max_workers = settings['max_workers']
+            self.api_requests_per_second = settings['requests_per_second']
+            self.http_pool_size = settings['http_pool_size']
+
+        if 'CACHE' in self.config:
+            self.cache_backend = settings['cache_backend']
+        if 'API_CACHE' in self.config:
+            self.api_cache_ttls = settings['api_cache_ttls']
+        # [SYSTEM_NAMES]/[SYSTEM_EXTENSIONS] have no UI, the sections are kept as they are when saving
+        configure_console_names(settings['system_short_names'], settings['typical_extensions'])
+        if self.cache_store is None:
+            self.cache_store = open_cache_store(self.cache_dir, self.cache_backend)
 
         # Read language setting
         if 'SETTINGS' in self.config:
              # Get the language code, fallback to 'en'
-             saved_lang_code = self.config.get('SETTINGS', 'language', fallback='en').lower()
+             saved_lang_code = settings['language']
              self.selected_language_code_var.set(saved_lang_code)
         else:
              # If SETTINGS section is missing, add it and save, default to 'en'
@@ -543,6 +537,9 @@ class RetroAchievementsDATGenerator:
         if 'PATHS' not in self.config: self.config['PATHS'] = {}
         if 'OPTIONS' not in self.config: self.config['OPTIONS'] = {}
         if 'SETTINGS' not in self.config: self.config['SETTINGS'] = {} # Ensure SETTINGS section exists
+        if 'FETCH' not in self.config: self.config['FETCH'] = {}
+        if 'CACHE' not in self.config: self.config['CACHE'] = {}
+        if 'API_CACHE' not in self.config: self.config['API_CACHE'] = {}
 
         # Update config object from current UI variables
         # These variables are now guaranteed to exist because they are initialized in __init__
@@ -558,6 +555,7 @@ class RetroAchievementsDATGenerator:
 
         self.config['OPTIONS']['include_achievements'] = 'yes' if self.include_achievements_var.get() else 'no'
         self.config['OPTIONS']['include_patch_urls'] = 'yes' if self.include_patch_urls_var.get() else 'no'
+        self.config['OPTIONS']['incremental_refresh'] = 'yes' if self.incremental_refresh_var.get() else 'no'
         # NEW: Save rom extension
         self.config['OPTIONS']['rom_extension'] = self.rom_extension_var.get().strip()
 
@@ -565,6 +563,13 @@ class RetroAchievementsDATGenerator:
         # Save language setting
         self.config['SETTINGS']['language'] = self.selected_language_code_var.get()
 
+        self.config['FETCH']['max_workers'] = str(self.fetch_max_workers)
+        self.config['FETCH']['requests_per_second'] = str(self.api_requests_per_second)
+        self.config['FETCH']['http_pool_size'] = str(self.http_pool_size)
+        self.config['CACHE']['backend'] = self.cache_backend
+        for endpoint, ttl in self.api_cache_ttls.items():
+            self.config['API_CACHE'][endpoint] = str(ttl)
+
 
         try:
             # User requested NOT to change settings.ini line endings, keep as is
@@ -606,75 +611,67 @@ class RetroAchievementsDATGenerator:
 
     def _encrypt(self, text):
         """Simple 'encryption' (obfuscation) for sensitive data"""
-        if not text:
-            return ''
-        try:
-            return urlsafe_b64encode(text.encode('utf-8')).decode() # Ensure utf-8 encoding
-        except Exception:
-            # Handle potential encoding errors if input is not utf-8
-            print("Warn: Failed to encrypt text.") # Simplified warning
-            return ''
+        return encode_secret(text)
 
 
     def _decrypt(self, text):
         """'Decryption' for stored data"""
-        if not text:
-            return ''
-        try:
-            return urlsafe_b64decode(text.encode('utf-8')).decode() # Ensure utf-8 encoding
-        except Exception:
-            print("Warn: Failed to decrypt text (invalid base64 or encoding?).") # Simplified warning
-            return '' # Return empty string on error
+        return decode_secret(text)
 
 
     def get_cache_filename(self, console_id):
         """Generate cache filename for console"""
-        # Ensure console_id is treated as string for path creation
-        return os.path.join(self.cache_dir, f"console_{str(console_id)}.json")
+        return self.cache_store.get_cache_filename(console_id)
 
-    def load_from_cache(self, console_id):
-        """Load data from cache if available and valid"""
+    def get_journal_filename(self, console_id):
+        """Checkpoint journal of an unfinished fetch, stored next to the cache file"""
+        return self.cache_store.get_journal_filename(console_id)
+
+    def load_from_cache(self, console_id, hash_details=True):
+        """Load data from cache if available and valid
+
+        hash_details=False may skip the hash labels/status (SQLite backend),
+        the DAT/collection exporters only need md5 and name.
+        """
         # Caching is always on now, so we just attempt to load
         cache_file = self.get_cache_filename(console_id)
-        if os.path.exists(cache_file) and os.path.isfile(cache_file) and os.path.getsize(cache_file) > 2: # Check > 2 bytes to avoid empty json []
-            try:
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    print(self.translate("data_fetch_loading_from_cache", os.path.basename(cache_file))) # Use translated text
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        # self.status_bar_text_var.set(self.translate("status_cache_loaded", os.path.basename(cache_file))) # Avoid overwriting status
-                        return data
-                    else:
-                        print(self.translate("cache_load_error_list", cache_file)) # Use translated text
-                        # self.status_bar_text_var.set(self.translate("status_cache_invalid_list", os.path.basename(cache_file))) # Avoid overwriting status
-                        return None
-            except json.JSONDecodeError as e:
-                print(self.translate("cache_load_error_json_parse", cache_file, str(e))) # Use translated text
-                # self.status_bar_text_var.set(self.translate("status_cache_json_error", os.path.basename(cache_file))) # Avoid overwriting status
-                return None
-            except Exception as e:
-                print(self.translate("cache_load_error_general", cache_file, str(e))) # Use translated text
-                # self.status_bar_text_var.set(self.translate("status_cache_read_error", str(e))) # Avoid overwriting status
-                return None
-        # print(f"Keine Cache-Datei gefunden oder es ist kein File oder leer: {cache_file}") # This message might be ok as is, or add a key
-        return None
+        if not self.cache_store.has_data(console_id):
+            return None
+        print(self.translate("data_fetch_loading_from_cache", os.path.basename(cache_file))) # Use translated text
+        try:
+            return self.cache_store.load(console_id, hash_details=hash_details)
+        except CacheFormatError:
+            print(self.translate("cache_load_error_list", cache_file)) # Use translated text
+            return None
+        except json.JSONDecodeError as e:
+            print(self.translate("cache_load_error_json_parse", cache_file, str(e))) # Use translated text
+            return None
+        except Exception as e:
+            print(self.translate("cache_load_error_general", cache_file, str(e))) # Use translated text
+            return None
+
+    def get_hash_index(self):
+        """Global MD5 index of the cache, brought up to date with it before it is returned"""
+        if self.hash_index is None:
+            self.hash_index = HashIndex(self.cache_dir)
+        self.hash_index.sync(self.cache_store, self.console_id_to_name_map)
+        return self.hash_index
+
+    def lookup_hashes(self, md5s):
+        """{md5: [match, ...]} of the cached RA games listing each hash (see HashIndex.lookup_many)"""
+        return self.get_hash_index().lookup_many(md5s)
 
     def save_to_cache(self, console_id, data):
         """Save data to cache with improved error handling"""
         # Caching is always on now, so we just attempt to save
         cache_file = self.get_cache_filename(console_id)
         try:
-            if not isinstance(data, list):
-                print(self.translate("cache_save_invalid_data_type", console_id)) # Use translated text
-                self.status_bar_text_var.set(self.translate("cache_save_invalid_data_structure_status")) # Use translated text
-                return False
-            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
-            # User requested NOT to change cache file line endings, keep as is
-            with open(cache_file, 'w', encoding='utf-8') as f: # Specify encoding
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            # print(f"Daten erfolgreich im Cache gespeichert: {cache_file}") # This message might be ok as is, or add a key
-            # self.status_bar_text_var.set(self.translate("status_cache_saved", os.path.basename(cache_file))) # Avoid overwriting status
+            self.cache_store.save(console_id, data)
             return True
+        except TypeError:
+            print(self.translate("cache_save_invalid_data_type", console_id)) # Use translated text
+            self.status_bar_text_var.set(self.translate("cache_save_invalid_data_structure_status")) # Use translated text
+            return False
         except IOError as e:
             print(self.translate("cache_io_error", cache_file, str(e))) # Use translated text
             self.status_bar_text_var.set(self.translate("status_cache_io_error", str(e))) # Use translated text
@@ -684,6 +681,27 @@ class RetroAchievementsDATGenerator:
             self.status_bar_text_var.set(self.translate("status_cache_general_error", str(e))) # Use translated text
             return False
 
+    def _get_cache_manager_entries(self):
+        """Returns ([(display_text, console_id)] sorted by display text, total size in MB) of the cache."""
+        cache_info_list = []
+        total_size_mb = 0
+        try:
+            entries = self.cache_store.entries()
+        except Exception as e:
+            print(self.translate("cache_processing_error_display", self.cache_dir, e)) # Use translated text
+            entries = []
+        for console_id, description, size_bytes in entries:
+            console_name = self.console_id_to_name_map.get(str(console_id), f"ID {console_id}")
+            if size_bytes is None:
+                display_text = f"{console_name} ({description} - {self.translate('cache_unknown_size')})"
+            else:
+                file_size_mb = size_bytes / (1024 * 1024)
+                total_size_mb += file_size_mb
+                display_text = f"{console_name} ({description} - {file_size_mb:.2f} MB)"
+            cache_info_list.append((display_text, console_id))
+        cache_info_list.sort(key=lambda item: item[0])
+        return cache_info_list, total_size_mb
+
     def show_cache_manager_dialog(self):
         """Shows a dialog to view cache info and selectively delete cache files."""
         # Store a reference to the popup window
@@ -691,46 +709,8 @@ class RetroAchievementsDATGenerator:
         popup = self._cache_manager_popup # Use local name for convenience
 
         cache_path = self.cache_dir
-        cache_files = glob.glob(os.path.join(self.cache_dir, "console_*.json"))
-        cache_info_list = [] # List of (display_text, file_path)
-        total_size_mb = 0
-
-        # Gather info for display and deletion mapping
-        if os.path.isdir(cache_path):
-            for file_path in cache_files:
-                 if os.path.isfile(file_path):
-                    filename = os.path.basename(file_path)
-                    try:
-                        file_size_bytes = os.path.getsize(file_path)
-                        file_size_mb = file_size_bytes / (1024 * 1024)
-                        total_size_mb += file_size_mb
-
-                        # Try to get console name
-                        console_id = filename.replace("console_", "").replace(".json", "")
-                        # Ensure console_id is a valid key type (string)
-                        console_id_str = str(console_id) if console_id else None
-
-                        console_name = self.console_id_to_name_map.get(console_id_str, f"ID {console_id if console_id else 'N/A'}")
-
-
-                        display_text = f"{console_name} ({filename} - {file_size_mb:.2f} MB)"
-                        cache_info_list.append((display_text, file_path))
-                    except Exception as e:
-                        print(self.translate("cache_processing_error_display", filename, e)) # Use translated text
-                        # Add entry with filename if error
-                        try:
-                            file_size_bytes = os.path.getsize(file_path)
-                            file_size_mb = file_size_bytes / (1024 * 1024)
-                            total_size_mb += file_size_mb
-                            display_text = f"{filename} ({self.translate('cache_size_label', file_size_mb):s})" # Format string like "Size: %.2f MB"
-                            cache_info_list.append((display_text, file_path))
-                        except:
-                             display_text = f"{filename} ({self.translate('cache_unknown_size')})" # Use translated text
-                             cache_info_list.append((display_text, file_path))
-
-
-        # Sort cache_info_list by display text
-        cache_info_list.sort(key=lambda item: item[0])
+        # List of (display_text, console_id), sorted by display text
+        cache_info_list, total_size_mb = self._get_cache_manager_entries()
 
         # --- Configure the popup window ---
         popup.title(self.translate("cache_dialog_title")) # Use translated text
@@ -774,7 +754,7 @@ class RetroAchievementsDATGenerator:
         summary_frame = ttk.LabelFrame(popup, text=self.translate("cache_info_frame_title")) # Use translated text
         summary_frame.pack(pady=10, padx=10, fill="x")
         ttk.Label(summary_frame, text=self.translate("cache_directory_label", cache_path)).pack(anchor="w", padx=5, pady=2) # Use translated text
-        self.cache_count_label = ttk.Label(summary_frame, text=self.translate("cache_file_count_label", len(cache_files))) # Use translated text
+        self.cache_count_label = ttk.Label(summary_frame, text=self.translate("cache_file_count_label", len(cache_info_list))) # Use translated text
         self.cache_count_label.pack(anchor="w", padx=5, pady=2)
         # Store total_size_mb for potential updates if files are deleted
         self.total_size_mb_cache_dialog = total_size_mb
@@ -795,8 +775,8 @@ class RetroAchievementsDATGenerator:
         self.cache_listbox.pack(side=tk.LEFT, fill="both", expand=True)
         scrollbar.config(command=self.cache_listbox.yview)
 
-        # Map display text index back to file path - use a list mirroring the listbox
-        self._cache_file_paths = [file_path for _, file_path in cache_info_list]
+        # Map display text index back to console ID - use a list mirroring the listbox
+        self._cache_console_ids = [console_id for _, console_id in cache_info_list]
 
 
         # Select All checkbox
@@ -815,46 +795,31 @@ class RetroAchievementsDATGenerator:
         button_frame = ttk.Frame(popup)
         button_frame.pack(pady=10)
 
-        def delete_selected_cache_files():
+        def delete_selected_cache_entries():
             selected_indices = self.cache_listbox.curselection()
             if not selected_indices:
                 messagebox.showinfo(self.translate("cache_no_selection_title"), self.translate("cache_no_selection_text"), parent=popup) # Use translated text
                 return
 
-            files_to_delete = [self._cache_file_paths[i] for i in selected_indices]
+            consoles_to_delete = [self._cache_console_ids[i] for i in selected_indices]
 
             confirm = messagebox.askyesno(self.translate("cache_confirm_delete_title"),
-                                        self.translate("cache_confirm_delete_text", len(files_to_delete)), # Use translated text
+                                        self.translate("cache_confirm_delete_text", len(consoles_to_delete)), # Use translated text
                                         parent=popup)
             if confirm:
                 deleted_count = 0
                 error_occurred = False
-                # print(f"DEBUG: Attempting to delete files: {files_to_delete}")
-                for file_path in files_to_delete:
-                    if os.path.exists(file_path) and os.path.isfile(file_path):
-                        try:
-                            os.unlink(file_path)
-                            deleted_count += 1
-                            # print(f"DEBUG: Deleted file: {file_path}")
-                            # Also remove from in-memory cache if it corresponds to a console ID
-                            try:
-                                filename = os.path.basename(file_path)
-                                if filename.startswith("console_") and filename.endswith(".json"):
-                                     console_id = filename.replace("console_", "").replace(".json", "")
-                                     if console_id in self.cached_data:
-                                         del self.cached_data[console_id]
-                                         # print(f"DEBUG: Removed console_id {console_id} from in-memory cache.")
-                            except Exception as e_internal:
-                                 print(self.translate("cache_warn_in_memory_delete", file_path, e_internal)) # Use translated text
-                                 pass # Ignore errors removing from in-memory cache
-
-
-                        except Exception as e:
-                            print(self.translate("cache_delete_error", file_path, e)) # Use translated text
-                            self.status_bar_text_var.set(self.translate("status_cache_delete_error", os.path.basename(file_path))) # Use translated text
-                            error_occurred = True # Mark that an error occurred
-                    # else:
-                         # print(f"WARN: File not found during deletion attempt (already gone?): {file_path}")
+                for console_id in consoles_to_delete:
+                    cache_file = self.get_cache_filename(console_id)
+                    try:
+                        self.cache_store.delete(console_id)
+                        deleted_count += 1
+                        # Also remove from in-memory cache
+                        self.cached_data.pop(console_id, None)
+                    except Exception as e:
+                        print(self.translate("cache_delete_error", cache_file, e)) # Use translated text
+                        self.status_bar_text_var.set(self.translate("status_cache_delete_error", os.path.basename(cache_file))) # Use translated text
+                        error_occurred = True # Mark that an error occurred
 
 
                 # Update the listbox and info after deletion
@@ -869,7 +834,7 @@ class RetroAchievementsDATGenerator:
                 self.on_selection_change(None) # Update button states in main window
 
         # Store button references
-        self.cache_delete_selected_button_ref = ttk.Button(button_frame, text=self.translate("cache_delete_selected_button"), command=delete_selected_cache_files) # Use translated text
+        self.cache_delete_selected_button_ref = ttk.Button(button_frame, text=self.translate("cache_delete_selected_button"), command=delete_selected_cache_entries) # Use translated text
         self.cache_delete_selected_button_ref.pack(side=tk.LEFT, padx=5)
         self.cache_close_button_ref = ttk.Button(button_frame, text=self.translate("cache_close_button"), command=popup.destroy) # Use translated text
         self.cache_close_button_ref.pack(side=tk.LEFT, padx=5)
@@ -879,48 +844,11 @@ class RetroAchievementsDATGenerator:
         """Updates the listbox and summary info in the cache manager dialog."""
         # Note: This function only updates the *content* based on current files,
         # not the labels/buttons themselves (that's done in update_ui_language).
-        cache_path = self.cache_dir
-        cache_files = glob.glob(os.path.join(self.cache_dir, "console_*.json"))
-        cache_info_list = [] # List of (display_text, file_path)
-        total_size_mb = 0
-
-        # Gather info again
-        if os.path.isdir(cache_path):
-            for file_path in cache_files:
-                 if os.path.isfile(file_path):
-                    filename = os.path.basename(file_path)
-                    try:
-                        file_size_bytes = os.path.getsize(file_path)
-                        file_size_mb = file_size_bytes / (1024 * 1024)
-                        total_size_mb += file_size_mb
-
-                        # Try to get console name
-                        console_id = filename.replace("console_", "").replace(".json", "")
-                        # Ensure console_id is a valid key type (string)
-                        console_id_str = str(console_id) if console_id else None
-                        console_name = self.console_id_to_name_map.get(console_id_str, f"ID {console_id if console_id else 'N/A'}")
-
-                        display_text = f"{console_name} ({filename} - {file_size_mb:.2f} MB)"
-                        cache_info_list_recheck.append((display_text, file_path))
-                    except Exception as e:
-                        # print(f"Fehler beim Verarbeiten von Cache-Datei {filename} für Anzeige (Update): {e}")
-                        try:
-                            file_size_bytes = os.path.getsize(file_path)
-                            file_size_mb = file_size_bytes / (1024 * 1024)
-                            total_size_mb += file_size_mb
-                            display_text = f"{filename} ({self.translate('cache_size_label', file_size_mb):s})" # Format string like "Größe: %.2f MB"
-                            cache_info_list_recheck.append((display_text, file_path))
-                        except:
-                            display_text = f"{filename} ({self.translate('cache_unknown_size')})" # Use translated text
-                            cache_info_list_recheck.append((display_text, file_path))
-
-
-        # Sort cache_info_list
-        cache_info_list_recheck.sort(key=lambda item: item[0])
+        cache_info_list, total_size_mb = self._get_cache_manager_entries()
 
         # Update summary labels in the dialog (assuming they exist)
         if hasattr(self, 'cache_count_label') and hasattr(self, 'cache_size_label'):
-             self.cache_count_label.config(text=self.translate("cache_file_count_label", len(cache_files))) # Use translated text
+             self.cache_count_label.config(text=self.translate("cache_file_count_label", len(cache_info_list))) # Use translated text
              # Update stored total size and the label
              self.total_size_mb_cache_dialog = total_size_mb
              self.cache_size_label.config(text=self.translate("cache_total_size_label", self.total_size_mb_cache_dialog)) # Use translated text
@@ -928,11 +856,11 @@ class RetroAchievementsDATGenerator:
         # Clear and repopulate the listbox
         if hasattr(self, 'cache_listbox'):
             self.cache_listbox.delete(0, tk.END)
-            for display_text, _ in cache_info_list_recheck:
+            for display_text, _ in cache_info_list:
                 self.cache_listbox.insert(tk.END, display_text)
 
-        # Update the internal file paths list
-        self._cache_file_paths = [file_path for _, file_path in cache_info_list_recheck]
+        # Update the internal console ID list
+        self._cache_console_ids = [console_id for _, console_id in cache_info_list]
 
         # Reset Select All checkbox
         if hasattr(self, 'cache_select_all_cb'): # Ensure the checkbox reference exists
@@ -1000,10 +928,17 @@ class RetroAchievementsDATGenerator:
         self.include_achievements_cb.pack(side=tk.LEFT, padx=5)
         self.include_patch_urls_cb = ttk.Checkbutton(include_options_frame, text="", variable=self.include_patch_urls_var, command=self.save_options) # Set text later
         self.include_patch_urls_cb.pack(side=tk.LEFT, padx=5)
+        self.incremental_refresh_cb = ttk.Checkbutton(include_options_frame, text="", variable=self.incremental_refresh_var, command=self.save_options) # Set text later
+        self.incremental_refresh_cb.pack(side=tk.LEFT, padx=5)
 
 
-        self.fetch_data_button = ttk.Button(self.system_data_frame, text="", command=self.fetch_data, state="disabled") # Set text later
-        self.fetch_data_button.grid(row=3, column=0, columnspan=3, pady=10, padx=5)
+        fetch_buttons_frame = ttk.Frame(self.system_data_frame)
+        fetch_buttons_frame.grid(row=3, column=0, columnspan=3, pady=10, padx=5)
+        self.fetch_data_button = ttk.Button(fetch_buttons_frame, text="", command=self.fetch_data, state="disabled") # Set text later
+        self.fetch_data_button.pack(side=tk.LEFT, padx=5)
+        # Fetches every console of the dropdown in one batch
+        self.fetch_all_button = ttk.Button(fetch_buttons_frame, text="", command=self.fetch_all_consoles, state="disabled") # Set text later
+        self.fetch_all_button.pack(side=tk.LEFT, padx=5)
 
         self.system_data_frame.columnconfigure(1, weight=1)
 
@@ -1095,6 +1030,10 @@ class RetroAchievementsDATGenerator:
         self.create_batocera_collection_button = ttk.Button(collection_button_frame, text="", command=self.create_batocera_collection, state="disabled") # Set text later
         self.create_batocera_collection_button.pack(side=tk.LEFT, padx=5) # Pack side left
 
+        # DAT and both collections in one pass over the console data
+        self.create_all_button = ttk.Button(collection_button_frame, text="", command=self.create_all_files, state="disabled") # Set text later
+        self.create_all_button.pack(side=tk.LEFT, padx=5)
+
 
         # Use the new frame variable
         self.collection_creation_frame.columnconfigure(1, weight=1)
@@ -1139,6 +1078,18 @@ class RetroAchievementsDATGenerator:
         self.about_button.pack(side=tk.RIGHT, padx=(10, 0)) # Pack to the right of status bar, left of language dropdown
 
 
+    def on_close(self):
+        """Stops running fetches, closes the pooled HTTP connections and exits."""
+        self._cancel_fetch_flag = True
+        if self._export_executor is not None:
+            # Unfinished exports stop at their next game and remove their file
+            self._export_cancel_event.set()
+            self._export_executor.shutdown(wait=False)
+        self.http_client.close()
+        self.telemetry.close()
+        self.master.destroy()
+
+
     def on_language_selected(self, event):
         """Handles language selection from the dropdown."""
         selected_name = self.language_dropdown.get()
@@ -1276,123 +1227,115 @@ class RetroAchievementsDATGenerator:
         self.on_selection_change(None)
 
 
-    def _make_api_request(self, url, params=None, authenticate=True, max_retries_on_429=4, initial_backoff_s=3):
-        """Makes API request with authentication, error handling, and 429 retry logic."""
-        if params is None:
-            params = {}
+    def _run_on_ui_thread(self, func, *args):
+        """Runs func directly on the Tk thread, or schedules it there when called from a worker thread."""
+        if threading.current_thread() is threading.main_thread():
+            return func(*args)
+        self.master.after(0, func, *args)
+        return None
 
-        if authenticate:
-            user = self.username.get()
-            key = self.api_key.get()
-            if not user or not key:
-                messagebox.showerror(self.translate("auth_error_message_title"), self.translate("auth_error_message_text")) # Use translated text
-                self.status_bar_text_var.set(self.translate("status_auth_failed_missing")) # Use translated text
-                return None
 
-            params['z'] = user
-            params['y'] = key
+    def _pump_progress(self, channel, handlers):
+        """Applies a ProgressChannel on the Tk thread every PROGRESS_TICK_MS until it is closed.
 
-        retries = 0
-        current_url_for_msg = url.split('?')[0]
+        handlers maps the update keys to functions taking the posted values;
+        'status_bar' and 'fetch_label' (API status of worker threads) are always handled.
+        """
+        handlers = dict({'status_bar': self.status_bar_text_var.set,
+                         'fetch_label': lambda message: self.fetch_progress_label_var.set(str(message))}, **handlers)
+        self._progress_channel = channel
 
-        while retries <= max_retries_on_429:
-            try:
-                status_msg = self.translate("status_requesting_api", os.path.basename(current_url_for_msg)) # Use translated text
-                if retries > 0:
-                    status_msg += f" ({self.translate('api_rate_limit_wait_progress', retries + 1, max_retries_on_429+1).split('(')[-1].strip()}" # Extract retry part
-                status_msg += "..."
-                self.status_bar_text_var.set(status_msg)
-                self.master.update_idletasks()
-
-                print(f"API Request to {url} with params: {params}")
-                with requests.Session() as s:
-                    response = s.get(url, params=params, timeout=60)
-                print(f"Response status: {response.status_code} from {response.url}")
-                # print(f"Response text (first 200 chars): {response.text[:200]}...") # Optional: can be very verbose
-                response.raise_for_status()
+        def tick():
+            closed = channel.closed # Checked before draining, so nothing posted before close() is lost
+            calls, updates = channel.drain()
+            # Updates first, so completion calls are not overwritten by an older progress text
+            for key, values in updates.items():
                 try:
-                    return response.json()
-                except json.JSONDecodeError as json_err:
-                    self.status_bar_text_var.set(self.translate("api_parsing_error", os.path.basename(current_url_for_msg))) # Use translated text
-                    messagebox.showerror(self.translate("api_error_message_json_title"), self.translate("api_error_message_json_text", url, json_err, response.text[:200])) # Use translated text
-                    return None
-
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 422:
-                    self.status_bar_text_var.set(self.translate("api_error_422", os.path.basename(current_url_for_msg))) # Use translated text
-                    try:
-                        error_detail = e.response.json()
-                    except json.JSONDecodeError:
-                        error_detail = e.response.text[:200]
-                    messagebox.showerror(self.translate("api_error_message_422_title"),
-                                       self.translate("api_error_message_422_text", e.request.url, params, error_detail)) # Use translated text
-                    return None
-                elif e.response.status_code == 429 and retries < max_retries_on_429:
-                    wait_time = initial_backoff_s * (2 ** retries)
-                    wait_time += (wait_time * 0.2 * (os.urandom(1)[0]/255.0))
-                    wait_time = min(wait_time, 60)
-                    self.status_bar_text_var.set(self.translate("api_rate_limit_wait", os.path.basename(current_url_for_msg), wait_time)) # Use translated text
-
-                    # Check if progress popups and their labels exist before updating
-                    fetch_popup_active = hasattr(self, '_fetch_progress_popup') and self._fetch_progress_popup and tk.Toplevel.winfo_exists(self._fetch_progress_popup)
-                    dat_popup_active = hasattr(self, '_dat_progress_popup') and self._dat_progress_popup and tk.Toplevel.winfo_exists(self._dat_progress_popup)
-                    collection_popup_active = hasattr(self, '_collection_progress_popup') and self._collection_progress_popup and tk.Toplevel.winfo_exists(self._collection_progress_popup)
-
-                    wait_start_time = time.monotonic()
-                    while time.monotonic() < wait_start_time + wait_time:
-                        remaining_slice = (wait_start_time + wait_time) - time.monotonic()
-                        sleep_slice = min(0.1, remaining_slice)
-                        if sleep_slice <= 0: break
-                        time.sleep(sleep_slice)
-                        time_left = max(0, wait_time - (time.monotonic() - wait_start_time))
-                        wait_msg = self.translate("api_rate_limit_wait_progress", time_left, retries + 1, max_retries_on_429+1) # Use translated text
-                        self.status_bar_text_var.set(wait_msg)
-
-                        # Update relevant progress labels if popups are active
-                        if fetch_popup_active and self.fetch_progress_label_var is not None:
-                            self.fetch_progress_label_var.set(self.translate("api_rate_limit_resume_fetch")) # Use translated text (simplified resume)
-                        if dat_popup_active and self.dat_progress_label_var is not None:
-                            self.dat_progress_label_var.set(self.translate("api_rate_limit_resume_dat")) # Use translated text (simplified resume)
-                        if collection_popup_active and self.collection_progress_label_var is not None:
-                             self.collection_progress_label_var.set(self.translate("api_rate_limit_resume_collection")) # Use translated text (simplified resume)
-
-                        self.master.update_idletasks()
-                    retries += 1
-                    self.status_bar_text_var.set(self.translate("api_rate_limit_resume_status", os.path.basename(current_url_for_msg))) # Use translated text
-                    # Restore original progress messages if popups are active
-                    if fetch_popup_active and self.fetch_progress_label_var is not None:
-                         # Restore a more specific message if needed, or a generic one
-                         self.fetch_progress_label_var.set(self.translate("api_rate_limit_resume_fetch")) # Generic resume message (already set above)
-                    if dat_popup_active and self.dat_progress_label_var is not None:
-                        self.dat_progress_label_var.set(self.translate("api_rate_limit_resume_dat")) # Generic resume message (already set above)
-                    if collection_popup_active and self.collection_progress_label_var is not None:
-                         self.collection_progress_label_var.set(self.translate("api_rate_limit_resume_collection")) # Generic resume message (already set above)
-
-                    self.master.update_idletasks()
-                    continue
-                else:
-                    self.status_bar_text_var.set(self.translate("api_http_error", e.response.status_code, os.path.basename(current_url_for_msg))) # Add this key
-                    messagebox.showerror(self.translate("api_error_message_title"), self.translate("api_error_message_text", e.response.status_code, e.request.url, e.response.text[:200])) # Add this key
-                    return None
-            except requests.exceptions.Timeout:
-                self.status_bar_text_var.set(self.translate("api_timeout", os.path.basename(current_url_for_msg))) # Use translated text
-                if retries < max_retries_on_429:
-                    retries += 1
-                    wait_time = initial_backoff_s * (2 ** retries)
-                    wait_time = min(wait_time, 60)
-                    self.status_bar_text_var.set(self.translate("api_timeout_retry_wait", wait_time, retries + 1, max_retries_on_429+1)) # Use translated text
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    messagebox.showerror(self.translate("api_timeout_message_title"), self.translate("api_timeout_message_text", max_retries_on_429+1, url)) # Use translated text
-                    return None
-            except requests.exceptions.RequestException as e:
-                self.status_bar_text_var.set(self.translate("api_connection_error", os.path.basename(current_url_for_msg))) # Use translated text
-                messagebox.showerror(self.translate("api_connection_error_message_title"), self.translate("api_connection_error_message_text", e, url)) # Use translated text
-                return None
-        self.status_bar_text_var.set(self.translate("api_max_retries_reached", max_retries_on_429+1, os.path.basename(current_url_for_msg))) # Use translated text
-        messagebox.showwarning(self.translate("api_limit_reached_warning_title"), self.translate("api_limit_reached_warning_text", os.path.basename(current_url_for_msg), max_retries_on_429+1)) # Use translated text
-        return None
+                    handlers[key](*values)
+                except tk.TclError:
+                    pass # The widget is gone, e.g. the popup of a cancelled fetch
+            for func, args in calls:
+                try:
+                    func(*args)
+                except Exception:
+                    import traceback
+                    traceback.print_exc()
+            if closed:
+                if self._progress_channel is channel:
+                    self._progress_channel = None
+                print(f"DEBUG: {channel.stats_text()}")
+                return
+            self.master.after(PROGRESS_TICK_MS, tick)
+
+        self.master.after(PROGRESS_TICK_MS, tick)
+
+
+    def _make_api_request(self, url, params=None, authenticate=True, max_retries_on_429=4, initial_backoff_s=3,
+                          cancel_check=None, raise_errors=False):
+        """Makes API request with authentication, error handling, and 429 retry logic.
+
+        With raise_errors the error is raised again instead of returning None, and only the status bar
+        shows it: the GameFetchEngine has to tell a failed request from a game without hashes, and its
+        caller reports all failed requests of a fetch in one dialog (see _api_error_text).
+        """
+        credentials = (self.username.get(), self.api_key.get()) if authenticate else None
+        try:
+            return self.api_client.request(url, params=params, credentials=credentials,
+                                           max_retries_on_429=max_retries_on_429, initial_backoff_s=initial_backoff_s,
+                                           status_callback=self._on_api_status, cancel_check=cancel_check)
+        except ApiRequestCancelled:
+            if raise_errors:
+                raise
+            return None # Cancelled by the user, nothing to report
+        except ApiRequestError as e:
+            status_key, status_args = e.status
+            message_key, message_args = e.message
+            self._run_on_ui_thread(self.status_bar_text_var.set, self.translate(status_key, *status_args)) # Use translated text
+            if raise_errors:
+                raise
+            show = messagebox.showwarning if e.level == 'warning' else messagebox.showerror
+            self._run_on_ui_thread(show, self.translate(e.title_key), self.translate(message_key, *message_args)) # Use translated text
+            return None
+
+
+    def _api_error_text(self, error):
+        """Title and detailed message of an ApiRequestError, translated."""
+        message_key, message_args = error.message
+        return self.translate(error.title_key) + ":\n" + self.translate(message_key, *message_args)
+
+
+    def _on_api_status(self, key, *args):
+        """Shows progress of an API request (called by the ApiClient, possibly from a worker thread)."""
+        # Worker threads must not touch Tk directly, UI updates are scheduled instead
+        on_ui_thread = threading.current_thread() is threading.main_thread()
+        channel = None if on_ui_thread else self._progress_channel
+        if key == "status_requesting_api":
+            endpoint, attempt, max_attempts = args
+            status_msg = self.translate("status_requesting_api", endpoint) # Use translated text
+            if attempt > 1:
+                status_msg += f" ({self.translate('api_rate_limit_wait_progress', attempt, max_attempts).split('(')[-1].strip()}" # Extract retry part
+            status_msg += "..."
+        else:
+            status_msg = self.translate(key, *args)
+        if channel is not None:
+            channel.update('status_bar', status_msg) # Coalesced with the other progress of the operation
+        else:
+            self._run_on_ui_thread(self.status_bar_text_var.set, status_msg)
+
+        if key in ("api_rate_limit_wait_progress", "api_rate_limit_resume_status") and on_ui_thread:
+            # Show in the progress popups that the running operation is only paused
+            if self._fetch_progress_popup and tk.Toplevel.winfo_exists(self._fetch_progress_popup):
+                self.fetch_progress_label_var.set(self.translate("api_rate_limit_resume_fetch")) # Use translated text (simplified resume)
+            if self._dat_progress_popup and tk.Toplevel.winfo_exists(self._dat_progress_popup):
+                self.dat_progress_label_var.set(self.translate("api_rate_limit_resume_dat")) # Use translated text (simplified resume)
+            if self._collection_progress_popup and tk.Toplevel.winfo_exists(self._collection_progress_popup):
+                self.collection_progress_label_var.set(self.translate("api_rate_limit_resume_collection")) # Use translated text (simplified resume)
+        elif key.startswith("api_rate_limit") and channel is not None:
+            channel.update('fetch_label', self.translate("api_rate_limit_resume_fetch"))
+        elif key.startswith("api_rate_limit") and not on_ui_thread:
+            self.master.after(0, self.fetch_progress_label_var.set, self.translate("api_rate_limit_resume_fetch"))
+        if on_ui_thread:
+            self.master.update_idletasks()
 
 
     def test_login(self):
@@ -1546,29 +1489,37 @@ class RetroAchievementsDATGenerator:
                  data_available = True
                  # print(f"DEBUG: Data for console_id '{console_id_str}' found in memory cache ({len(self.cached_data[console_id_str])} items).")
             else:
-                 cache_file = self.get_cache_filename(console_id_str)
-                 # Check if file exists and is not empty json "[]"
-                 if os.path.exists(cache_file) and os.path.getsize(cache_file) > 2:
+                 # Check if the console is cached and not empty (no "[]" JSON file)
+                 if self.cache_store.has_data(console_id_str):
                      data_available = True
-                     # print(f"DEBUG: Data for console_id '{console_id_str}' potentially available in cache file: {cache_file}")
+                     # print(f"DEBUG: Data for console_id '{console_id_str}' potentially available in cache")
                  # else:
                     # print(f"DEBUG: Cache file for console_id '{console_id_str}' not found, empty, or invalid.")
         # else:
             # print("DEBUG: No console_id selected, so data_available is False.")
         # print(f"DEBUG: data_available={data_available}")
 
+        # No new fetch/export while an export is still writing
+        export_running = self._export_future is not None
+
         # Enable "Fetch Data"
         # Fetch data is possible if a console is selected AND user is connected
         # Also check if a fetch is *not* already in progress
-        if console_id_str and is_connected and self._fetch_worker_thread is None:
+        if console_id_str and is_connected and self._fetch_worker_thread is None and not export_running:
             self.fetch_data_button.config(state="normal")
             # print("DEBUG: fetch_data_button state: normal")
         else:
             self.fetch_data_button.config(state="disabled")
             # print("DEBUG: fetch_data_button state: disabled")
 
+        # Enable "Fetch All" once the console list is loaded
+        if self.console_id_to_name_map and is_connected and self._fetch_worker_thread is None and not export_running:
+            self.fetch_all_button.config(state="normal")
+        else:
+            self.fetch_all_button.config(state="disabled")
+
         # Enable "Create DAT"
-        if console_id_str and is_connected and data_available and dat_path_selected:
+        if console_id_str and is_connected and data_available and dat_path_selected and not export_running:
             self.create_dat_button.config(state="normal")
             # print("DEBUG: create_dat_button state: normal")
         else:
@@ -1582,7 +1533,8 @@ class RetroAchievementsDATGenerator:
            is_connected and \
            data_available and \
            collection_cfg_path_selected and \
-           retropie_rom_path_selected:
+           retropie_rom_path_selected and \
+           not export_running:
             # Use the new button variable
             self.create_retropie_collection_button.config(state="normal")
             # print("DEBUG: create_retropie_collection_button state: normal")
@@ -1598,117 +1550,33 @@ class RetroAchievementsDATGenerator:
            is_connected and \
            data_available and \
            collection_cfg_path_selected and \
-           batocera_rom_path_selected:
+           batocera_rom_path_selected and \
+           not export_running:
             self.create_batocera_collection_button.config(state="normal")
             # print("DEBUG: create_batocera_collection_button state: normal")
         else:
             self.create_batocera_collection_button.config(state="disabled")
             # print("DEBUG: create_batocera_collection_button state: disabled")
 
+        # Enable "Create All" if at least one of the outputs can be written
+        if console_id_str and \
+           is_connected and \
+           data_available and \
+           (dat_path_selected or collection_cfg_path_selected) and \
+           not export_running:
+            self.create_all_button.config(state="normal")
+        else:
+            self.create_all_button.config(state="disabled")
+
         # print("--- end of on_selection_change ---")
 
 
     def _get_typical_extension(self, console_name):
-        # This method is now less critical as the user provides the extension,
-        # but it's kept as a fallback for generating a default filename base
-        # if no filename is available in the API data.
-        ext_map = {
-            "nes": "nes", "nintendo entertainment system": "nes", "famicom": "nes",
-            "snes": "sfc", "super nintendo": "sfc", "super famicom": "sfc",
-            "mega drive": "md", "sega genesis": "md", "genesis": "md", "megadrive": "md",
-            "game boy": "gb", "gameboy": "gb",
-            "game boy color": "gbc", "gameboy color": "gbc",
-            "game boy advance": "gba", "gameboy advance": "gba",
-            "playstation": "cue", "psx": "cue", "ps1": "cue", "sony playstation": "cue",
-            "nintendo 64": "n64", "n64": "z64", # N64 can be v64, z64, n64 - z64 is common
-            "pc engine": "pce", "turbografx-16": "pce", "turbografx": "pce", "tg-16": "pce",
-            "master system": "sms", "sega master system": "sms", "sms": "sms",
-            "msx": "rom", "msx2": "rom",
-            "neo geo pocket": "ngp",
-            "neo geo pocket color": "ngc", "ngpc": "ngc",
-            "arcade": "zip", "mame": "zip", # Arcade ROMs are typically zipped
-            "atari 2600": "a26", "vcs": "a26", "atari vcs": "a26",
-            "atari lynx": "lnx", "lynx": "lnx",
-            "wonderswan": "ws",
-            "wonderswan color": "wsc",
-            "virtual boy": "vb", "virtualboy": "vb",
-            "sega 32x": "32x", "32x": "32x",
-            "sega cd": "cue", "mega-cd": "cue", "segacd": "cue",
-            "atari jaguar": "j64", "jaguar": "j64", # Jaguar can be bin, j64
-            "atari jaguar cd": "cue",
-            "dreamcast": "gdi", "sega dreamcast": "gdi", # Dreamcast can be cdi, gdi, iso
-            "psp": "iso", "playstation portable": "iso", # PSP can be iso, cso
-            "nds": "nds", "nintendo ds": "nds",
-            "gamecube": "iso", "nintendo gamecube": "iso", "ngc": "iso", "dol": "dol", # GameCube can be iso, gcm, dol
-            "wii": "iso", "nintendo wii": "iso", "wbfs": "wbfs", # Wii can be iso, wbfs
-            "xbox": "iso", "microsoft xbox": "iso", # Xbox can be iso, xbe
-            "playstation 2": "iso", "ps2": "iso", "sony playstation 2": "iso", # PS2 can be iso, bin
-            "3do": "iso", "3do interactive multipayer": "iso",
-            "colecovision": "col",
-            "intellivision": "int",
-            "vectrex": "vec",
-            "amstrad cpc": "dsk",
-            "commodore 64": "d64", "c64": "d64",
-            "zx spectrum": "tzx", "spectrum": "tzx", # ZX Spectrum can be zx, tap, tzx, dsk, trd, scl, szx, etc.
-        }
-        console_name_lower = console_name.lower()
-        if console_name_lower in ext_map:
-            return ext_map[console_name_lower]
-        for key, value in ext_map.items():
-            if key in console_name_lower:
-                return value
-        sanitized = "".join(c for c in console_name if c.isalnum()).lower()
-        return sanitized if sanitized else "unknownsystem"
+        return get_typical_extension(console_name)
 
 
     def _get_system_short_name(self, console_name):
-        short_names = {
-            "nes": "nes", "nintendo entertainment system": "nes", "famicom": "nes",
-            "snes": "snes", "super nintendo": "snes", "super famicom": "snes",
-            "mega drive": "megadrive", "sega genesis": "genesis", "genesis": "genesis", "megadrive": "megadrive",
-            "game boy": "gb", "gameboy": "gb",
-            "game boy color": "gbc", "gameboy color": "gbc",
-            "game boy advance": "gba", "gameboy advance": "gba",
-            "playstation": "psx", "psx": "psx", "ps1": "psx", "sony playstation": "psx",
-            "nintendo 64": "n64", "n64": "n64",
-            "pc engine": "pcengine", "turbografx-16": "pcengine", "turbografx": "pcengine", "tg-16": "pcengine",
-            "master system": "mastersystem", "sega master system": "mastersystem", "sms": "mastersystem",
-            "msx": "msx", "msx2": "msx",
-            "neo geo pocket": "ngp",
-            "neo geo pocket color": "ngpc", "ngpc": "ngpc",
-            "arcade": "arcade", "mame": "arcade",
-            "atari 2600": "atari2600", "vcs": "atari2600", "atari vcs": "atari2600",
-            "atari lynx": "lynx", "lynx": "lynx",
-            "wonderswan": "wonderswan",
-            "wonderswan color": "wonderswancolor",
-            "virtual boy": "virtualboy", "virtualboy": "virtualboy",
-            "sega 32x": "sega32x", "32x": "sega32x",
-            "sega cd": "segacd", "mega-cd": "segacd", "segacd": "segacd",
-            "atari jaguar": "jaguar", "jaguar": "jaguar",
-            "atari jaguar cd": "jaguarcd",
-            "dreamcast": "dreamcast", "sega dreamcast": "dreamcast",
-            "psp": "psp", "playstation portable": "psp",
-            "nds": "nds", "nintendo ds": "nds",
-            "gamecube": "gc", "nintendo gamecube": "gc", "ngc": "gc",
-            "wii": "wii", "nintendo wii": "wii",
-            "xbox": "xbox", "microsoft xbox": "xbox",
-            "playstation 2": "ps2", "ps2": "ps2", "sony playstation 2": "ps2",
-            "3do": "3do", "3do interactive multipayer": "3do",
-            "colecovision": "coleco",
-            "intellivision": "intellivision",
-            "vectrex": "vectrex",
-            "amstrad cpc": "amstradcpc",
-            "commodore 64": "c64", "c64": "c64",
-            "zx spectrum": "zxspectrum", "spectrum": "zxspectrum",
-        }
-        console_name_lower = console_name.lower()
-        if console_name_lower in short_names:
-            return short_names[console_name_lower]
-        for key, value in short_names.items():
-            if key in console_name_lower:
-                return value
-        sanitized = "".join(c for c in console_name if c.isalnum()).lower()
-        return sanitized if sanitized else "unknownsystem"
+        return get_system_short_name(console_name)
 
     def fetch_data(self):
         """Prepare for fetching data and start the worker thread."""
@@ -1737,13 +1605,15 @@ class RetroAchievementsDATGenerator:
         self.create_dat_button.config(state="disabled")
         self.create_retropie_collection_button.config(state="disabled") # Use the new variable
         self.create_batocera_collection_button.config(state="disabled") # Use the new variable
+        self.create_all_button.config(state="disabled")
 
         self.master.update_idletasks()
 
         # Caching is always on now, so we check cache first (still in main thread)
         print(self.translate("data_fetch_checking_cache")) # Use translated text
         cached_console_data = self.load_from_cache(console_id_str) # Use string ID for cache
-        if cached_console_data is not None and isinstance(cached_console_data, list):
+        incremental = self.incremental_refresh_var.get() and bool(cached_console_data)
+        if cached_console_data is not None and isinstance(cached_console_data, list) and not incremental:
             print(f"DEBUG: Using cached data for {console_name}. {len(cached_console_data)} games loaded.") # This can remain debug or translate
             self.cached_data[console_id_str] = cached_console_data # Store in memory using string ID
             # Update status bar - check if the original fetch message is still there, otherwise set a generic cached message
@@ -1756,8 +1626,11 @@ class RetroAchievementsDATGenerator:
 
         # If no cache, proceed to fetch from API in a separate thread
         print(self.translate("data_fetch_game_list")) # Use translated text
+        self.telemetry.start_run()
         # Fetch the initial game list first in the main thread to get total count for progress bar
         game_list_params = {'i': console_id_str} # Use string ID for API params
+        if incremental:
+            game_list_params['h'] = 1 # Include the md5 list per game so hash changes can be detected
         initial_game_list_data = self._make_api_request(API_GAME_LIST_URL, params=game_list_params, authenticate=True)
 
         if not initial_game_list_data or not isinstance(initial_game_list_data, list):
@@ -1783,7 +1656,35 @@ class RetroAchievementsDATGenerator:
             self.on_selection_change(None) # Update button states
             return
 
-        total_games = len(initial_game_list_data)
+        include_achievements = self.include_achievements_var.get()
+        include_patch_urls = self.include_patch_urls_var.get()
+        job = ConsoleFetchJob(console_id_str, initial_game_list_data, cached_console_data,
+                              journal_path=self.get_journal_filename(console_id_str),
+                              include_achievements=include_achievements, include_patch_urls=include_patch_urls,
+                              incremental=incremental)
+        if job.delta_plan is not None:
+            delta_plan = job.delta_plan
+            summary = self.translate("data_fetch_delta_summary", console_name, len(delta_plan.to_fetch),
+                                     len(delta_plan.removed_ids), len(delta_plan.unchanged_ids))
+            print(summary)
+            self.status_bar_text_var.set(summary)
+            if job.up_to_date:
+                # Nothing to download, just drop removed games and refresh titles
+                merged_data = job.complete([])
+                self.cached_data[console_id_str] = merged_data
+                self.save_to_cache(console_id_str, merged_data)
+                messagebox.showinfo(self.translate("info_title"), self.translate("data_fetch_delta_up_to_date", console_name, len(merged_data)))
+                self.on_selection_change(None)
+                return
+
+        # Resume from the checkpoint journal of an earlier, unfinished fetch
+        resumed_count = job.resume()
+        if resumed_count:
+            resume_msg = self.translate("data_fetch_resuming", console_name, resumed_count, len(job.pending))
+            print(resume_msg)
+            self.status_bar_text_var.set(resume_msg)
+
+        total_games = len(job.pending)
 
         # Use fetch-specific progress popup variable
         self._fetch_progress_popup = tk.Toplevel(self.master) # Store reference
@@ -1831,10 +1732,17 @@ class RetroAchievementsDATGenerator:
         # For now, just destroying is fine, but a robust solution might ask the user if they want to cancel
         popup.protocol("WM_DELETE_WINDOW", self._cancel_fetch) # Use a specific cancel method
 
+        # The worker reports through a ProgressChannel that is applied every PROGRESS_TICK_MS
+        channel = ProgressChannel()
+        self._pump_progress(channel, {
+            'game_label': lambda game_title, current_rate: game_progress_label_var.set(f"{game_title[:50]}... ({current_rate:.1f} req/s)"),
+            'progress': lambda done: progress_bar.config(value=done)
+        })
+
         # Start the data fetching in a separate thread
+        # Option variables are read above, the worker pool must not touch Tk variables
         self._fetch_worker_thread = threading.Thread(target=self._fetch_worker,
-                                                     args=(console_id_str, console_name, initial_game_list_data,
-                                                           progress_bar, game_progress_label_var, popup))
+                                                     args=(console_id_str, console_name, job, channel))
         self._fetch_worker_thread.daemon = True # Allow the application to exit even if the thread is running
         self._fetch_worker_thread.start()
 
@@ -1871,107 +1779,35 @@ class RetroAchievementsDATGenerator:
              print("DEBUG: Attempted to cancel fetch, but popup is not active.")
 
 
-    def _fetch_worker(self, console_id_str, console_name, initial_game_list_data, progress_bar, game_progress_label_var, popup):
-        """Worker function to fetch data in a separate thread."""
+    def _fetch_worker(self, console_id_str, console_name, job, channel):
+        """Worker function to fetch data in a separate thread, reports through the ProgressChannel."""
         print(f"DEBUG: Fetch worker thread started for console ID: {console_id_str}")
         processed_data_for_cache = []
-        total_games = len(initial_game_list_data)
-        api_call_delay = 0.6 # Adjusted from 0.6 to allow slightly faster processing, monitor API for 429s
 
         # Initialize cancellation flag
         self._cancel_fetch_flag = False
 
+        def on_game_done(done, total_games, game_title):
+            # Called from the pool threads; only the newest values reach the UI on its next tick.
+            # Lazy: the text is only formatted if it is still the newest one then
+            channel.update('fetch_label', self.message_catalog.lazy("data_fetch_processing_game", done, total_games, console_name))
+            channel.update('game_label', game_title, self.rate_limiter.current_rate)
+            channel.update('progress', done)
+
+        def on_game_skipped(reason_key, *details):
+            channel.call(print, self.message_catalog.lazy(reason_key, *details)) # Formatted by print on the main thread
+
+        engine = GameFetchEngine(
+            lambda url, params, cancel_check=None: self._make_api_request(url, params=params, authenticate=True,
+                                                                          cancel_check=cancel_check, raise_errors=True),
+            max_workers=self.fetch_max_workers,
+            include_achievements=job.include_achievements,
+            include_patch_urls=job.include_patch_urls,
+            cancel_check=lambda: self._cancel_fetch_flag
+        )
+
         try:
-            for index, game_entry in enumerate(initial_game_list_data):
-                # Check cancellation flag periodically
-                if self._cancel_fetch_flag:
-                     print("DEBUG: Fetch worker detected cancellation flag, stopping.")
-                     break # Exit the loop if cancellation is requested
-
-                if not isinstance(game_entry, dict):
-                    # Schedule print statement
-                    self.master.after(0, print, self.translate("data_fetch_skipping_invalid_entry", index, game_entry)) # Use translated text
-                    # Schedule progress bar update - CORRECTED LINE
-                    self.master.after(0, lambda: progress_bar.config(value=index + 1))
-                    # Schedule popup and master update (redundant but ensures updates)
-                    self.master.after(0, popup.update_idletasks)
-                    self.master.after(0, self.master.update_idletasks)
-                    continue
-
-                game_id = game_entry.get('ID')
-                game_title = game_entry.get('Title', f'Unbekanntes Spiel ID {game_id}') # Keep fallback as is or translate
-
-                # Schedule progress label updates
-                self.master.after(0, self.fetch_progress_label_var.set, self.translate("data_fetch_processing_game", index+1, total_games, console_name)) # Use translated text
-                self.master.after(0, game_progress_label_var.set, f"{game_title[:50]}...") # This is dynamic, keep as is
-                # Schedule progress bar update - CORRECTED LINE
-                self.master.after(0, lambda: progress_bar.config(value=index + 1))
-                 # Schedule popup and master update (redundant but ensures updates)
-                self.master.after(0, popup.update_idletasks)
-                self.master.after(0, self.master.update_idletasks)
-
-
-                if not game_id:
-                    # Schedule print statement
-                    self.master.after(0, print, self.translate("data_fetch_skipping_missing_id", game_entry)) # Use translated text
-                    continue
-                # Use string ID for API calls
-                game_id_str = str(game_id)
-
-                if index > 0: # Apply delay after the first game
-                    time.sleep(api_call_delay)
-
-                # API calls from worker thread - _make_api_request needs to handle scheduled status updates internally
-                game_hashes_params = {'i': game_id_str, 'g': console_id_str} # Use string IDs
-                game_hashes_data = self._make_api_request(API_GET_GAME_HASHES_URL, params=game_hashes_params, authenticate=True)
-
-                extended_info = {}
-                if (self.include_achievements_var.get() or self.include_patch_urls_var.get()) and not self._cancel_fetch_flag: # Check flag before next API call
-                    extended_params = {'i': game_id_str, 'g': console_id_str} # Use string IDs
-                    extended_data_api_response = self._make_api_request(API_GET_GAME_EXTENDED_URL, params=extended_params, authenticate=True)
-
-                    if extended_data_api_response and isinstance(extended_data_api_response, dict):
-                        if self.include_achievements_var.get():
-                            extended_info['num_achievements'] = extended_data_api_response.get('NumAchievements', 0)
-                            extended_info['points'] = extended_data_api_response.get('Points', 0)
-                        if self.include_patch_urls_var.get():
-                            patch_data = extended_data_api_response.get('PatchData')
-                            if isinstance(patch_data, dict):
-                                extended_info['patch_url'] = patch_data.get('URL', '')
-                                extended_info['patch_md5'] = patch_data.get('Hash', '')
-
-
-                md5_list = []
-                if game_hashes_data and isinstance(game_hashes_data, dict) and 'Results' in game_hashes_data:
-                    results_list = game_hashes_data['Results']
-                    if isinstance(results_list, list):
-                        for item in results_list:
-                            if isinstance(item, dict):
-                                hash_md5 = item.get('MD5')
-                                hash_name = item.get('Name', 'Unknown Filename') # Keep fallback or translate
-                                hash_labels = item.get('Labels', [])
-                                hash_status = item.get('Status')
-                                if hash_md5 and isinstance(hash_md5, str) and len(hash_md5) == 32 and all(c in '0123456789abcdefABCDEF' for c in hash_md5):
-                                    md5_list.append({
-                                        'md5': hash_md5.lower(),
-                                        'name': hash_name,
-                                        'labels': hash_labels if isinstance(hash_labels, list) else [],
-                                        'status': hash_status
-                                    })
-
-                if not md5_list:
-                    # Schedule print statement
-                    self.master.after(0, print, self.translate("data_fetch_skipping_no_hashes", game_id, game_title)) # Use translated text
-                    continue
-
-                # Only append if not cancelled before processing this game's data
-                if not self._cancel_fetch_flag:
-                    processed_data_for_cache.append({
-                        'id': game_id_str, # Store ID as string in cached data
-                        'title': game_title,
-                        'hashes': md5_list,
-                        'extended_info': extended_info if extended_info else None
-                    })
+            processed_data_for_cache = job.run(engine, progress_callback=on_game_done, skip_callback=on_game_skipped)
 
         except Exception as e:
             # Handle unexpected errors in the worker thread
@@ -1979,19 +1815,23 @@ class RetroAchievementsDATGenerator:
             error_msg = f"Unexpected error during data fetch: {e}\n{traceback.format_exc()}"
             print(f"ERROR: {error_msg}")
             # Schedule error message display and status update on main thread
-            self.master.after(0, messagebox.showerror, self.translate("data_fetch_unexpected_error_title"), self.translate("data_fetch_unexpected_error_text", str(e))) # Add this key
-            self.master.after(0, self.status_bar_text_var.set, self.translate("status_data_fetch_unexpected_error")) # Add this key
+            channel.call(messagebox.showerror, self.translate("data_fetch_unexpected_error_title"), self.translate("data_fetch_unexpected_error_text", str(e))) # Add this key
+            channel.call(self.status_bar_text_var.set, self.translate("status_data_fetch_unexpected_error")) # Add this key
             processed_data_for_cache = None # Indicate failure
 
 
         finally:
-            # This block runs whether the loop finished or broke (due to cancellation)
+            # This block runs whether the engine finished or stopped (due to cancellation)
             # Schedule the completion handler to run on the main thread
             print("DEBUG: Fetch worker finished or cancelled, scheduling completion handler.")
-            self.master.after(0, self._on_fetch_complete, console_id_str, processed_data_for_cache)
+            print(f"DEBUG: Rate limiter stats: {self.rate_limiter.snapshot()}")
+            print(f"DEBUG: HTTP connection stats: {self.http_client.snapshot()}")
+            channel.call(self._on_fetch_complete, console_id_str, processed_data_for_cache,
+                         job, self._cancel_fetch_flag)
+            channel.close()
 
 
-    def _on_fetch_complete(self, console_id_str, fetched_data):
+    def _on_fetch_complete(self, console_id_str, fetched_data, job=None, cancelled=False):
         """Handle data fetch completion on the main Tkinter thread."""
         print(f"DEBUG: _on_fetch_complete called for console ID: {console_id_str}")
 
@@ -2005,25 +1845,40 @@ class RetroAchievementsDATGenerator:
         self._cancel_fetch_flag = False # Reset cancellation flag
 
         # Process results
-        if fetched_data is not None: # fetched_data is None if an unexpected error occurred in the worker
+        if cancelled and job is not None and job.journal is not None:
+            # Keep the checkpoint journal instead of caching a partial list, the next fetch resumes from it
+            self.status_bar_text_var.set(self.translate("status_fetch_cancelled_resumable"))
+        elif fetched_data is not None and job is not None and job.failed_ids:
+            # Not cached either, the journal keeps the fetched games and the next fetch retries the failed ones
+            message = self.translate("data_fetch_games_failed", len(job.failed_ids),
+                                     self.console_id_to_name_map.get(console_id_str, console_id_str))
+            self.status_bar_text_var.set(message)
+            timing = format_summary(self.telemetry.write_summary(console_ids=[console_id_str]), self.translate)
+            messagebox.showwarning(self.translate("warning_title"),
+                                   message + "\n\n" + self._api_error_text(job.first_error) + "\n\n" + timing)
+        elif fetched_data is not None: # fetched_data is None if an unexpected error occurred in the worker
             if fetched_data: # Check if the list is not empty
                  self.cached_data[console_id_str] = fetched_data # Store in-memory using string ID
                  cache_saved = self.save_to_cache(console_id_str, fetched_data) # Use string ID
+                 if cache_saved and job is not None:
+                     job.discard_journal() # Checkpoints are part of the cache file now
                  if cache_saved:
                      self.status_bar_text_var.set(self.translate("data_fetch_cache_save_success", self.console_id_to_name_map.get(console_id_str, console_id_str))) # Use translated text
                  else:
                      # save_to_cache updates status bar internally (scheduled)
                      pass # Status update already set by save_to_cache
 
+                 timing = format_summary(self.telemetry.write_summary(console_ids=[console_id_str]), self.translate)
                  messagebox.showinfo(self.translate("data_fetch_completed_title"),
                                     self.translate("data_fetch_completed_text",
                                                    self.console_id_to_name_map.get(console_id_str, console_id_str),
-                                                   len(fetched_data))) # Use translated text
+                                                   len(fetched_data)) + "\n\n" + timing) # Use translated text
                  print(self.translate("data_fetch_completed", self.console_id_to_name_map.get(console_id_str, console_id_str))) # Use translated text
 
             else: # fetched_data is an empty list
                  self.cached_data[console_id_str] = [] # Store empty list
-                 self.save_to_cache(console_id_str, []) # Save empty list to cache
+                 if self.save_to_cache(console_id_str, []) and job is not None: # Save empty list to cache
+                     job.discard_journal()
                  self.status_bar_text_var.set(self.translate("status_no_games_with_hashes", self.console_id_to_name_map.get(console_id_str, console_id_str))) # Use translated text
                  messagebox.showinfo(self.translate("info_title"), self.translate("data_fetch_no_games_with_hashes_info", self.console_id_to_name_map.get(console_id_str, console_id_str))) # Add this key
 
@@ -2036,6 +1891,281 @@ class RetroAchievementsDATGenerator:
         self.on_selection_change(None)
 
 
+    def fetch_all_consoles(self):
+        """Fetch every console of the dropdown in one batch through the shared worker pool."""
+        if self._fetch_worker_thread is not None and self._fetch_worker_thread.is_alive():
+             print("DEBUG: Fetch already in progress, ignoring request.")
+             return
+        console_ids = sorted(self.console_id_to_name_map, key=lambda c: (not c.isdigit(), int(c) if c.isdigit() else 0, c))
+        if not console_ids:
+            return
+        incremental = self.incremental_refresh_var.get()
+        confirm_key = "fetch_all_confirm_incremental_text" if incremental else "fetch_all_confirm_text"
+        if not messagebox.askyesno(self.translate("fetch_all_confirm_title"), self.translate(confirm_key, len(console_ids))):
+            return
+
+        print(f"\nDEBUG: Starting batch fetch for {len(console_ids)} consoles (incremental={incremental})")
+        self.telemetry.start_run()
+        self.status_bar_text_var.set(self.translate("status_fetch_all_start", len(console_ids)))
+        # Disable fetch and all creation buttons during the batch
+        self.fetch_data_button.config(state="disabled")
+        self.fetch_all_button.config(state="disabled")
+        self.create_dat_button.config(state="disabled")
+        self.create_retropie_collection_button.config(state="disabled")
+        self.create_batocera_collection_button.config(state="disabled")
+        self.create_all_button.config(state="disabled")
+
+        # Re-use the fetch progress popup (and its cancel handling)
+        self._fetch_progress_popup = tk.Toplevel(self.master) # Store reference
+        popup = self._fetch_progress_popup # Use local name for convenience
+        popup.title(self.translate("data_fetch_progress_title")) # Use translated text
+        fetch_popup_width = 450
+        fetch_popup_height = 190
+        popup.geometry(f"{fetch_popup_width}x{fetch_popup_height}")
+        popup.resizable(False, False)
+
+        # Upper part: the console(s) currently being fetched, lower part: the whole batch
+        self.fetch_progress_label_var.set(self.translate("status_fetch_all_start", len(console_ids)))
+        batch_progress_label_var = tk.StringVar(value="")
+        ttk.Label(popup, textvariable=self.fetch_progress_label_var, wraplength=430).pack(pady=(10,0), padx=10, fill="x")
+        console_progress_bar = ttk.Progressbar(popup, orient="horizontal", length=430, mode="determinate")
+        console_progress_bar.pack(pady=5, padx=10)
+        ttk.Label(popup, textvariable=batch_progress_label_var, wraplength=430).pack(pady=(5,0), padx=10, fill="x")
+        batch_progress_bar = ttk.Progressbar(popup, orient="horizontal", length=430, mode="determinate")
+        batch_progress_bar.pack(pady=5, padx=10)
+
+        # --- Calculate and set fetch popup position ---
+        self.master.update_idletasks() # Ensure main window geometry is up-to-date
+        center_x = self.master.winfo_x() + (self.master.winfo_width() // 2) - (fetch_popup_width // 2)
+        center_y = self.master.winfo_y() + (self.master.winfo_height() // 2) - (fetch_popup_height // 2)
+        center_x = max(0, min(center_x, self.master.winfo_screenwidth() - fetch_popup_width))
+        center_y = max(0, min(center_y, self.master.winfo_screenheight() - fetch_popup_height))
+        popup.geometry(f'{fetch_popup_width}x{fetch_popup_height}+{center_x}+{center_y}')
+        # --- End position calculation ---
+
+        popup.grab_set()
+        popup.protocol("WM_DELETE_WINDOW", self._cancel_fetch)
+
+        channel = ProgressChannel()
+        self._pump_progress(channel, {
+            'fetch_label': lambda message, current_rate: self.fetch_progress_label_var.set(f"{message} ({current_rate:.1f} req/s)"),
+            'console_progress': lambda done, total: console_progress_bar.config(maximum=max(1, total), value=done),
+            'batch_progress': lambda done, total: batch_progress_bar.config(maximum=max(1, total), value=done),
+            'batch_label': lambda message: batch_progress_label_var.set(str(message))
+        })
+
+        # Option variables are read here, the worker threads must not touch Tk variables
+        self._fetch_worker_thread = threading.Thread(target=self._batch_fetch_worker,
+                                                     args=(console_ids, incremental,
+                                                           self.include_achievements_var.get(), self.include_patch_urls_var.get(),
+                                                           channel))
+        self._fetch_worker_thread.daemon = True
+        self._fetch_worker_thread.start()
+
+
+    def _batch_fetch_worker(self, console_ids, incremental, include_achievements, include_patch_urls, channel):
+        """Worker thread of fetch_all_consoles, runs the BatchFetchPipeline and reports through the ProgressChannel."""
+        self._cancel_fetch_flag = False
+        # Errors raise instead of showing a dialog each, the first one is shown with the summary
+        request_func = lambda url, params, cancel_check=None: self._make_api_request(url, params=params, authenticate=True,
+                                                                                     cancel_check=cancel_check,
+                                                                                     raise_errors=True)
+        failed_names = []
+        errors = []
+
+        def on_progress(console_id_str, done, total, game_title, batch_done, batch_total):
+            console_name = self.console_id_to_name_map.get(console_id_str, console_id_str)
+            channel.update('fetch_label', self.message_catalog.lazy("data_fetch_processing_game", done, total, console_name),
+                           self.rate_limiter.current_rate)
+            channel.update('console_progress', done, total)
+            channel.update('batch_progress', batch_done, batch_total)
+
+        def on_console_done(console_id_str, job, records, consoles_done, consoles_total):
+            # Saved on the main thread right away, not at the end of the batch
+            console_name = self.console_id_to_name_map.get(console_id_str, console_id_str)
+            if records is None:
+                failed_names.append(console_name)
+            elif job.failed_ids:
+                # Not saved, the journal keeps the fetched games and the next fetch retries the failed ones
+                failed_names.append(console_name)
+                errors.append(job.first_error)
+                channel.call(print, self.message_catalog.lazy("data_fetch_games_failed", len(job.failed_ids), console_name))
+            else:
+                channel.call(self._on_batch_console_done, console_id_str, job, records)
+            channel.update('batch_label', self.message_catalog.lazy("fetch_all_progress", consoles_done, consoles_total))
+
+        def on_skipped(console_id_str, reason_key, *details):
+            channel.call(print, self.message_catalog.lazy(reason_key, *details)) # Formatted by print on the main thread
+
+        def prepare_job(console_id_str):
+            try:
+                return load_console_job(request_func, self.cache_store, console_id_str, incremental,
+                                        include_achievements, include_patch_urls)
+            except ApiRequestCancelled:
+                return None
+            except ApiRequestError as e:
+                errors.append(e)
+                return None
+
+        engine = GameFetchEngine(
+            request_func,
+            max_workers=self.fetch_max_workers,
+            include_achievements=include_achievements,
+            include_patch_urls=include_patch_urls,
+            cancel_check=lambda: self._cancel_fetch_flag
+        )
+        pipeline = BatchFetchPipeline(engine, prepare_job)
+        completed = 0
+        try:
+            completed = pipeline.run(console_ids, progress_callback=on_progress,
+                                     console_done_callback=on_console_done, skip_callback=on_skipped)
+        except Exception as e:
+            import traceback
+            print(f"ERROR: Unexpected error during batch fetch: {e}\n{traceback.format_exc()}")
+            channel.call(messagebox.showerror, self.translate("data_fetch_unexpected_error_title"), self.translate("data_fetch_unexpected_error_text", str(e)))
+        finally:
+            print(f"DEBUG: Rate limiter stats: {self.rate_limiter.snapshot()}")
+            print(f"DEBUG: HTTP connection stats: {self.http_client.snapshot()}")
+            channel.call(self._on_batch_fetch_complete, completed - len(failed_names), len(console_ids),
+                         failed_names, self._cancel_fetch_flag, errors[0] if errors else None)
+            channel.close()
+
+
+    def _on_batch_console_done(self, console_id_str, job, records):
+        """Writes the cache file of one finished console of a batch fetch (main thread)."""
+        self.cached_data[console_id_str] = records
+        if self.save_to_cache(console_id_str, records):
+            job.discard_journal() # Checkpoints are part of the cache file now
+            self.status_bar_text_var.set(self.translate("data_fetch_cache_save_success", self.console_id_to_name_map.get(console_id_str, console_id_str)))
+
+
+    def _on_batch_fetch_complete(self, completed, total, failed_names, cancelled, error=None):
+        """Handle batch fetch completion on the main Tkinter thread (error: the first failed ApiRequestError)."""
+        if self._fetch_progress_popup and tk.Toplevel.winfo_exists(self._fetch_progress_popup):
+             self._fetch_progress_popup.destroy()
+             self._fetch_progress_popup = None
+        self._fetch_worker_thread = None
+        self._cancel_fetch_flag = False
+
+        if cancelled:
+            self.status_bar_text_var.set(self.translate("status_fetch_cancelled_resumable"))
+        else:
+            summary = self.translate("fetch_all_completed_text", completed, total)
+            if failed_names:
+                summary += "\n" + self.translate("fetch_all_failed_consoles", ", ".join(failed_names))
+            if error is not None:
+                summary += "\n\n" + self._api_error_text(error)
+            summary += "\n\n" + format_summary(self.telemetry.write_summary(consoles_completed=completed, consoles_total=total),
+                                                self.translate)
+            self.status_bar_text_var.set(self.translate("fetch_all_completed_text", completed, total))
+            show = messagebox.showwarning if failed_names or error is not None else messagebox.showinfo
+            show(self.translate("data_fetch_completed_title"), summary)
+        self.on_selection_change(None)
+
+
+    def _run_export_task(self, popup_attr, popup_title, label_var, start_text, total, export_func, on_complete):
+        """Runs export_func(progress_callback, cancel_check) on the shared export worker.
+
+        A modal progress popup (stored as self.<popup_attr>) shows the progress, which the
+        worker posts to a ProgressChannel that the main thread applies every PROGRESS_TICK_MS. Closing the
+        popup cancels the export after a confirmation; the writer then removes its
+        unfinished file. on_complete(result, error) runs on the main thread after the popup
+        is closed, error is an ExportCancelled if the export was cancelled.
+        """
+        self.create_dat_button.config(state="disabled")
+        self.fetch_data_button.config(state="disabled")
+        self.create_retropie_collection_button.config(state="disabled")
+        self.create_batocera_collection_button.config(state="disabled")
+        self.create_all_button.config(state="disabled")
+        self.fetch_all_button.config(state="disabled")
+
+        popup = tk.Toplevel(self.master)
+        setattr(self, popup_attr, popup)
+        popup.title(popup_title)
+        popup_width = 450
+        popup_height = 130
+        popup.resizable(False, False)
+
+        label_var.set(start_text)
+        ttk.Label(popup, textvariable=label_var, wraplength=430).pack(pady=10, padx=10, fill="x")
+        progress_bar = ttk.Progressbar(popup, orient="horizontal", length=430, mode="determinate")
+        progress_bar.pack(pady=10, padx=10)
+        progress_bar["maximum"] = max(1, total)
+
+        # --- Calculate and set popup position ---
+        self.master.update_idletasks() # Ensure main window geometry is up-to-date
+        center_x = self.master.winfo_x() + (self.master.winfo_width() // 2) - (popup_width // 2)
+        center_y = self.master.winfo_y() + (self.master.winfo_height() // 2) - (popup_height // 2)
+        center_x = max(0, min(center_x, self.master.winfo_screenwidth() - popup_width))
+        center_y = max(0, min(center_y, self.master.winfo_screenheight() - popup_height))
+        popup.geometry(f'{popup_width}x{popup_height}+{center_x}+{center_y}')
+        # --- End position calculation ---
+
+        # Make it modal AFTER positioning
+        popup.grab_set()
+
+        self._export_cancel_event = threading.Event()
+        cancel_event = self._export_cancel_event
+        def cancel_export():
+            if cancel_event.is_set():
+                return
+            if messagebox.askyesno(self.translate("cancel_export_title"), self.translate("cancel_export_text"), parent=popup):
+                cancel_event.set()
+                label_var.set(self.translate("status_export_cancelling"))
+        popup.protocol("WM_DELETE_WINDOW", cancel_export)
+
+        def show_progress(text, done):
+            if not cancel_event.is_set():
+                label_var.set(str(text))
+                progress_bar.config(value=done)
+
+        def finish_export(future):
+            if tk.Toplevel.winfo_exists(popup):
+                popup.destroy()
+            setattr(self, popup_attr, None)
+            self._export_future = None
+            error = future.exception()
+            on_complete(None if error else future.result(), error)
+            self.on_selection_change(None)
+
+        def on_future_done(future):
+            # Runs on the export thread, finish_export follows on the next tick after the last progress
+            channel.call(finish_export, future)
+            channel.close()
+
+        # Only the newest progress is shown, the channel keeps one update per tick
+        channel = ProgressChannel()
+        self._pump_progress(channel, {'export_progress': show_progress})
+        if self._export_executor is None:
+            self._export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
+        future = self._export_executor.submit(export_func,
+                                              lambda text, done, total: channel.update('export_progress', text, done),
+                                              cancel_event.is_set)
+        self._export_future = future
+        future.add_done_callback(on_future_done)
+
+    def _on_collection_file_complete(self, kind, console_name, result, error):
+        """Main thread: reports the result of a RetroPie/Batocera collection export"""
+        collection_filename = get_collection_filename(kind, console_name)
+        if isinstance(error, ExportCancelled):
+            self.status_bar_text_var.set(self.translate("status_export_cancelled"))
+        elif isinstance(error, IOError):
+            messagebox.showerror(self.translate("collection_creation_save_error_title"), self.translate("collection_creation_save_error_text", error)) # Use translated text
+            self.status_bar_text_var.set(self.translate("status_collection_save_error")) # Use translated text
+        elif error is not None:
+            messagebox.showerror(self.translate("collection_creation_unexpected_error_title"), self.translate("collection_creation_unexpected_error_text", str(error))) # Use translated text
+            self.status_bar_text_var.set(self.translate("status_collection_unexpected_error")) # Use translated text
+        elif kind == 'retropie':
+            full_output_path, games_added_to_cfg = result
+            messagebox.showinfo(self.translate("collection_creation_success_title"),
+                self.translate("collection_creation_success_text", collection_filename, os.path.abspath(full_output_path), games_added_to_cfg)) # Use translated text
+            self.status_bar_text_var.set(self.translate("status_collection_created", collection_filename)) # Use translated text
+        else:
+            full_output_path, games_added_to_cfg = result
+            messagebox.showinfo(self.translate("collection_creation_success_title"), # Re-use same title
+                self.translate("batocera_collection_creation_success_text", collection_filename, os.path.abspath(full_output_path), games_added_to_cfg))
+            self.status_bar_text_var.set(self.translate("status_batocera_collection_created", collection_filename))
+
     def create_dat_file(self):
         """Create DAT file from cached or fresh data using clrmamepro format."""
         console_name = self.selected_console_id_var.get()
@@ -2057,7 +2187,7 @@ class RetroAchievementsDATGenerator:
         # Caching is always on, try loading from cache if not in memory
         if current_console_data is None or not current_console_data:
             # Load from cache (load_from_cache handles status updates)
-            current_console_data = self.load_from_cache(console_id_str) # Use string ID
+            current_console_data = self.load_from_cache(console_id_str, hash_details=False) # Use string ID
             if current_console_data is not None and isinstance(current_console_data, list):
                  self.cached_data[console_id_str] = current_console_data # Load into memory using string ID
             else:
@@ -2074,172 +2204,33 @@ class RetroAchievementsDATGenerator:
 
         # print(f"DEBUG: Creating DAT file for {console_name} with {len(current_console_data)} game entries...")
         self.status_bar_text_var.set(self.translate("status_dat_creation_start", console_name)) # Use translated text
-        # Disable all creation buttons during DAT creation
-        self.create_dat_button.config(state="disabled")
-        self.fetch_data_button.config(state="disabled")
-        self.create_retropie_collection_button.config(state="disabled") # Use the new variable
-        self.create_batocera_collection_button.config(state="disabled") # Use the new variable
-        self.master.update_idletasks()
-
-        total_games_in_dat = len(current_console_data)
-        games_with_hashes_count = 0
-        games_with_achievements_count = 0
-        dat_header = [
-            "clrmamepro (",
-            f"\tname \"{console_name} - RetroAchievements\"",
-            f"\tdescription \"{console_name} - RetroAchievements (RA Hashes - {datetime.now().strftime('%Y-%m-%d')})\"",
-            f"\tversion \"{datetime.now().strftime('%Y%m%d-%H%M%S')}\"",
-            f"\tcomment \"{self.translate('dat_comment')}\"", # Add this key
-            f"\tauthor \"{self.translate('dat_author')}\"", # Add this key
-            ")", ""
-        ]
-        game_entries_for_dat_file = []
-
-        # Use dat-specific progress popup variable
-        self._dat_progress_popup = tk.Toplevel(self.master) # Store reference
-        popup = self._dat_progress_popup # Use local name for convenience
-        popup.title(self.translate("dat_creation_progress_title")) # Use translated text
-        # Set initial size, position calculated later
-        dat_popup_width = 450
-        dat_popup_height = 130
-        popup.geometry(f"{dat_popup_width}x{dat_popup_height}")
-        popup.resizable(False, False)
-
-
-        # Use dat-specific label variable
-        self.dat_progress_label_var.set(self.translate("status_dat_creation_start", console_name)) # Use translated text
-        ttk.Label(popup, textvariable=self.dat_progress_label_var, wraplength=430).pack(pady=10, padx=10, fill="x")
-        dat_progress_bar = ttk.Progressbar(popup, orient="horizontal", length=430, mode="determinate")
-        dat_progress_bar.pack(pady=10, padx=10)
-        dat_progress_bar["maximum"] = total_games_in_dat
-
-        # --- Calculate and set dat popup position ---
-        self.master.update_idletasks() # Ensure main window geometry is up-to-date
-        main_width = self.master.winfo_width()
-        main_height = self.master.winfo_height()
-        main_x = self.master.winfo_x()
-        main_y = self.master.winfo_y()
-
-        center_x = main_x + (main_width // 2) - (dat_popup_width // 2)
-        center_y = main_y + (main_height // 2) - (dat_popup_height // 2)
-
-        screen_width = self.master.winfo_screenwidth()
-        screen_height = self.master.winfo_screenheight()
-        center_x = max(0, min(center_x, screen_width - dat_popup_width))
-        center_y = max(0, min(center_y, screen_height - dat_popup_height))
-
-        popup.geometry(f'{dat_popup_width}x{dat_popup_height}+{center_x}+{center_y}')
-        # --- End position calculation ---
-
-        # Make it modal AFTER positioning
-        popup.grab_set()
-        # Ensure popup is removed if closed via window manager
-        popup.protocol("WM_DELETE_WINDOW", popup.destroy) # DAT creation doesn't have a simple cancel
-
-        for index, game_data in enumerate(current_console_data):
-            game_title = game_data.get('title', f'Unbekanntes Spiel ID {game_data.get("id")}') # Keep fallback or translate
-            game_hashes = game_data.get('hashes', [])
-            extended_info = game_data.get('extended_info')
-
-            # Only include games that have at least one hash
-            if not game_hashes or not isinstance(game_hashes, list) or len(game_hashes) == 0:
-                 self.dat_progress_label_var.set(self.translate("dat_creation_skipping_no_hashes_progress", game_title[:40], index+1, total_games_in_dat)) # Use translated text
-                 dat_progress_bar["value"] = index + 1
-                 popup.update_idletasks()
-                 self.master.update_idletasks()
-                 continue
-
-            games_with_hashes_count += 1
-            if extended_info and extended_info.get('num_achievements', 0) > 0:
-                 games_with_achievements_count += 1
-
-            self.dat_progress_label_var.set(self.translate("dat_creation_processing_game_progress", game_title[:40], index+1, total_games_in_dat)) # Use translated text
-            dat_progress_bar["value"] = index + 1
-            popup.update_idletasks()
-            self.master.update_idletasks()
-
-
-            game_entry_lines = [
-                "\tgame ("
-            ]
-            # Sanitize game title for DAT name/description
-            game_title_sanitized = game_title.replace('"', "'").replace('&', 'and')
-            game_entry_lines.append(f'\t\tname "{game_title_sanitized}"')
-            game_entry_lines.append(f'\t\tdescription "{game_title_sanitized}"')
-
-            # Add extended info as comment if available and requested
-            comment_lines = []
-            if extended_info:
-                if self.include_achievements_var.get() and extended_info.get('num_achievements', 0) > 0:
-                    comment_lines.append(self.translate('dat_comment_achievements', extended_info.get('num_achievements', 0), extended_info.get('points', 0))) # Add this key
-                if self.include_patch_urls_var.get() and extended_info.get('patch_url'):
-                    comment_lines.append(self.translate('dat_comment_patch_url', extended_info.get('patch_url'), extended_info.get('patch_md5', 'N/A'))) # Add this key
-
-            if comment_lines:
-                 # Join comment lines, escaping internal quotes if necessary
-                 # Simple approach: replace " with ' inside comments
-                 combined_comment = " | ".join(comment_lines).replace('"', "'")
-                 game_entry_lines.append(f'\t\tcomment "{combined_comment}"')
-
-
-            for file_hash_data in game_hashes:
-                 if isinstance(file_hash_data, dict) and 'md5' in file_hash_data and file_hash_data.get('name'):
-                    md5_hash = file_hash_data['md5']
-                    filename = file_hash_data['name']
-                    # Sanitize filename for DAT entry - remove problematic characters
-                    allowed_chars_filename = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 -_.,()[]{}!@#$%^&\'~`+'
-                    sanitized_filename = "".join(c for c in filename if c in allowed_chars_filename)
-                    if not sanitized_filename: sanitized_filename = "unknown_file" # Fallback if sanitization results in empty string
-
-                    # Example: Add size="0" since RA API doesn't provide it easily with this call
-                    game_entry_lines.append("\t\trom (")
-                    game_entry_lines.append(f'\t\t\tname "{sanitized_filename}"')
-                    game_entry_lines.append(f'\t\t\tsize "0"') # Placeholder, size not available
-                    game_entry_lines.append(f'\t\t\tcrc "00000000"') # Placeholder, CRC not available
-                    game_entry_lines.append(f'\t\t\tmd5 "{md5_hash}"')
-                    game_entry_lines.append("\t\t)") # End rom
-
-
-            game_entry_lines.append("\t)") # End game
-            game_entries_for_dat_file.extend(game_entry_lines)
-
-
-        dat_filename = f"RetroAchievements - {console_name}.dat"
-        full_output_path = os.path.join(dat_file_dir, dat_filename)
-
-        try:
-            # No newline='' here as per user request - keep OS default
-            with open(full_output_path, "w", encoding="utf-8") as f: # Specify encoding
-                for line in dat_header:
-                    f.write(line + "\n") # Always write '\n' for line breaks in DAT
-                for line in game_entries_for_dat_file:
-                    f.write(line + "\n") # Always write '\n' for line breaks in DAT
-
-            # --- Fortschrittsfenster schließen BEVOR die MessageBox kommt ---
-            if hasattr(self, '_dat_progress_popup') and self._dat_progress_popup and tk.Toplevel.winfo_exists(self._dat_progress_popup):
-                self._dat_progress_popup.destroy()
-                self._dat_progress_popup = None
-            # --- Ende Schließen ---
-
+        include_achievements = self.include_achievements_var.get()
+        include_patch_urls = self.include_patch_urls_var.get()
+        self._run_export_task(
+            '_dat_progress_popup', self.translate("dat_creation_progress_title"), self.dat_progress_label_var,
+            self.translate("status_dat_creation_start", console_name), len(current_console_data),
+            lambda progress_callback, cancel_check: write_dat_file(
+                console_name, current_console_data, dat_file_dir, self.translate,
+                include_achievements=include_achievements, include_patch_urls=include_patch_urls,
+                progress_callback=progress_callback, cancel_check=cancel_check),
+            lambda result, error: self._on_dat_file_complete(console_name, result, error))
+
+    def _on_dat_file_complete(self, console_name, result, error):
+        """Main thread: reports the result of the DAT export (the progress popup is already closed)"""
+        dat_filename = get_dat_filename(console_name)
+        if isinstance(error, ExportCancelled):
+            self.status_bar_text_var.set(self.translate("status_export_cancelled"))
+        elif isinstance(error, IOError):
+            messagebox.showerror(self.translate("dat_creation_save_error_title"), self.translate("dat_creation_save_error_text", error)) # Use translated text
+            self.status_bar_text_var.set(self.translate("status_dat_save_error")) # Use translated text
+        elif error is not None:
+            messagebox.showerror(self.translate("dat_creation_unexpected_error_title"), self.translate("dat_creation_unexpected_error_text", str(error))) # Use translated text
+            self.status_bar_text_var.set(self.translate("status_dat_unexpected_error")) # Use translated text
+        else:
+            full_output_path, games_with_hashes_count, games_with_achievements_count = result
             messagebox.showinfo(self.translate("dat_creation_success_title"),
                                 self.translate("dat_creation_success_text", dat_filename, os.path.abspath(full_output_path), games_with_hashes_count, games_with_achievements_count)) # Use translated text
             self.status_bar_text_var.set(self.translate("status_dat_created", dat_filename)) # Use translated text
-            # print(f"DEBUG: DAT file created successfully with {games_with_hashes_count} games including hashes ({games_with_achievements_count} with achievements.)")
-
-        except IOError as e:
-            messagebox.showerror(self.translate("dat_creation_save_error_title"), self.translate("dat_creation_save_error_text", e)) # Use translated text
-            self.status_bar_text_var.set(self.translate("status_dat_save_error")) # Use translated text
-            # print(f"ERROR: Error writing DAT file: {e}")
-        except Exception as e_gen:
-            messagebox.showerror(self.translate("dat_creation_unexpected_error_title"), self.translate("dat_creation_unexpected_error_text", str(e_gen))) # Use translated text
-            self.status_bar_text_var.set(self.translate("status_dat_unexpected_error")) # Use translated text
-            # print(f"ERROR: Unexpected error creating DAT file: {e_gen}")
-        finally:
-             # Destroy progress popup here if it still exists (Fallback for errors)
-             if hasattr(self, '_dat_progress_popup') and self._dat_progress_popup and tk.Toplevel.winfo_exists(self._dat_progress_popup):
-                self._dat_progress_popup.destroy()
-                self._dat_progress_popup = None
-             self.on_selection_change(None)
 
 
     def create_retropie_collection(self):
@@ -2264,8 +2255,6 @@ class RetroAchievementsDATGenerator:
 
         # This path is used inside the CFG file, so it needs to be the RetroPie specific one
         collection_rom_base_path = retropie_rom_base
-
-        retropie_system_rom_path = os.path.join(collection_rom_base_path, system_short)
         collection_cfg_dir = self.collection_cfg_save_path.get()
 
 
@@ -2284,7 +2273,7 @@ class RetroAchievementsDATGenerator:
         current_console_data = self.cached_data.get(console_id_str) # Use string ID
          # Caching is always on, try loading from cache if not in memory
         if current_console_data is None or not current_console_data:
-            current_console_data = self.load_from_cache(console_id_str) # Use string ID
+            current_console_data = self.load_from_cache(console_id_str, hash_details=False) # Use string ID
             if current_console_data is not None and isinstance(current_console_data, list):
                  self.cached_data[console_id_str] = current_console_data # Load into memory using string ID
             else:
@@ -2299,12 +2288,8 @@ class RetroAchievementsDATGenerator:
             self.on_selection_change(None)
             return
 
-        games_with_achievements = []
-        for game_data in current_console_data:
-            extended_info = game_data.get('extended_info')
-            # Only include if game has achievements AND has hashes (meaning it's processable)
-            if extended_info and extended_info.get('num_achievements', 0) > 0 and game_data.get('hashes'):
-                 games_with_achievements.append(game_data)
+        # Only games that have achievements AND hashes (meaning they are processable)
+        games_with_achievements = filter_games_with_achievements(current_console_data)
 
 
         if not games_with_achievements:
@@ -2314,149 +2299,15 @@ class RetroAchievementsDATGenerator:
              return
 
         self.status_bar_text_var.set(self.translate("status_collection_creation_start", console_name)) # Use translated text
-        # Disable all creation buttons during process
-        self.create_dat_button.config(state="disabled")
-        self.fetch_data_button.config(state="disabled")
-        self.create_retropie_collection_button.config(state="disabled") # Disable this one too
-        self.create_batocera_collection_button.config(state="disabled") # Disable the other one too
-
-        self.master.update_idletasks()
-
-        # Use collection-specific progress popup variable (re-use the same popup)
-        self._collection_progress_popup = tk.Toplevel(self.master) # Store reference
-        popup = self._collection_progress_popup # Use local name for convenience
-        # Use generic title for both collection types
-        popup.title(self.translate("collection_creation_progress_title")) # Use translated text
-        # Set initial size, position calculated later
-        collection_popup_width = 450
-        collection_popup_height = 130
-        popup.geometry(f"{collection_popup_width}x{collection_popup_height}")
-        popup.resizable(False, False)
-
-
-        # Use collection-specific label variable
-        self.collection_progress_label_var.set(self.translate("status_collection_creation_start", console_name)) # Use translated text
-        ttk.Label(popup, textvariable=self.collection_progress_label_var, wraplength=430).pack(pady=10, padx=10, fill="x")
-        progress_bar = ttk.Progressbar(popup, orient="horizontal", length=430, mode="determinate")
-        progress_bar.pack(pady=10, padx=10)
-        progress_bar["maximum"] = len(games_with_achievements)
-
-        # --- Calculate and set collection popup position ---
-        self.master.update_idletasks() # Ensure main window geometry is up-to-date
-        main_width = self.master.winfo_width()
-        main_height = self.master.winfo_height()
-        main_x = self.master.winfo_x()
-        main_y = self.master.winfo_y()
-
-        center_x = main_x + (main_width // 2) - (collection_popup_width // 2)
-        center_y = main_y + (main_height // 2) - (collection_popup_height // 2)
-
-        screen_width = self.master.winfo_screenwidth()
-        screen_height = self.master.winfo_screenheight()
-        center_x = max(0, min(center_x, screen_width - collection_popup_width))
-        center_y = max(0, min(center_y, screen_height - collection_popup_height))
-
-        popup.geometry(f'{collection_popup_width}x{collection_popup_height}+{center_x}+{center_y}')
-        # --- End position calculation ---
-
-        # Make it modal AFTER positioning
-        popup.grab_set()
-        # Ensure popup is removed if closed via window manager
-        popup.protocol("WM_DELETE_WINDOW", popup.destroy) # Collection creation doesn't have a simple cancel
-
-
-        collection_filename = f"custom-RetroAchievements-{system_short}.cfg"
-        full_output_path = os.path.join(collection_cfg_dir, collection_filename)
-        games_added_to_cfg = 0
-
-        try:
-            # print(f"DEBUG: Writing RetroPie Collection file to: {full_output_path}")
-            # print(f"DEBUG: Using base ROM path for entries in CFG: {retropie_system_rom_path}")
-
-            # Get the desired extension from the variable
-            desired_extension = self.rom_extension_var.get().strip()
-            if not desired_extension.startswith('.'):
-                 desired_extension = '.' + desired_extension # Ensure it starts with a dot
-
-            # ### MODIFIED: Add newline='' to ensure LF line endings for CFG file ###
-            with open(full_output_path, "w", encoding="utf-8", newline='') as f: # Specify encoding and newline
-                for index, game_data in enumerate(games_with_achievements):
-                    game_title = game_data.get('title', f'Unbekanntes Spiel ID {game_data.get("id")}') # Keep fallback or translate
-                    game_hashes = game_data.get('hashes', [])
-                    self.collection_progress_label_var.set(self.translate("collection_creation_adding_game", game_title[:40], index+1, len(games_with_achievements))) # Use translated text
-                    progress_bar["value"] = index + 1
-                    popup.update_idletasks()
-                    self.master.update_idletasks()
-
-                    rom_filename = ""
-                    # Prioritize filename from hash data if available
-                    if game_hashes and isinstance(game_hashes, list):
-                         # Find the first hash entry with a filename
-                         for hash_entry in game_hashes:
-                             if isinstance(hash_entry, dict) and hash_entry.get('name'):
-                                 rom_filename = hash_entry['name']
-                                 # print(f"DEBUG: Using filename from hash entry: {rom_filename}")
-                                 break # Use the first found filename
-                    # If no filename in hash data, generate a fallback
-                    if not rom_filename:
-                        game_title_sanitized = game_title.replace('"', "'").replace('&', 'and')
-                        allowed_chars = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 -_.,()[]:\'#&!+'
-                        game_title_sanitized = "".join(c for c in game_title_sanitized if c in allowed_chars).strip()
-                        rom_name_base = "".join(c for c in game_title_sanitized if c.isalnum() or c in ' _-').strip()
-                        rom_name_base = rom_name_base.replace(" ", "_")
-                        if not rom_name_base: rom_name_base = f"game_{game_data.get('id', index)}" # Keep fallback or translate
-                        # OLD: rom_ext = self._get_typical_extension(console_name)
-                        # OLD: rom_filename = f"{rom_name_base}.{rom_ext}"
-                        # NEW: Use the determined rom_name_base without an extension yet
-                        rom_filename = rom_name_base
-                        # print(f"DEBUG: Generating fallback filename base: {rom_filename}")
-
-
-                    # ### MODIFIED: Use the value from the new rom_extension_var ###
-                    # Check if the filename already has an extension that matches the desired one
-                    base_name, existing_ext = os.path.splitext(rom_filename)
-                    if existing_ext.lower() != desired_extension.lower():
-                         # If it doesn't match, replace or add the desired extension
-                         rom_filename = base_name + desired_extension
-                    # else: The existing extension matches, use the filename as is.
-
-                    # print(f"DEBUG: Using final filename with desired extension: {rom_filename}")
-
-
-                    rom_path_in_cfg = f"{os.path.normpath(retropie_system_rom_path).replace(os.sep, '/')}/{os.path.normpath(rom_filename).replace(os.sep, '/')}"
-
-                    f.write(rom_path_in_cfg + "\n")
-                    games_added_to_cfg += 1
-                    # print(f"DEBUG: Added to CFG: {rom_path_in_cfg}")
-
-            # Destroy progress popup after creation loop - MOVED to finally block
-
-            # --- Fortschrittsfenster schließen BEVOR die MessageBox kommt ---
-            if hasattr(self, '_collection_progress_popup') and self._collection_progress_popup and tk.Toplevel.winfo_exists(self._collection_progress_popup):
-                self._collection_progress_popup.destroy()
-                self._collection_progress_popup = None
-            # --- Ende Schließen ---
-
-            # Updated success message key (generic)
-            messagebox.showinfo(self.translate("collection_creation_success_title"),
-                self.translate("collection_creation_success_text", collection_filename, os.path.abspath(full_output_path), games_added_to_cfg)) # Use translated text
-            self.status_bar_text_var.set(self.translate("status_collection_created", collection_filename)) # Use translated text
-            # print(f"DEBUG: Collection file created successfully with {games_added_to_cfg} entries.)
-
-        except IOError as e:
-            messagebox.showerror(self.translate("collection_creation_save_error_title"), self.translate("collection_creation_save_error_text", e)) # Use translated text
-            self.status_bar_text_var.set(self.translate("status_collection_save_error")) # Use translated text
-            # print(f"ERROR: Error writing collection file: {e}")
-        except Exception as e_gen:
-            messagebox.showerror(self.translate("collection_creation_unexpected_error_title"), self.translate("collection_creation_unexpected_error_text", str(e_gen))) # Use translated text
-            self.status_bar_text_var.set(self.translate("status_collection_unexpected_error")) # Use translated text
-            # print(f"ERROR: Unexpected error creating collection file: {e_gen}")
-        finally:
-             # Destroy progress popup here if it still exists (Fallback for errors)
-             if hasattr(self, '_collection_progress_popup') and self._collection_progress_popup and tk.Toplevel.winfo_exists(self._collection_progress_popup):
-                self._collection_progress_popup.destroy()
-                self._collection_progress_popup = None
-             self.on_selection_change(None)
+        rom_extension = self.rom_extension_var.get()
+        self._run_export_task(
+            '_collection_progress_popup', self.translate("collection_creation_progress_title"), self.collection_progress_label_var,
+            self.translate("status_collection_creation_start", console_name), len(games_with_achievements),
+            lambda progress_callback, cancel_check: write_collection_file(
+                'retropie', console_name, games_with_achievements, collection_cfg_dir,
+                collection_rom_base_path, rom_extension, self.translate,
+                progress_callback=progress_callback, cancel_check=cancel_check),
+            lambda result, error: self._on_collection_file_complete('retropie', console_name, result, error))
 
 
     def create_batocera_collection(self):
@@ -2481,8 +2332,6 @@ class RetroAchievementsDATGenerator:
 
         # This path is used inside the CFG file, so it needs to be the Batocera specific one
         collection_rom_base_path = batocera_rom_base
-
-        batocera_system_rom_path = os.path.join(collection_rom_base_path, system_short)
         collection_cfg_dir = self.collection_cfg_save_path.get()
 
 
@@ -2501,7 +2350,7 @@ class RetroAchievementsDATGenerator:
         current_console_data = self.cached_data.get(console_id_str) # Use string ID
          # Caching is always on, try loading from cache if not in memory
         if current_console_data is None or not current_console_data:
-            current_console_data = self.load_from_cache(console_id_str) # Use string ID
+            current_console_data = self.load_from_cache(console_id_str, hash_details=False) # Use string ID
             if current_console_data is not None and isinstance(current_console_data, list):
                  self.cached_data[console_id_str] = current_console_data # Load into memory using string ID
             else:
@@ -2516,12 +2365,8 @@ class RetroAchievementsDATGenerator:
             self.on_selection_change(None)
             return
 
-        games_with_achievements = []
-        for game_data in current_console_data:
-            extended_info = game_data.get('extended_info')
-            # Only include if game has achievements AND has hashes (meaning it's processable)
-            if extended_info and extended_info.get('num_achievements', 0) > 0 and game_data.get('hashes'):
-                 games_with_achievements.append(game_data)
+        # Only games that have achievements AND hashes (meaning they are processable)
+        games_with_achievements = filter_games_with_achievements(current_console_data)
 
 
         if not games_with_achievements:
@@ -2533,158 +2378,98 @@ class RetroAchievementsDATGenerator:
 
         # Updated status message key for Batocera
         self.status_bar_text_var.set(self.translate("status_batocera_collection_creation_start", console_name)) # Add this new key
-        # Disable all creation buttons during process
-        self.create_dat_button.config(state="disabled")
-        self.fetch_data_button.config(state="disabled")
-        self.create_retropie_collection_button.config(state="disabled")
-        self.create_batocera_collection_button.config(state="disabled") # Disable this one too
-
-        self.master.update_idletasks()
-
-        # Use collection-specific progress popup variable (re-use the same popup)
-        self._collection_progress_popup = tk.Toplevel(self.master) # Store reference
-        popup = self._collection_progress_popup # Use local name for convenience
-        # Updated progress title key for Batocera
-        popup.title(self.translate("batocera_collection_creation_progress_title")) # Add this new key
-        # Set initial size, position calculated later
-        collection_popup_width = 450
-        collection_popup_height = 130
-        popup.geometry(f"{collection_popup_width}x{collection_popup_height}")
-        popup.resizable(False, False)
-
-
-        # Use collection-specific label variable
-        self.collection_progress_label_var.set(self.translate("status_batocera_collection_creation_start", console_name)) # Use the new key
-        ttk.Label(popup, textvariable=self.collection_progress_label_var, wraplength=430).pack(pady=10, padx=10, fill="x")
-        progress_bar = ttk.Progressbar(popup, orient="horizontal", length=430, mode="determinate")
-        progress_bar.pack(pady=10, padx=10)
-        progress_bar["maximum"] = len(games_with_achievements)
-
-        # --- Calculate and set collection popup position ---
-        self.master.update_idletasks() # Ensure main window geometry is up-to-date
-        main_width = self.master.winfo_width()
-        main_height = self.master.winfo_height()
-        main_x = self.master.winfo_x()
-        main_y = self.master.winfo_y()
-
-        center_x = main_x + (main_width // 2) - (collection_popup_width // 2)
-        center_y = main_y + (main_height // 2) - (collection_popup_height // 2)
-
-        screen_width = self.master.winfo_screenwidth()
-        screen_height = self.master.winfo_screenheight()
-        center_x = max(0, min(center_x, screen_width - collection_popup_width))
-        center_y = max(0, min(center_y, screen_height - collection_popup_height))
-
-        popup.geometry(f'{collection_popup_width}x{collection_popup_height}+{center_x}+{center_y}')
-        # --- End position calculation ---
-
-        # Make it modal AFTER positioning
-        popup.grab_set()
-        # Ensure popup is removed if closed via window manager
-        popup.protocol("WM_DELETE_WINDOW", popup.destroy) # Collection creation doesn't have a simple cancel
-
+        rom_extension = self.rom_extension_var.get()
+        self._run_export_task(
+            '_collection_progress_popup', self.translate("batocera_collection_creation_progress_title"), self.collection_progress_label_var,
+            self.translate("status_batocera_collection_creation_start", console_name), len(games_with_achievements),
+            lambda progress_callback, cancel_check: write_collection_file(
+                'batocera', console_name, games_with_achievements, collection_cfg_dir,
+                collection_rom_base_path, rom_extension, self.translate,
+                progress_callback=progress_callback, cancel_check=cancel_check),
+            lambda result, error: self._on_collection_file_complete('batocera', console_name, result, error))
+
+
+    def create_all_files(self):
+        """Create the DAT file and the RetroPie/Batocera collections in one pass over the console data.
+
+        Every output whose save location (and ROM path for the collections) is set is written,
+        the others are skipped.
+        """
+        console_name = self.selected_console_id_var.get()
+        console_id = self.console_name_to_id_map.get(console_name)
+        if not console_id:
+            messagebox.showerror(self.translate("dat_creation_invalid_console_error_title"), self.translate("dat_creation_invalid_console_error_text"))
+            return
 
-        # Renamed filename for clarity (Batocera specific)
-        collection_filename = f"custom-RetroAchievements-{system_short}-batocera.cfg" # Added -batocera
-        full_output_path = os.path.join(collection_cfg_dir, collection_filename)
-        games_added_to_cfg = 0
+        console_id_str = str(console_id)
+        current_console_data = self.cached_data.get(console_id_str)
+        if current_console_data is None or not current_console_data:
+            current_console_data = self.load_from_cache(console_id_str, hash_details=False)
+            if current_console_data is not None and isinstance(current_console_data, list):
+                self.cached_data[console_id_str] = current_console_data
+            else:
+                messagebox.showwarning(self.translate("dat_creation_no_data_warning_title"), self.translate("dat_creation_no_data_warning_text", console_name))
+                self.on_selection_change(None)
+                return
+        if not current_console_data:
+            messagebox.showinfo(self.translate("dat_creation_no_data_info_title"), self.translate("dat_creation_no_data_info_text", console_name))
+            self.status_bar_text_var.set(self.translate("status_no_data_for_dat", console_name))
+            self.on_selection_change(None)
+            return
 
-        try:
-            # print(f"DEBUG: Writing Batocera Collection file to: {full_output_path}")
-            # print(f"DEBUG: Using base ROM path for entries in CFG: {batocera_system_rom_path}")
-
-            # Get the desired extension from the variable
-            desired_extension = self.rom_extension_var.get().strip()
-            if not desired_extension.startswith('.'):
-                 desired_extension = '.' + desired_extension # Ensure it starts with a dot
-
-
-            # ### MODIFIED: Add newline='' to ensure LF line endings for CFG file ###
-            with open(full_output_path, "w", encoding="utf-8", newline='') as f: # Specify encoding and newline
-                for index, game_data in enumerate(games_with_achievements):
-                    game_title = game_data.get('title', f'Unbekanntes Spiel ID {game_data.get("id")}') # Keep fallback or translate
-                    game_hashes = game_data.get('hashes', [])
-                    # Updated progress message key for Batocera
-                    self.collection_progress_label_var.set(self.translate("batocera_collection_creation_adding_game", game_title[:40], index+1, len(games_with_achievements))) # Add this new key
-                    progress_bar["value"] = index + 1
-                    popup.update_idletasks()
-                    self.master.update_idletasks()
-
-                    rom_filename = ""
-                    # Prioritize filename from hash data if available
-                    if game_hashes and isinstance(game_hashes, list):
-                         # Find the first hash entry with a filename
-                         for hash_entry in game_hashes:
-                             if isinstance(hash_entry, dict) and hash_entry.get('name'):
-                                 rom_filename = hash_entry['name']
-                                 # print(f"DEBUG: Using filename from hash entry: {rom_filename}")
-                                 break # Use the first found filename
-                    # If no filename in hash data, generate a fallback
-                    if not rom_filename:
-                        game_title_sanitized = game_title.replace('"', "'").replace('&', 'and')
-                        allowed_chars = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 -_.,()[]:\'#&!+'
-                        game_title_sanitized = "".join(c for c in game_title_sanitized if c in allowed_chars).strip()
-                        rom_name_base = "".join(c for c in game_title_sanitized if c.isalnum() or c in ' _-').strip()
-                        rom_name_base = rom_name_base.replace(" ", "_")
-                        if not rom_name_base: rom_name_base = f"game_{game_data.get('id', index)}" # Keep fallback or translate
-                        # OLD: rom_ext = self._get_typical_extension(console_name) # No longer needed here
-                        # OLD: rom_filename = f"{rom_name_base}.{rom_ext}"
-                        # NEW: Use the determined rom_name_base without an extension yet
-                        rom_filename = rom_name_base
-                        # print(f"DEBUG: Generating fallback filename base: {rom_filename}")
-
-
-                    # ### MODIFIED: Use the value from the new rom_extension_var ###
-                    # Check if the filename already has an extension that matches the desired one
-                    base_name, existing_ext = os.path.splitext(rom_filename)
-                    if existing_ext.lower() != desired_extension.lower():
-                         # If it doesn't match, replace or add the desired extension
-                         rom_filename = base_name + desired_extension
-                    # else: The existing extension matches, use the filename as is.
-
-                    # print(f"DEBUG: Using final filename with desired extension: {rom_filename}")
-
-
-                    rom_path_in_cfg = f"{os.path.normpath(batocera_system_rom_path).replace(os.sep, '/')}/{os.path.normpath(rom_filename).replace(os.sep, '/')}"
-
-                    f.write(rom_path_in_cfg + "\n")
-                    games_added_to_cfg += 1
-                    # print(f"DEBUG: Added to CFG: {rom_path_in_cfg}")
-
-            # Destroy progress popup after creation loop - MOVED to finally block
-
-            # --- Fortschrittsfenster schließen BEVOR die MessageBox kommt ---
-            if hasattr(self, '_collection_progress_popup') and self._collection_progress_popup and tk.Toplevel.winfo_exists(self._collection_progress_popup):
-                self._collection_progress_popup.destroy()
-                self._collection_progress_popup = None
-            # --- Ende Schließen ---
-
-            # Updated success message key for Batocera
-            messagebox.showinfo(self.translate("collection_creation_success_title"), # Re-use same title
-                self.translate("batocera_collection_creation_success_text", collection_filename, os.path.abspath(full_output_path), games_added_to_cfg)) # Add this new key
-            # Updated status message key for Batocera
-            self.status_bar_text_var.set(self.translate("status_batocera_collection_created", collection_filename)) # Add this new key
-            # print(f"DEBUG: Batocera Collection file created successfully with {games_added_to_cfg} entries.)
+        # The sinks read the Tk variables here, on the main thread
+        sinks = []
+        dat_file_dir = self.dat_save_path.get()
+        if dat_file_dir and os.path.isdir(dat_file_dir):
+            sinks.append(DatSink(console_name, dat_file_dir, self.translate,
+                                 self.include_achievements_var.get(), self.include_patch_urls_var.get()))
+        collection_cfg_dir = self.collection_cfg_save_path.get()
+        if collection_cfg_dir and os.path.isdir(collection_cfg_dir) and self._get_system_short_name(console_name) \
+           and filter_games_with_achievements(current_console_data):
+            rom_extension = self.rom_extension_var.get()
+            for kind, rom_base in (('retropie', self.retropie_base_path.get().strip()),
+                                   ('batocera', self.batocera_base_path.get().strip())):
+                if rom_base:
+                    sinks.append(CollectionSink(kind, console_name, collection_cfg_dir, rom_base, rom_extension))
+        if not sinks:
+            messagebox.showinfo(self.translate("info_title"), self.translate("export_all_no_target_text"))
+            self.on_selection_change(None)
+            return
 
-        except IOError as e:
-            messagebox.showerror(self.translate("collection_creation_save_error_title"), self.translate("collection_creation_save_error_text", e)) # Use translated text
-            self.status_bar_text_var.set(self.translate("status_collection_save_error")) # Use translated text
-            # print(f"ERROR: Error writing collection file: {e}")
-        except Exception as e_gen:
-            messagebox.showerror(self.translate("collection_creation_unexpected_error_title"), self.translate("collection_creation_unexpected_error_text", str(e_gen))) # Use translated text
-            self.status_bar_text_var.set(self.translate("status_collection_unexpected_error")) # Use translated text
-            # print(f"ERROR: Unexpected error creating collection file: {e_gen}")
-        finally:
-             # Destroy progress popup here if it still exists (Fallback for errors)
-             if hasattr(self, '_collection_progress_popup') and self._collection_progress_popup and tk.Toplevel.winfo_exists(self._collection_progress_popup):
-                self._collection_progress_popup.destroy()
-                self._collection_progress_popup = None
-             self.on_selection_change(None)
+        self.status_bar_text_var.set(self.translate("status_dat_creation_start", console_name))
+        self._run_export_task(
+            '_dat_progress_popup', self.translate("export_all_progress_title"), self.dat_progress_label_var,
+            self.translate("status_dat_creation_start", console_name), len(current_console_data),
+            lambda progress_callback, cancel_check: ExportPlan(current_console_data, sinks, self.translate).run(
+                progress_callback, cancel_check),
+            lambda result, error: self._on_all_files_complete(console_name, result, error))
+
+    def _on_all_files_complete(self, console_name, result, error):
+        """Main thread: reports the outputs of create_all_files ({sink name: (result, error)})"""
+        if isinstance(error, ExportCancelled):
+            self.status_bar_text_var.set(self.translate("status_export_cancelled"))
+            return
+        if error is not None:
+            messagebox.showerror(self.translate("dat_creation_unexpected_error_title"), self.translate("dat_creation_unexpected_error_text", str(error)))
+            self.status_bar_text_var.set(self.translate("status_dat_unexpected_error"))
+            return
+        written = [os.path.abspath(sink_result[0]) for sink_result, sink_error in result.values() if sink_error is None]
+        failed = [str(sink_error) for _, sink_error in result.values() if sink_error is not None]
+        if written:
+            messagebox.showinfo(self.translate("export_all_success_title"),
+                                self.translate("export_all_success_text", console_name, "\n".join(written)))
+        if failed:
+            messagebox.showerror(self.translate("dat_creation_save_error_title"),
+                                 self.translate("export_all_failed_text", "\n".join(failed)))
+        self.status_bar_text_var.set(self.translate("status_dat_created", ", ".join(os.path.basename(path) for path in written)))
 
 
 def main():
     """Main function to initialize and run the Tkinter application."""
     root = None # Ensure root is defined before try block in case of very early error
+    # python RADATool.py --startup-benchmark prints the time to the first drawn window and exits
+    startup_benchmark = '--startup-benchmark' in sys.argv[1:]
+    imports_done = time.perf_counter()
     try:
         root = tk.Tk()
         window_width = 650
@@ -2699,6 +2484,13 @@ def main():
         root.minsize(window_width, window_height) # Set minsize to initial size
 
         app = RetroAchievementsDATGenerator(root)
+        if startup_benchmark:
+            def report_startup_time():
+                root.update_idletasks() # The window is drawn once this returns
+                print(f"Time to first window: {(time.perf_counter() - _STARTED) * 1000:.0f} ms "
+                      f"(imports {(imports_done - _STARTED) * 1000:.0f} ms)")
+                root.destroy()
+            root.after_idle(report_startup_time)
         root.mainloop()
     except Exception as e:
         import traceback
@@ -2708,7 +2500,7 @@ def main():
             # Try to use Tkinter messagebox if root was successfully created, otherwise just print
             if root and tk.Tk.winfo_exists(root):
                 # Check if app instance was created and translations are loaded
-                if 'app' in locals() and hasattr(app, 'translations') and 'critical_error_title' in app.translations:
+                if 'app' in locals() and hasattr(app, 'message_catalog') and 'critical_error_title' in app.message_catalog:
                      translated_title = app.translate("critical_error_title")
                      translated_text = app.translate("critical_error_text", str(e), traceback.format_exc())
                      messagebox.showerror(translated_title, translated_text, parent=None)
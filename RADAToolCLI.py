@@ -0,0 +1,552 @@
+"""Headless command line interface for RADATool (no Tk), e.g. for cron jobs on a server.
+
+Uses the same settings.ini, cache/ and lang/ folders as the GUI:
+
+    python RADAToolCLI.py consoles
+    python RADAToolCLI.py fetch 7 "Game Boy" --incremental --export dat,retropie
+    python RADAToolCLI.py fetch --all --export dat,retropie,batocera
+    python RADAToolCLI.py export --all --export dat
+    python RADAToolCLI.py lookup d145af52544bd98c31a2da8956402b51
+    python RADAToolCLI.py scan /mnt/roms/nes --console 7 --collection retropie
+"""
+import argparse
+import configparser
+import os
+import signal
+import sys
+
+from ra_api import (API_USER_PROFILE_URL, API_CONSOLE_IDS_URL,
+                    ApiClient, ApiHttpClient, ApiRequestCancelled, ApiRequestError, RateLimiter)
+from ra_cache import CACHE_BACKENDS, open_cache_store
+from ra_config import read_settings
+from ra_export import ExportCancelled, ExportPlan, build_export_sinks, configure_console_names, get_collection_filename
+from ra_fetch import BatchFetchPipeline, GameFetchEngine, load_console_job
+from ra_http_cache import ApiResponseCache
+from ra_i18n import MessageCatalog, load_catalog
+from ra_index import HashIndex, normalize_md5
+from ra_library import MANIFEST_FILENAME, LibraryExporter, write_export_manifest
+from ra_scan import RomHashCache, RomScanner, match_scanned_files
+from ra_telemetry import RequestTelemetry, format_summary
+
+EXPORT_FORMATS = ('dat', 'retropie', 'batocera')
+
+# Exit codes
+EXIT_OK = 0
+EXIT_FAILED = 1 # at least one console could not be fetched or exported (lookup: a hash had no match)
+EXIT_USAGE = 2
+EXIT_CANCELLED = 130
+
+
+class HeadlessRADATool:
+    """Fetch and export of console data without any UI, driven by RADAToolCLI.main()."""
+
+    def __init__(self, args):
+        self.script_dir = os.path.dirname(os.path.abspath(sys.argv[0]))
+        self.config_file = args.config or os.path.join(self.script_dir, "settings.ini")
+        self.cache_dir = os.path.join(self.script_dir, "cache")
+        self.lang_dir = os.path.join(self.script_dir, "lang")
+        self.quiet = args.quiet
+
+        config = configparser.ConfigParser()
+        config.read(self.config_file, encoding='utf-8')
+        self.settings = read_settings(config, self.script_dir)
+        # Command line options override settings.ini
+        for key in ('username', 'api_key', 'language', 'max_workers', 'requests_per_second', 'cache_backend'):
+            value = getattr(args, key, None)
+            if value is not None:
+                self.settings[key] = value
+        configure_console_names(self.settings['system_short_names'], self.settings['typical_extensions'])
+
+        # The ini files store line breaks as a literal \n
+        self.message_catalog = (load_catalog(self.lang_dir, self.settings['language'], self.cache_dir, unescape_newlines=True)
+                                or load_catalog(self.lang_dir, 'en', self.cache_dir, unescape_newlines=True)
+                                or MessageCatalog({}))
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.cache_store = open_cache_store(self.cache_dir, self.settings['cache_backend'])
+        self.rate_limiter = RateLimiter(self.settings['requests_per_second'])
+        self.http_client = ApiHttpClient(self.settings['http_pool_size'])
+        # Same logs/api_requests.jsonl as the GUI
+        self.telemetry = RequestTelemetry(os.path.join(self.script_dir, "logs"))
+        # --no-api-cache asks the server for everything, but still refreshes the cached responses
+        self.response_cache = ApiResponseCache(self.cache_dir, self.settings['api_cache_ttls'],
+                                               revalidate=getattr(args, 'no_api_cache', False))
+        self.api_client = ApiClient(self.http_client, self.rate_limiter, log_func=self.log, telemetry=self.telemetry,
+                                    response_cache=self.response_cache)
+        self.console_id_to_name_map = {}
+        self.cancelled = False
+
+    def translate(self, key, *args):
+        return self.message_catalog.format(key, *args)
+
+    def log(self, message):
+        """Progress and debug output, suppressed with --quiet."""
+        if not self.quiet:
+            print(message, file=sys.stderr)
+
+    def report(self, message):
+        """Results and errors, always printed."""
+        print(message)
+
+    def close(self):
+        self.http_client.close()
+        self.telemetry.close()
+
+    def _on_api_status(self, key, *args):
+        # Every request would be too chatty, only show waits and retries
+        if key != "status_requesting_api":
+            self.log(self.translate(key, *args))
+
+    def request(self, url, params=None, cancel_check=None, raise_errors=False):
+        """Authenticated API request; returns the JSON data, or None after reporting the error.
+
+        With raise_errors the reported error is raised again (for the GameFetchEngine).
+        """
+        try:
+            return self.api_client.request(url, params=params,
+                                           credentials=(self.settings['username'], self.settings['api_key']),
+                                           status_callback=self._on_api_status, cancel_check=cancel_check)
+        except ApiRequestCancelled:
+            if raise_errors:
+                raise
+            return None # Interrupted, the caller checks self.cancelled
+        except ApiRequestError as e:
+            message_key, message_args = e.message
+            self.report(f"{self.translate(e.title_key)}: {self.translate(message_key, *message_args)}")
+            if raise_errors:
+                raise
+            return None
+
+    def login(self):
+        if not self.settings['username'] or not self.settings['api_key']:
+            self.report(self.translate("login_failed_input_missing"))
+            return False
+        self.log(self.translate("login_testing"))
+        data = self.request(API_USER_PROFILE_URL, params={'u': self.settings['username']})
+        if data and isinstance(data, dict) and "User" in data and data["User"].lower() == self.settings['username'].lower():
+            return True
+        if data is None:
+            error_reason = self.translate("login_failed_api_none")
+        elif isinstance(data, dict) and "User" not in data:
+            error_reason = self.translate("login_failed_api_no_user", str(data)[:100])
+        elif isinstance(data, dict):
+            error_reason = self.translate("login_failed_api_user_mismatch", data.get('User'))
+        else:
+            error_reason = self.translate("login_failed_api_unexpected_format", str(data)[:100])
+        self.report(self.translate("login_failed_reason", error_reason))
+        return False
+
+    def load_consoles(self):
+        """Fills console_id_to_name_map from the API; returns False on errors."""
+        consoles_raw = self.request(API_CONSOLE_IDS_URL)
+        if not isinstance(consoles_raw, list):
+            self.report(self.translate("status_consoles_loading_error"))
+            return False
+        self.console_id_to_name_map = {str(item['ID']): str(item['Name']) for item in consoles_raw
+                                       if isinstance(item, dict) and 'Name' in item and 'ID' in item}
+        return True
+
+    def resolve_consoles(self, specs, use_all=False, cached_only=False):
+        """Maps console IDs or (case-insensitive) names to [(id, name)]; unknown specs are reported."""
+        if use_all:
+            console_ids = self.cache_store.cached_console_ids() if cached_only else sorted(self.console_id_to_name_map, key=int)
+            return [(console_id, self.console_id_to_name_map.get(console_id, console_id)) for console_id in console_ids]
+        name_to_id = {name.lower(): console_id for console_id, name in self.console_id_to_name_map.items()}
+        consoles = []
+        for spec in specs:
+            console_id = spec if spec in self.console_id_to_name_map else name_to_id.get(spec.lower())
+            if console_id is None:
+                self.report(f"Unknown console: {spec}")
+                continue
+            consoles.append((console_id, self.console_id_to_name_map[console_id]))
+        return consoles
+
+    def load_cache(self, console_id):
+        """Cached records of a console for exporting, or None if there is no valid cache."""
+        try:
+            return self.cache_store.load(console_id, hash_details=False)
+        except (OSError, ValueError) as e:
+            self.log(self.translate("cache_load_error_general", self.cache_store.get_cache_filename(console_id), str(e)))
+            return None
+
+    def fetch_consoles(self, consoles, refresh, export_formats=()):
+        """Fetches the consoles into their cache files (same flow as the GUI fetch) and exports each one
+        as soon as it is saved; returns False if any console failed.
+
+        refresh is 'cached' (like the GUI: use an existing cache file as is), 'incremental' or 'full'.
+        All downloads share one BatchFetchPipeline, so there is no idle time between consoles.
+        """
+        ok = True
+        names = dict(consoles)
+        to_fetch = []
+        for console_id, console_name in consoles:
+            cached_records = self.load_cache(console_id) if refresh == 'cached' else None
+            if cached_records is not None:
+                self.report(self.translate("data_fetch_cache_loaded_status", console_name))
+                if export_formats and not self.export_console(console_id, console_name, export_formats, cached_records):
+                    ok = False
+            else:
+                to_fetch.append(console_id)
+        if not to_fetch:
+            return ok
+        self.telemetry.start_run()
+
+        def prepare_job(console_id):
+            console_name = names[console_id]
+            self.log(self.translate("status_data_fetch_start", console_name))
+            job = load_console_job(self.request, self.cache_store, console_id, refresh == 'incremental',
+                                   self.settings['include_achievements'], self.settings['include_patch_urls'])
+            if job is None:
+                self.report(self.translate("api_error_fetch_games_none", console_name))
+            elif job.delta_plan is not None:
+                self.log(self.translate("data_fetch_delta_summary", console_name, len(job.delta_plan.to_fetch),
+                                        len(job.delta_plan.removed_ids), len(job.delta_plan.unchanged_ids)))
+            return job
+
+        def on_progress(console_id, done, total, game_title, batch_done, batch_total):
+            # Keep the log short: every 10% of a console and its last game
+            if done == total or done % max(1, total // 10) == 0:
+                self.log(f"{self.translate('data_fetch_processing_game', done, total, names[console_id])} "
+                         f"[{batch_done}/{batch_total}] ({self.rate_limiter.current_rate:.1f} req/s)")
+
+        def on_console_done(console_id, job, records, consoles_done, consoles_total):
+            nonlocal ok
+            console_name = names[console_id]
+            if records is None:
+                ok = False
+                return
+            if job.failed_ids:
+                # Not saved, the journal keeps the fetched games and the next fetch retries the failed ones
+                self.report(self.translate("data_fetch_games_failed", len(job.failed_ids), console_name))
+                ok = False
+                return
+            try:
+                self.cache_store.save(console_id, records)
+            except (OSError, TypeError) as e:
+                self.report(self.translate("cache_io_error", self.cache_store.get_cache_filename(console_id), str(e)))
+                ok = False
+                return
+            job.discard_journal()
+            self.report(self.translate("data_fetch_completed_text", console_name, len(records)))
+            if export_formats and not self.export_console(console_id, console_name, export_formats, records):
+                ok = False
+
+        engine = GameFetchEngine(
+            lambda url, params, cancel_check=None: self.request(url, params=params, cancel_check=cancel_check,
+                                                                raise_errors=True),
+            max_workers=self.settings['max_workers'],
+            include_achievements=self.settings['include_achievements'],
+            include_patch_urls=self.settings['include_patch_urls'],
+            cancel_check=lambda: self.cancelled,
+            log_func=self.log
+        )
+        pipeline = BatchFetchPipeline(engine, prepare_job, log_func=self.log)
+        pipeline.run(to_fetch, progress_callback=on_progress, console_done_callback=on_console_done,
+                     skip_callback=lambda console_id, reason_key, *details: self.log(self.translate(reason_key, *details)))
+        summary = self.telemetry.write_summary(console_ids=to_fetch, cancelled=self.cancelled)
+        self.log(format_summary(summary, self.translate))
+        if self.cancelled:
+            self.report(self.translate("status_fetch_cancelled_resumable"))
+            return False
+        return ok
+
+    def export_console(self, console_id, console_name, formats, records=None, rom_files=None):
+        """Writes the requested export formats for one console; returns False if any of them failed.
+
+        rom_files ({game_id: [relative path]} of a ROM scan) limits the collections to local files.
+        """
+        if records is None:
+            records = self.load_cache(console_id)
+        if not records:
+            self.report(self.translate("dat_creation_no_data_warning_text", console_name))
+            return False
+
+        # All formats are written in one pass over the records
+        sinks, skipped = build_export_sinks(console_name, records, formats, self.settings, self.translate, rom_files)
+        for _ in skipped:
+            self.report(self.translate("collection_no_achievements_info_text", console_name))
+        if not sinks:
+            return True
+        try:
+            outcomes = ExportPlan(records, sinks, self.translate).run(cancel_check=lambda: self.cancelled)
+        except ExportCancelled:
+            return False
+        return self.report_export_outcomes(console_name, outcomes)
+
+    def report_export_outcomes(self, console_name, outcomes):
+        """Prints the {format: (result, error)} of an ExportPlan; returns False if a format failed."""
+        ok = True
+        for export_format, (result, error) in outcomes.items():
+            if error is not None:
+                error_key = "dat_creation_save_error_text" if export_format == 'dat' else "collection_creation_save_error_text"
+                self.report(self.translate(error_key, error))
+                ok = False
+            elif export_format == 'dat':
+                full_output_path, games_with_hashes_count, games_with_achievements_count = result
+                self.report(self.translate("dat_creation_success_text", os.path.basename(full_output_path),
+                                           os.path.abspath(full_output_path), games_with_hashes_count,
+                                           games_with_achievements_count))
+            else:
+                full_output_path, games_added_to_cfg = result
+                success_key = "collection_creation_success_text" if export_format == 'retropie' else "batocera_collection_creation_success_text"
+                self.report(self.translate(success_key, get_collection_filename(export_format, console_name),
+                                           os.path.abspath(full_output_path), games_added_to_cfg))
+        return ok
+
+    def export_library(self, consoles, formats, max_workers=None, manifest_path=None):
+        """Exports many consoles on a process pool (one console per worker, see ra_library) and
+        writes the manifest; returns False if any console failed.
+        """
+        # The workers only need the export options, not the credentials
+        settings = {key: value for key, value in self.settings.items() if key not in ('username', 'api_key')}
+        exporter = LibraryExporter(self.cache_dir, self.settings['cache_backend'], self.message_catalog, settings, max_workers)
+        ok = True
+
+        def on_result(summary, done, total):
+            nonlocal ok
+            self.log(f"[{done}/{total}] {summary['console_name']} ({summary['seconds']:.2f}s)")
+            if summary['error'] is not None:
+                self.report(summary['error'])
+                ok = False
+            for _ in summary['skipped']:
+                self.report(self.translate("collection_no_achievements_info_text", summary['console_name']))
+            if not self.report_export_outcomes(summary['console_name'], summary['outcomes']):
+                ok = False
+
+        summaries = exporter.run(consoles, formats, on_result, cancel_check=lambda: self.cancelled)
+        manifest_path = manifest_path or os.path.join(self.settings['dat_save_path'], MANIFEST_FILENAME)
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+            write_export_manifest(manifest_path, summaries, formats)
+        except OSError as e:
+            self.report(f"Could not write the export manifest: {e}")
+            return False
+        self.report(f"Export manifest: {os.path.abspath(manifest_path)}")
+        return ok
+
+    def lookup(self, md5s, label=None, console_id=None):
+        """Prints the cached games of the hashes (or of a label) as tab separated lines;
+        returns False if a hash has no match.
+        """
+        hash_index = HashIndex(self.cache_dir)
+        reindexed = hash_index.sync(self.cache_store, self.console_id_to_name_map)
+        if reindexed:
+            self.log(f"Indexed {reindexed} cached console(s)")
+        if label is not None:
+            matches = hash_index.lookup_label(label, console_id)
+        else:
+            matches_by_md5 = hash_index.lookup_many(md5s)
+            matches = [match for matches in matches_by_md5.values() for match in matches
+                       if console_id is None or match['console_id'] == console_id]
+        for match in matches:
+            self.report('\t'.join([match['md5'], match['console_id'], match['console_name'], match['game_id'],
+                                   match['title'] or '', match['name'] or '']))
+        if label is not None:
+            return bool(matches)
+        found = {match['md5'] for match in matches}
+        missing = [md5 for md5 in dict.fromkeys(normalize_md5(md5) for md5 in md5s) if md5 not in found]
+        for md5 in missing:
+            self.log(f"No match: {md5}")
+        return not missing
+
+    def scan(self, rom_dir, console_id=None, extensions=None, max_workers=None, rehash=False):
+        """Hashes the files of rom_dir and prints one tab separated line per file:
+        status (achievements / match / unmatched / error), relative path, md5, console ID, game ID, title
+        and, for the ROMs inside .zip/.7z files, the name in the archive.
+
+        The files are hashed like RetroAchievements does for console_id (ra_hash); without a
+        console, the method is chosen by file extension. MD5s of unchanged files are reused from
+        earlier scans unless rehash is set.
+        Returns the ScanReport, or None if rom_dir is not a folder.
+        """
+        if not os.path.isdir(rom_dir):
+            self.report(f"Not a folder: {rom_dir}")
+            return None
+        hash_index = HashIndex(self.cache_dir)
+        hash_index.sync(self.cache_store, self.console_id_to_name_map)
+
+        def on_progress(path, done, total):
+            if done % 100 == 0 or done == total:
+                self.log(f"Hashed {done}/{total} files")
+        hash_cache = RomHashCache(self.cache_dir)
+        if rehash:
+            # Forget everything below rom_dir
+            hash_cache.prune(rom_dir, ())
+        scanner = RomScanner(max_workers, hash_cache=hash_cache, console_id=console_id)
+        scanned_files = scanner.scan(rom_dir, extensions, on_progress, lambda: self.cancelled)
+        self.log(f"{sum(1 for f in scanned_files if f['cached'])} of {len(scanned_files)} files unchanged since the last scan")
+        report = match_scanned_files(scanned_files, hash_index, console_id)
+
+        with_achievements = {scanned['path'] for scanned, _ in report.with_achievements}
+        for scanned, matches in report.matched:
+            status = 'achievements' if scanned['path'] in with_achievements else 'match'
+            for match in matches:
+                self.report('\t'.join([status, scanned['relative_path'], scanned['md5'], match['console_id'],
+                                       match['game_id'], match['title'] or '', scanned['member'] or '']))
+        for scanned in report.unmatched:
+            self.report('\t'.join(['unmatched', scanned['relative_path'], scanned['md5'], '', '', '', scanned['member'] or '']))
+        for scanned in report.errors:
+            self.report('\t'.join(['error', scanned['relative_path'], '', '', '', scanned['error'], scanned['member'] or '']))
+        self.log(f"{len(scanned_files)} files: {len(report.matched)} matched ({len(with_achievements)} with achievements), "
+                 f"{len(report.unmatched)} unmatched, {len(report.errors)} unreadable")
+        return report
+
+
+def read_md5_file(path):
+    """Hashes from a file ('-' for stdin), one per line; the first word of a line is used (md5sum output)."""
+    stream = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    try:
+        return [line.split()[0] for line in stream if line.strip() and not line.startswith('#')]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def parse_export_formats(value):
+    formats = [f.strip().lower() for f in value.split(',') if f.strip()]
+    unknown = [f for f in formats if f not in EXPORT_FORMATS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown export format(s): {', '.join(unknown)} (choose from {', '.join(EXPORT_FORMATS)})")
+    return formats
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="RADAToolCLI",
+                                     description="Fetch RetroAchievements hashes and write DAT/RetroPie/Batocera files without the GUI.")
+    parser.add_argument('--config', help="settings.ini to use (default: settings.ini next to the script)")
+    parser.add_argument('--user', dest='username', help="RetroAchievements username (default: from settings.ini)")
+    parser.add_argument('--api-key', dest='api_key', help="RetroAchievements web API key (default: from settings.ini)")
+    parser.add_argument('--lang', dest='language', help="language code of the messages, e.g. en or de")
+    parser.add_argument('--workers', dest='max_workers', type=int, help="parallel fetch workers")
+    parser.add_argument('--rps', dest='requests_per_second', type=float, help="API requests per second")
+    parser.add_argument('--cache-backend', dest='cache_backend', choices=sorted(CACHE_BACKENDS),
+                        help="cache storage (default: [CACHE] backend from settings.ini, else json)")
+    parser.add_argument('--no-api-cache', action='store_true',
+                        help="do not reuse cached API responses (console and game lists) of earlier runs")
+    parser.add_argument('-q', '--quiet', action='store_true', help="only print results and errors")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('consoles', help="list console IDs and names")
+
+    fetch_parser = subparsers.add_parser('fetch', help="fetch consoles from the API into the cache")
+    fetch_parser.add_argument('consoles', nargs='*', help="console IDs or names")
+    fetch_parser.add_argument('--all', action='store_true', help="fetch all consoles")
+    refresh_group = fetch_parser.add_mutually_exclusive_group()
+    refresh_group.add_argument('--incremental', dest='refresh', action='store_const', const='incremental',
+                               help="only re-fetch new/changed games of cached consoles")
+    refresh_group.add_argument('--full', dest='refresh', action='store_const', const='full',
+                               help="re-fetch every game, ignoring the cache")
+    fetch_parser.add_argument('--export', type=parse_export_formats, default=[],
+                              help=f"comma separated formats to write afterwards: {','.join(EXPORT_FORMATS)}")
+
+    export_parser = subparsers.add_parser('export', help="write files from the cached data")
+    export_parser.add_argument('consoles', nargs='*', help="console IDs or names")
+    export_parser.add_argument('--all', action='store_true', help="export all cached consoles")
+    export_parser.add_argument('--export', type=parse_export_formats, default=list(EXPORT_FORMATS),
+                               help=f"comma separated formats: {','.join(EXPORT_FORMATS)} (default: all)")
+    export_parser.add_argument('--jobs', type=int, help="parallel export processes for several consoles (default: all cores)")
+    export_parser.add_argument('--manifest', help="path of the JSON manifest of a multi-console export"
+                               f" (default: '{MANIFEST_FILENAME}' in the DAT folder)")
+
+    lookup_parser = subparsers.add_parser('lookup', help="find the cached games of ROM hashes (works offline)")
+    lookup_parser.add_argument('md5s', nargs='*', metavar='md5', help="MD5 hashes to look up")
+    lookup_parser.add_argument('--file', help="read hashes from a file, one per line (e.g. md5sum output), - for stdin")
+    lookup_parser.add_argument('--label', help="list all hashes with this label instead, e.g. nointro")
+    lookup_parser.add_argument('--console', dest='console_id', help="only matches of this console ID")
+
+    scan_parser = subparsers.add_parser('scan', help="hash a local ROM folder and match it against the cache")
+    scan_parser.add_argument('rom_dir', help="ROM folder to scan (including sub folders)")
+    scan_parser.add_argument('--console', help="only match games of this console ID or name")
+    scan_parser.add_argument('--ext', type=lambda value: [e.strip() for e in value.split(',') if e.strip()],
+                             help="comma separated file extensions to scan, e.g. .nes,.zip (default: all files)")
+    scan_parser.add_argument('--scan-workers', type=int, help="hashing processes (default: all cores)")
+    scan_parser.add_argument('--rehash', action='store_true', help="hash every file again instead of reusing earlier results")
+    scan_parser.add_argument('--collection', type=parse_export_formats,
+                             help="also write these collections (retropie,batocera) with only the matched files; needs --console")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command in ('fetch', 'export') and not args.consoles and not args.all:
+        parser.error("name at least one console or use --all")
+
+    tool = HeadlessRADATool(args)
+
+    def on_sigint(signum, frame):
+        # Let the running fetch stop cleanly so its journal can be resumed
+        tool.cancelled = True
+    signal.signal(signal.SIGINT, on_sigint)
+
+    try:
+        if args.command == 'lookup':
+            # Only uses the cache, no login needed
+            md5s = list(args.md5s)
+            if args.file:
+                try:
+                    md5s.extend(read_md5_file(args.file))
+                except OSError as e:
+                    tool.report(str(e))
+                    return EXIT_USAGE
+            if not md5s and args.label is None:
+                parser.error("name at least one hash or use --file or --label")
+            return EXIT_OK if tool.lookup(md5s, args.label, args.console_id) else EXIT_FAILED
+
+        if args.command == 'scan':
+            if args.collection and ('dat' in args.collection or not args.console):
+                parser.error("--collection takes retropie and/or batocera and needs --console")
+            console_id = args.console
+            if args.console and (args.collection or not args.console.isdigit()):
+                # Console names (also for the collection file name) come from the API
+                if not tool.login() or not tool.load_consoles():
+                    return EXIT_USAGE
+                consoles = tool.resolve_consoles([args.console])
+                if not consoles:
+                    return EXIT_USAGE
+                console_id = consoles[0][0]
+            report = tool.scan(args.rom_dir, console_id, args.ext, args.scan_workers, args.rehash)
+            if report is None:
+                return EXIT_USAGE
+            if tool.cancelled:
+                return EXIT_CANCELLED
+            if args.collection and not tool.export_console(console_id, consoles[0][1], args.collection,
+                                                           rom_files=report.rom_files_by_game(console_id)):
+                return EXIT_FAILED
+            return EXIT_OK
+
+        # Console names come from the API, so the other commands need a login
+        if not tool.login() or not tool.load_consoles():
+            return EXIT_USAGE
+
+        if args.command == 'consoles':
+            for console_id in sorted(tool.console_id_to_name_map, key=int):
+                tool.report(f"{console_id}\t{tool.console_id_to_name_map[console_id]}")
+            return EXIT_OK
+
+        consoles = tool.resolve_consoles(args.consoles, args.all, cached_only=args.command == 'export')
+        if not consoles:
+            return EXIT_USAGE
+        exit_code = EXIT_OK if len(consoles) == len(args.consoles) or args.all else EXIT_FAILED
+
+        if args.command == 'fetch':
+            # Without an option, behave like the GUI with its incremental refresh checkbox
+            refresh = args.refresh or ('incremental' if tool.settings['incremental_refresh'] else 'cached')
+            if not tool.fetch_consoles(consoles, refresh, args.export):
+                exit_code = EXIT_FAILED
+        elif len(consoles) > 1 or args.manifest:
+            if not tool.export_library(consoles, args.export, args.jobs, args.manifest):
+                exit_code = EXIT_FAILED
+        else:
+            console_id, console_name = consoles[0]
+            if not tool.export_console(console_id, console_name, args.export):
+                exit_code = EXIT_FAILED
+        if tool.cancelled:
+            return EXIT_CANCELLED
+        return exit_code
+    finally:
+        tool.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,489 @@
+"""Shared helpers for talking to the RetroAchievements web API."""
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+
+# requests (with urllib3, certifi, ...) takes longer to import than the whole
+# rest of the program, so it is only imported by the first API request.
+
+# API Constants
+API_BASE_URL = "https://retroachievements.org/API/"
+API_USER_PROFILE_URL = API_BASE_URL + "API_GetUserProfile.php"
+API_CONSOLE_IDS_URL = API_BASE_URL + "API_GetConsoleIDs.php"
+API_GAME_LIST_URL = API_BASE_URL + "API_GetGameList.php"
+API_GET_GAME_HASHES_URL = API_BASE_URL + "API_GetGameHashes.php"
+API_GET_GAME_EXTENDED_URL = API_BASE_URL + "API_GetGameExtended.php"
+
+
+def parse_retry_after(value):
+    """Returns the Retry-After header value in seconds, or None if missing/invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RateLimiter:
+    """Thread-safe token bucket shared by every API request.
+
+    The refill rate adapts AIMD style: it is cut multiplicatively when the API
+    answers 429 and grows back additively with every successful request, so the
+    fetch settles just below the real server limit.
+    """
+
+    def __init__(self, requests_per_second=4.0, min_requests_per_second=0.2, burst=2,
+                 increase_step=0.05, decrease_factor=0.5, base_pause_s=3.0, max_pause_s=60.0):
+        self.max_rate = max(0.1, float(requests_per_second))
+        self.min_rate = max(0.05, min(float(min_requests_per_second), self.max_rate))
+        self.burst = max(1.0, float(burst))
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.base_pause_s = base_pause_s
+        self.max_pause_s = max_pause_s
+
+        self._lock = threading.Lock()
+        self._rate = self.max_rate
+        self._tokens = self.burst
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._consecutive_limited = 0
+
+        # Metrics
+        self.total_requests = 0
+        self.total_rate_limited = 0
+        self.total_wait_s = 0.0
+
+    @property
+    def current_rate(self):
+        """Current allowed requests per second."""
+        with self._lock:
+            return self._rate
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        if elapsed > 0: # _last_refill lies in the future while the bucket is paused
+            self._tokens = min(self.burst, self._tokens + elapsed * self._rate)
+            self._last_refill = now
+
+    def acquire(self, cancel_check=None):
+        """Blocks until a token is available.
+
+        Returns False if cancel_check() became true while waiting, True otherwise.
+        """
+        wait_started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    self.total_requests += 1
+                    self.total_wait_s += now - wait_started
+                    return True
+                else:
+                    wait = (1.0 - self._tokens) / self._rate
+            if cancel_check is not None and cancel_check():
+                return False
+            # Sleep in short slices so cancellation and rate changes are noticed quickly
+            time.sleep(min(0.1, wait))
+
+    def on_success(self):
+        """Additive increase after a request went through."""
+        with self._lock:
+            self._consecutive_limited = 0
+            self._rate = min(self.max_rate, self._rate + self.increase_step)
+
+    def on_rate_limited(self, retry_after_s=None):
+        """Multiplicative decrease after a 429; pauses the whole bucket.
+
+        Returns the number of seconds until requests are allowed again.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                # Another worker already reported this 429 burst
+                return self._blocked_until - now
+            self.total_rate_limited += 1
+            self._consecutive_limited += 1
+            self._rate = max(self.min_rate, self._rate * self.decrease_factor)
+            if retry_after_s is not None:
+                pause = retry_after_s
+            else:
+                pause = self.base_pause_s * (2 ** (self._consecutive_limited - 1))
+            pause = min(pause, self.max_pause_s)
+            self._blocked_until = now + pause
+            self._tokens = 0.0
+            self._last_refill = self._blocked_until
+            return pause
+
+    def snapshot(self):
+        """Returns the limiter metrics as a dict."""
+        with self._lock:
+            return {
+                'current_rate': self._rate,
+                'max_rate': self.max_rate,
+                'total_requests': self.total_requests,
+                'total_rate_limited': self.total_rate_limited,
+                'total_wait_s': self.total_wait_s,
+            }
+
+
+# Per-thread scratch space the timed connections write their connect time into
+_request_timing = threading.local()
+
+
+def _record_connect_time(seconds):
+    _request_timing.connect_s = getattr(_request_timing, 'connect_s', 0.0) + seconds
+    _request_timing.new_connections = getattr(_request_timing, 'new_connections', 0) + 1
+
+
+@lru_cache(maxsize=None)
+def _timed_http_adapter_class():
+    """HTTPAdapter whose connections report how long TCP/TLS setup took (built on first use)."""
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    class _TimedHTTPConnection(HTTPConnection):
+        def connect(self):
+            started = time.perf_counter()
+            try:
+                super().connect()
+            finally:
+                _record_connect_time(time.perf_counter() - started)
+
+    class _TimedHTTPSConnection(HTTPSConnection):
+        def connect(self):
+            started = time.perf_counter()
+            try:
+                super().connect()
+            finally:
+                _record_connect_time(time.perf_counter() - started)
+
+    class _TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = _TimedHTTPConnection
+
+    class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = _TimedHTTPSConnection
+
+    class _TimedHTTPAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                'http': _TimedHTTPConnectionPool,
+                'https': _TimedHTTPSConnectionPool,
+            }
+
+    return _TimedHTTPAdapter
+
+
+class ApiHttpClient:
+    """Long-lived, pooled HTTP session shared by all API callers.
+
+    Connections are kept alive between requests, so only the first request
+    per pooled connection pays for the TCP and TLS handshake.
+    """
+
+    def __init__(self, pool_size=8, timeout=60):
+        self.pool_size = max(1, int(pool_size))
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._session = None
+
+        # Aggregated timing metrics
+        self.total_requests = 0
+        self.total_new_connections = 0
+        self.total_connect_s = 0.0
+        self.total_wait_s = 0.0
+        self.total_transfer_s = 0.0
+
+    def _get_session(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                session = requests.Session()
+                adapter = _timed_http_adapter_class()(pool_connections=2, pool_maxsize=self.pool_size, pool_block=True)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers['Connection'] = 'keep-alive'
+                self._session = session
+            return self._session
+
+    def get(self, url, params=None, headers=None):
+        """Sends a GET request (headers: extra request headers) and returns the response.
+
+        The response gets a 'timing' dict attribute with connect_s (TCP/TLS
+        setup, 0 for a reused connection), wait_s (until the headers arrived),
+        transfer_s (reading the body) and new_connection.
+        """
+        session = self._get_session()
+        _request_timing.connect_s = 0.0
+        _request_timing.new_connections = 0
+
+        started = time.perf_counter()
+        response = session.get(url, params=params, headers=headers, timeout=self.timeout, stream=True)
+        headers_received = time.perf_counter()
+        try:
+            response.content # Read the body now so the transfer can be timed
+        finally:
+            response.close() # Hands the connection back to the pool
+        finished = time.perf_counter()
+
+        connect_s = _request_timing.connect_s
+        timing = {
+            'connect_s': connect_s,
+            'wait_s': max(0.0, headers_received - started - connect_s),
+            'transfer_s': finished - headers_received,
+            'total_s': finished - started,
+            'new_connection': _request_timing.new_connections > 0,
+        }
+        response.timing = timing
+
+        with self._lock:
+            self.total_requests += 1
+            self.total_new_connections += _request_timing.new_connections
+            self.total_connect_s += timing['connect_s']
+            self.total_wait_s += timing['wait_s']
+            self.total_transfer_s += timing['transfer_s']
+        return response
+
+    def snapshot(self):
+        """Returns the aggregated timing metrics as a dict."""
+        with self._lock:
+            return {
+                'requests': self.total_requests,
+                'new_connections': self.total_new_connections,
+                'connect_s': self.total_connect_s,
+                'wait_s': self.total_wait_s,
+                'transfer_s': self.total_transfer_s,
+            }
+
+    def close(self):
+        """Closes all pooled connections."""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+class ApiRequestError(Exception):
+    """A failed API request, described by translation keys so every front end can report it.
+
+    status is (key, args) for a one-line status text, message is (key, args)
+    for the detailed dialog text; level is 'error' or 'warning'.
+    """
+
+    def __init__(self, status, title_key, message, level='error'):
+        super().__init__(status[0])
+        self.status = status
+        self.title_key = title_key
+        self.message = message
+        self.level = level
+
+
+class ApiRequestCancelled(Exception):
+    """A request given up because its cancel_check() became true while it was waiting."""
+
+
+class ApiClient:
+    """Sends authenticated API requests with retry handling, without any UI.
+
+    Every request goes through the shared rate limiter and pooled HTTP session.
+    status_callback(key, *args) receives progress texts as translation keys.
+    With a telemetry (ra_telemetry.RequestTelemetry), every call is recorded
+    with its timings, retries and size. With a response_cache
+    (ra_http_cache.ApiResponseCache), fresh cached responses are returned
+    without a request and stale ones are revalidated with their ETag/Last-Modified.
+    """
+
+    def __init__(self, http_client, rate_limiter, log_func=print, telemetry=None, response_cache=None):
+        self.http_client = http_client
+        self.rate_limiter = rate_limiter
+        self.log_func = log_func
+        self.telemetry = telemetry
+        self.response_cache = response_cache
+
+    def request(self, url, params=None, credentials=None, max_retries_on_429=4, initial_backoff_s=3,
+                status_callback=None, cancel_check=None):
+        """Returns the decoded JSON response or raises ApiRequestError.
+
+        credentials is a (username, api_key) tuple for authenticated requests.
+        When cancel_check() becomes true during the rate limiter wait or a retry
+        backoff, ApiRequestCancelled is raised instead of waiting on.
+        """
+        stats = {'status': None, 'retries': 0, 'rate_limited': 0, 'limiter_wait_s': 0.0, 'backoff_s': 0.0,
+                 'network_s': 0.0, 'parse_s': 0.0, 'bytes': 0, 'cache_hit': False}
+        started = time.perf_counter()
+        outcome, error_key = 'error', None
+        try:
+            data = self._request(url, params, credentials, max_retries_on_429, initial_backoff_s, status_callback,
+                                 cancel_check, stats)
+            outcome = 'ok'
+            return data
+        except ApiRequestError as e:
+            error_key = e.status[0]
+            raise
+        except ApiRequestCancelled:
+            outcome = 'cancelled'
+            raise
+        finally:
+            if self.telemetry is not None:
+                self.telemetry.record(endpoint=os.path.basename(url.split('?')[0]), outcome=outcome, error=error_key,
+                                      total_s=round(time.perf_counter() - started, 4),
+                                      **{key: round(value, 4) if isinstance(value, float) else value
+                                         for key, value in stats.items()})
+
+    def _request(self, url, params, credentials, max_retries_on_429, initial_backoff_s, status_callback,
+                 cancel_check, stats):
+        """request() without the telemetry; stats is filled in while the attempts run."""
+        import requests # Not imported at program start, see the note at the top
+        params = dict(params) if params else {}
+        status = status_callback or (lambda key, *args: None)
+        cancelled = cancel_check or (lambda: False)
+
+        if credentials is not None:
+            user, key = credentials
+            if not user or not key:
+                raise ApiRequestError(("status_auth_failed_missing", ()), "auth_error_message_title",
+                                      ("auth_error_message_text", ()))
+            params['z'] = user
+            params['y'] = key
+
+        retries = 0
+        endpoint = os.path.basename(url.split('?')[0])
+
+        cached = self.response_cache.lookup(url, params) if self.response_cache is not None else None
+        if cached is not None and cached.fresh:
+            self.log_func(f"API Request to {url} with params: {_redact_params(params)} answered from the response cache")
+            stats['cache_hit'] = True
+            return cached.data
+        request_headers = self.response_cache.validators(cached) if cached is not None else None
+
+        while retries <= max_retries_on_429:
+            try:
+                status("status_requesting_api", endpoint, retries + 1, max_retries_on_429 + 1)
+
+                limiter_started = time.perf_counter()
+                if not self.rate_limiter.acquire(cancel_check):
+                    raise ApiRequestCancelled()
+                stats['limiter_wait_s'] += time.perf_counter() - limiter_started
+                self.log_func(f"API Request to {url} with params: {_redact_params(params)}")
+                response = self.http_client.get(url, params=params, headers=request_headers)
+                timing = response.timing
+                stats['status'] = response.status_code
+                stats['network_s'] += timing['total_s']
+                stats['bytes'] += len(response.content)
+                self.log_func(f"Response status: {response.status_code} from {_redact_url(response.url)} "
+                              f"(connect {timing['connect_s']:.3f}s, wait {timing['wait_s']:.3f}s, transfer {timing['transfer_s']:.3f}s"
+                              f"{', new connection' if timing['new_connection'] else ''})")
+                response.raise_for_status()
+                self.rate_limiter.on_success()
+                if response.status_code == 304 and cached is not None:
+                    # Not modified since the cached response
+                    self.response_cache.touch(cached)
+                    stats['cache_hit'] = True
+                    return cached.data
+                parse_started = time.perf_counter()
+                try:
+                    data = response.json()
+                    stats['parse_s'] += time.perf_counter() - parse_started
+                    if self.response_cache is not None:
+                        self.response_cache.store(url, params, response.content, response.headers)
+                    return data
+                except ValueError as json_err:
+                    stats['parse_s'] += time.perf_counter() - parse_started
+                    raise ApiRequestError(("api_parsing_error", (endpoint,)), "api_error_message_json_title",
+                                          ("api_error_message_json_text", (url, json_err, response.text[:200])))
+
+            except requests.exceptions.HTTPError as e:
+                if e.response.status_code == 422:
+                    try:
+                        error_detail = e.response.json()
+                    except ValueError:
+                        error_detail = e.response.text[:200]
+                    raise ApiRequestError(("api_error_422", (endpoint,)), "api_error_message_422_title",
+                                          ("api_error_message_422_text", (_redact_url(e.request.url), _redact_params(params), error_detail)))
+                elif e.response.status_code == 429 and retries < max_retries_on_429:
+                    # The shared limiter slows down all workers and tells us how long the pause is
+                    stats['rate_limited'] += 1
+                    retry_after_s = parse_retry_after(e.response.headers.get('Retry-After'))
+                    wait_time = self.rate_limiter.on_rate_limited(retry_after_s)
+                    status("api_rate_limit_wait", endpoint, wait_time)
+
+                    wait_start_time = time.monotonic()
+                    while time.monotonic() < wait_start_time + wait_time:
+                        remaining_slice = (wait_start_time + wait_time) - time.monotonic()
+                        sleep_slice = min(0.1, remaining_slice)
+                        if sleep_slice <= 0: break
+                        if cancelled():
+                            stats['backoff_s'] += time.monotonic() - wait_start_time
+                            raise ApiRequestCancelled()
+                        time.sleep(sleep_slice)
+                        time_left = max(0, wait_time - (time.monotonic() - wait_start_time))
+                        status("api_rate_limit_wait_progress", time_left, retries + 1, max_retries_on_429 + 1)
+                    stats['backoff_s'] += time.monotonic() - wait_start_time
+                    retries += 1
+                    stats['retries'] = retries
+                    status("api_rate_limit_resume_status", endpoint)
+                    continue
+                else:
+                    raise ApiRequestError(("api_http_error", (e.response.status_code, endpoint)), "api_error_message_title",
+                                          ("api_error_message_text", (e.response.status_code, e.response.reason,
+                                                                     _redact_url(e.request.url), e.response.text[:200])))
+            except requests.exceptions.Timeout:
+                status("api_timeout", endpoint)
+                if retries < max_retries_on_429:
+                    retries += 1
+                    wait_time = min(initial_backoff_s * (2 ** retries), 60)
+                    status("api_timeout_retry_wait", wait_time, retries + 1, max_retries_on_429 + 1)
+                    wait_start_time = time.monotonic()
+                    while time.monotonic() < wait_start_time + wait_time:
+                        if cancelled():
+                            stats['backoff_s'] += time.monotonic() - wait_start_time
+                            raise ApiRequestCancelled()
+                        time.sleep(max(0.0, min(0.1, wait_start_time + wait_time - time.monotonic())))
+                    stats['backoff_s'] += time.monotonic() - wait_start_time
+                    stats['retries'] = retries
+                    continue
+                raise ApiRequestError(("api_timeout", (endpoint,)), "api_timeout_message_title",
+                                      ("api_timeout_message_text", (max_retries_on_429 + 1, url)))
+            except requests.exceptions.RequestException as e:
+                raise ApiRequestError(("api_connection_error", (endpoint,)), "api_connection_error_message_title",
+                                      ("api_connection_error_message_text", (e, url)))
+        raise ApiRequestError(("api_max_retries_reached", (max_retries_on_429 + 1, endpoint)), "api_limit_reached_warning_title",
+                              ("api_limit_reached_warning_text", (endpoint, max_retries_on_429 + 1)), level='warning')
+
+
+def _redact_params(params):
+    """Copy of the request params with the API key hidden, for logging."""
+    if 'y' not in params:
+        return params
+    return dict(params, y='***')
+
+
+def _redact_url(url):
+    """URL with the API key query parameter hidden, for logging."""
+    if not url or 'y=' not in url:
+        return url
+    parts = url.split('?', 1)
+    if len(parts) == 1:
+        return url
+    query = '&'.join('y=***' if pair.startswith('y=') else pair for pair in parts[1].split('&'))
+    return parts[0] + '?' + query
@@ -0,0 +1,385 @@
+"""On-disk cache of fetched console data (cache/console_<id>.json or cache/ra_cache.sqlite)."""
+import glob
+import json
+import os
+import sqlite3
+import time
+
+
+class CacheFormatError(ValueError):
+    """The cache file exists but does not contain a list of game records."""
+
+
+class CacheStore:
+    """Reads and writes the per-console JSON cache files."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def get_cache_filename(self, console_id):
+        """Generate cache filename for console"""
+        # Ensure console_id is treated as string for path creation
+        return os.path.join(self.cache_dir, f"console_{str(console_id)}.json")
+
+    def get_journal_filename(self, console_id):
+        """Checkpoint journal of an unfinished fetch, stored next to the cache file"""
+        return os.path.join(self.cache_dir, f"console_{str(console_id)}.partial.jsonl")
+
+    def has_data(self, console_id):
+        """True if a non-empty cache file exists for the console."""
+        cache_file = self.get_cache_filename(console_id)
+        # Check > 2 bytes to avoid empty json []
+        return os.path.isfile(cache_file) and os.path.getsize(cache_file) > 2
+
+    def cached_console_ids(self):
+        """IDs of all consoles with a cache file, sorted numerically where possible."""
+        console_ids = []
+        for file_path in glob.glob(os.path.join(self.cache_dir, "console_*.json")):
+            console_id = os.path.basename(file_path)[len("console_"):-len(".json")]
+            if console_id:
+                console_ids.append(console_id)
+        return sorted(console_ids, key=lambda c: (not c.isdigit(), int(c) if c.isdigit() else 0, c))
+
+    def saved_at(self, console_id):
+        """Modification time of the console's cache file, or None if it is not cached."""
+        try:
+            return os.path.getmtime(self.get_cache_filename(console_id))
+        except OSError:
+            return None
+
+    def entries(self):
+        """(console_id, description, size in bytes or None) of every cache file."""
+        entries = []
+        for console_id in self.cached_console_ids():
+            cache_file = self.get_cache_filename(console_id)
+            try:
+                size = os.path.getsize(cache_file)
+            except OSError:
+                size = None
+            entries.append((console_id, os.path.basename(cache_file), size))
+        return entries
+
+    def load(self, console_id, hash_details=True):
+        """Returns the cached game records, or None if there is no (non-empty) cache file.
+
+        hash_details is accepted for compatibility with SqliteCacheStore; JSON
+        files are always loaded in full. Raises CacheFormatError, json.JSONDecodeError or OSError for unreadable files.
+        """
+        if not self.has_data(console_id):
+            return None
+        with open(self.get_cache_filename(console_id), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, list):
+            raise CacheFormatError(self.get_cache_filename(console_id))
+        return data
+
+    def save(self, console_id, data):
+        """Writes the game records; raises TypeError for non-list data and OSError on I/O errors."""
+        if not isinstance(data, list):
+            raise TypeError(f"Cache data for console {console_id} must be a list")
+        cache_file = self.get_cache_filename(console_id)
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        # User requested NOT to change cache file line endings, keep as is
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def delete(self, console_id):
+        """Removes the console's cache file; raises OSError if it can't be deleted."""
+        cache_file = self.get_cache_filename(console_id)
+        if os.path.isfile(cache_file):
+            os.unlink(cache_file)
+
+
+# extended_info keys, stored as a bit mask so a record round-trips exactly
+# (e.g. no 'num_achievements' key when it was fetched without achievements)
+_EXTENDED_KEYS = ('num_achievements', 'points', 'patch_url', 'patch_md5')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS consoles (
+    console_id TEXT PRIMARY KEY,
+    game_count INTEGER NOT NULL,
+    saved_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS label_sets (
+    label_set_id INTEGER PRIMARY KEY,
+    labels TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS games (
+    console_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    game_id TEXT NOT NULL,
+    title TEXT,
+    extended_mask INTEGER,
+    num_achievements INTEGER,
+    points INTEGER,
+    patch_url TEXT,
+    patch_md5 TEXT,
+    PRIMARY KEY (console_id, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS hashes (
+    console_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    hash_index INTEGER NOT NULL,
+    md5 BLOB NOT NULL,
+    name TEXT,
+    status TEXT,
+    label_set_id INTEGER,
+    PRIMARY KEY (console_id, position, hash_index)
+) WITHOUT ROWID;
+"""
+
+
+def pack_md5(md5):
+    """32 hex digits -> 16 bytes; anything else is kept as text."""
+    if isinstance(md5, str) and len(md5) == 32:
+        try:
+            return bytes.fromhex(md5)
+        except ValueError:
+            pass
+    return md5
+
+
+def unpack_md5(value):
+    """Inverse of pack_md5."""
+    return value.hex() if isinstance(value, bytes) else value
+
+
+class _ClosingConnection:
+    """Context manager that closes (not just commits) a sqlite3 connection."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.conn.rollback()
+        self.conn.close()
+        return False
+
+
+def connect_sqlite(db_path):
+    """Opens a short-lived connection for use in a with block (closed at the end).
+
+    One connection per call, the databases are used from worker threads too.
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return _ClosingConnection(conn)
+
+
+class SqliteCacheStore:
+    """Cache backend storing all consoles in one SQLite file (cache/ra_cache.sqlite).
+
+    Same interface as CacheStore. Hashes are stored as 16 byte blobs and label
+    lists are interned, and load(hash_details=False) skips the labels/status
+    columns the exporters don't need. On first use the console_<id>.json files
+    of the JSON backend are copied into the database (see migrate_json_files).
+    """
+
+    DB_FILENAME = "ra_cache.sqlite"
+
+    def __init__(self, cache_dir, migrate_json=True):
+        self.cache_dir = cache_dir
+        self.db_path = os.path.join(cache_dir, self.DB_FILENAME)
+        self._json_store = CacheStore(cache_dir)
+        os.makedirs(cache_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+        if migrate_json:
+            self.migrate_json_files()
+
+    def _connect(self):
+        return connect_sqlite(self.db_path)
+
+    def get_cache_filename(self, console_id):
+        """All consoles share the database file"""
+        return self.db_path
+
+    def get_journal_filename(self, console_id):
+        return self._json_store.get_journal_filename(console_id)
+
+    def has_data(self, console_id):
+        """True if the console is stored with at least one game."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT game_count FROM consoles WHERE console_id = ?", (str(console_id),)).fetchone()
+        return bool(row and row[0] > 0)
+
+    def cached_console_ids(self):
+        """IDs of all stored consoles, sorted numerically where possible."""
+        with self._connect() as conn:
+            console_ids = [row[0] for row in conn.execute("SELECT console_id FROM consoles")]
+        return sorted(console_ids, key=lambda c: (not c.isdigit(), int(c) if c.isdigit() else 0, c))
+
+    def saved_at(self, console_id):
+        """Time the console was last saved, or None if it is not stored."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT saved_at FROM consoles WHERE console_id = ?", (str(console_id),)).fetchone()
+        return row[0] if row else None
+
+    def entries(self):
+        """(console_id, description, approximate size in bytes) of every stored console."""
+        # Estimated from the stored columns, the consoles share one database file
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT c.console_id, c.game_count,"
+                " (SELECT COALESCE(SUM(LENGTH(g.title) + LENGTH(g.game_id) + COALESCE(LENGTH(g.patch_url), 0) + 24), 0)"
+                "  FROM games g WHERE g.console_id = c.console_id) +"
+                " (SELECT COALESCE(SUM(LENGTH(h.md5) + COALESCE(LENGTH(h.name), 0) + 16), 0)"
+                "  FROM hashes h WHERE h.console_id = c.console_id)"
+                " FROM consoles c").fetchall()
+        return [(console_id, f"{game_count} games", size) for console_id, game_count, size in rows]
+
+    def load(self, console_id, hash_details=True):
+        """Returns the cached game records, or None if the console is not stored.
+
+        With hash_details=False the hash entries only contain 'md5' and 'name'.
+        """
+        console_id = str(console_id)
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM consoles WHERE console_id = ?", (console_id,)).fetchone() is None:
+                return None
+            games = conn.execute(
+                "SELECT position, game_id, title, extended_mask, num_achievements, points, patch_url, patch_md5"
+                " FROM games WHERE console_id = ? ORDER BY position", (console_id,)).fetchall()
+            if hash_details:
+                labels_by_id = {label_set_id: json.loads(labels) for label_set_id, labels
+                                in conn.execute("SELECT label_set_id, labels FROM label_sets")}
+                hash_rows = conn.execute(
+                    "SELECT position, md5, name, status, label_set_id FROM hashes"
+                    " WHERE console_id = ? ORDER BY position, hash_index", (console_id,))
+            else:
+                hash_rows = conn.execute(
+                    "SELECT position, md5, name FROM hashes WHERE console_id = ? ORDER BY position, hash_index",
+                    (console_id,))
+
+            hashes_by_position = {}
+            if hash_details:
+                for position, md5, name, status, label_set_id in hash_rows:
+                    labels = labels_by_id.get(label_set_id, [])
+                    hashes_by_position.setdefault(position, []).append(
+                        {'md5': unpack_md5(md5), 'name': name, 'labels': list(labels), 'status': status})
+            else:
+                for position, md5, name in hash_rows:
+                    hashes_by_position.setdefault(position, []).append({'md5': unpack_md5(md5), 'name': name})
+
+        records = []
+        for position, game_id, title, extended_mask, *extended_values in games:
+            extended_info = None
+            if extended_mask is not None:
+                extended_info = {key: value for bit, (key, value) in enumerate(zip(_EXTENDED_KEYS, extended_values))
+                                 if extended_mask & (1 << bit)}
+            records.append({
+                'id': game_id,
+                'title': title,
+                'hashes': hashes_by_position.get(position, []),
+                'extended_info': extended_info
+            })
+        return records
+
+    def save(self, console_id, data):
+        """Replaces the console's records; raises TypeError for non-list data and OSError on I/O errors."""
+        if not isinstance(data, list):
+            raise TypeError(f"Cache data for console {console_id} must be a list")
+        console_id = str(console_id)
+        try:
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                label_set_ids = {labels: label_set_id for label_set_id, labels
+                                 in conn.execute("SELECT label_set_id, labels FROM label_sets")}
+
+                def intern_labels(labels):
+                    key = json.dumps(labels if isinstance(labels, list) else [], ensure_ascii=False)
+                    label_set_id = label_set_ids.get(key)
+                    if label_set_id is None:
+                        label_set_id = conn.execute("INSERT INTO label_sets (labels) VALUES (?)", (key,)).lastrowid
+                        label_set_ids[key] = label_set_id
+                    return label_set_id
+
+                game_rows = []
+                hash_rows = []
+                for position, record in enumerate(data):
+                    extended_info = record.get('extended_info')
+                    extended_mask = None
+                    if isinstance(extended_info, dict):
+                        extended_mask = sum(1 << bit for bit, key in enumerate(_EXTENDED_KEYS) if key in extended_info)
+                    else:
+                        extended_info = {}
+                    game_rows.append((console_id, position, str(record.get('id')), record.get('title'), extended_mask,
+                                      *(extended_info.get(key) for key in _EXTENDED_KEYS)))
+                    for hash_index, hash_entry in enumerate(record.get('hashes') or []):
+                        if not isinstance(hash_entry, dict) or 'md5' not in hash_entry:
+                            continue
+                        hash_rows.append((console_id, position, hash_index, pack_md5(hash_entry['md5']),
+                                          hash_entry.get('name'), hash_entry.get('status'),
+                                          intern_labels(hash_entry.get('labels'))))
+
+                conn.execute("DELETE FROM games WHERE console_id = ?", (console_id,))
+                conn.execute("DELETE FROM hashes WHERE console_id = ?", (console_id,))
+                conn.executemany("INSERT INTO games VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", game_rows)
+                conn.executemany("INSERT INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?)", hash_rows)
+                conn.execute("INSERT OR REPLACE INTO consoles VALUES (?, ?, ?)", (console_id, len(data), time.time()))
+                conn.commit()
+        except sqlite3.Error as e:
+            raise OSError(f"SQLite cache error: {e}") from e
+
+    def delete(self, console_id):
+        """Removes the console's games and hashes from the database."""
+        console_id = str(console_id)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM games WHERE console_id = ?", (console_id,))
+            conn.execute("DELETE FROM hashes WHERE console_id = ?", (console_id,))
+            conn.execute("DELETE FROM consoles WHERE console_id = ?", (console_id,))
+            conn.commit()
+        # A JSON file left from the migration would bring the console back on the next start
+        self._json_store.delete(console_id)
+
+    def migrate_json_files(self):
+        """Copies console_<id>.json files into the database; returns the number of migrated consoles.
+
+        The JSON files stay in place, so switching the backend back to json keeps its
+        cache. A file is only copied if the database has no newer data of its console,
+        i.e. on the first start and after the console was fetched with the json backend.
+        """
+        migrated = 0
+        for console_id in self._json_store.cached_console_ids():
+            json_file = self._json_store.get_cache_filename(console_id)
+            saved_at = self.saved_at(console_id)
+            json_saved_at = self._json_store.saved_at(console_id)
+            if saved_at is not None and (json_saved_at is None or json_saved_at <= saved_at):
+                continue
+            try:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if not isinstance(data, list):
+                    raise CacheFormatError(json_file)
+                self.save(console_id, data)
+                if len(self.load(console_id, hash_details=False)) != len(data):
+                    raise OSError(f"Read back mismatch for console {console_id}")
+                migrated += 1
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not migrate cache file {json_file}: {e}")
+        if migrated:
+            print(f"DEBUG: Migrated {migrated} JSON cache files into {self.db_path}")
+        return migrated
+
+
+CACHE_BACKENDS = {'json': CacheStore, 'sqlite': SqliteCacheStore}
+
+
+def open_cache_store(cache_dir, backend='json', migrate_json=True):
+    """Returns the cache store for the [CACHE] backend setting (falls back to JSON).
+
+    migrate_json=False skips copying JSON cache files into a SQLite cache, for
+    processes that open the store after the main process already did.
+    """
+    store_class = CACHE_BACKENDS.get(backend)
+    if store_class is None:
+        print(f"Warning: Unknown cache backend '{backend}', using json.")
+        store_class = CacheStore
+    if store_class is SqliteCacheStore:
+        return store_class(cache_dir, migrate_json=migrate_json)
+    return store_class(cache_dir)
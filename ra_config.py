@@ -0,0 +1,99 @@
+"""settings.ini reading shared by the GUI and the CLI (no Tk)."""
+import os
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+
+DEFAULT_RETROPIE_BASE_PATH = "/home/pi/RetroPie/roms"
+DEFAULT_BATOCERA_BASE_PATH = "/userdata/roms"
+
+# FETCH tuning (no UI, only configurable in settings.ini)
+DEFAULT_FETCH_MAX_WORKERS = 4
+DEFAULT_REQUESTS_PER_SECOND = 4.0
+DEFAULT_HTTP_POOL_SIZE = 8
+
+# [CACHE] backend: 'json' (console_<id>.json files) or 'sqlite' (cache/ra_cache.sqlite)
+DEFAULT_CACHE_BACKEND = 'json'
+
+# [API_CACHE] seconds an API response is reused without asking the server again (0 = not cached).
+# The game data itself is kept in the console cache, so only the lists are cached by default;
+# the user profile is always requested, it checks the credentials.
+DEFAULT_API_CACHE_TTLS = {
+    'console_ids': 7 * 24 * 3600,
+    'game_list': 3600,
+    'game_hashes': 0,
+    'game_extended': 0,
+    'user_profile': 0,
+}
+
+
+def encode_secret(text):
+    """Simple 'encryption' (obfuscation) for sensitive data"""
+    if not text:
+        return ''
+    try:
+        return urlsafe_b64encode(text.encode('utf-8')).decode() # Ensure utf-8 encoding
+    except Exception:
+        # Handle potential encoding errors if input is not utf-8
+        print("Warn: Failed to encrypt text.") # Simplified warning
+        return ''
+
+
+def decode_secret(text):
+    """'Decryption' for stored data"""
+    if not text:
+        return ''
+    try:
+        return urlsafe_b64decode(text.encode('utf-8')).decode() # Ensure utf-8 encoding
+    except Exception:
+        print("Warn: Failed to decrypt text (invalid base64 or encoding?).") # Simplified warning
+        return '' # Return empty string on error
+
+
+def read_console_name_section(config, section):
+    """User entries 'console name fragment = value' of [SYSTEM_NAMES]/[SYSTEM_EXTENSIONS] (see ra_export.ConsoleNameIndex)."""
+    if not config.has_section(section):
+        return {}
+    entries = {}
+    for name, value in config.items(section, raw=True):
+        if name.strip() and value.strip():
+            entries[name.strip().lower()] = value.strip()
+    return entries
+
+
+def read_settings(config, script_dir):
+    """Returns the values of a loaded settings.ini ConfigParser as a plain dict.
+
+    Missing sections/keys fall back to the defaults of a new config file.
+    """
+    settings = {
+        'username': decode_secret(config.get('AUTH', 'username', fallback='')),
+        'api_key': decode_secret(config.get('AUTH', 'api_key', fallback='')),
+        'dat_save_path': os.path.normpath(config.get('PATHS', 'dat_save_path', fallback=script_dir)),
+        'collection_cfg_save_path': os.path.normpath(config.get('PATHS', 'collection_cfg_save_path', fallback=script_dir)),
+        'retropie_base_path': os.path.normpath(config.get('PATHS', 'retropie_base_path', fallback=DEFAULT_RETROPIE_BASE_PATH)),
+        'batocera_base_path': os.path.normpath(config.get('PATHS', 'batocera_base_path', fallback=DEFAULT_BATOCERA_BASE_PATH)),
+        'rom_extension': config.get('OPTIONS', 'rom_extension', fallback='.zip').strip(),
+        'include_achievements': config.getboolean('OPTIONS', 'include_achievements', fallback=True),
+        'include_patch_urls': config.getboolean('OPTIONS', 'include_patch_urls', fallback=True),
+        'incremental_refresh': config.getboolean('OPTIONS', 'incremental_refresh', fallback=False),
+        'language': config.get('SETTINGS', 'language', fallback='en').lower(),
+        'max_workers': DEFAULT_FETCH_MAX_WORKERS,
+        'requests_per_second': DEFAULT_REQUESTS_PER_SECOND,
+        'http_pool_size': DEFAULT_HTTP_POOL_SIZE,
+        'cache_backend': config.get('CACHE', 'backend', fallback=DEFAULT_CACHE_BACKEND).strip().lower(),
+        'api_cache_ttls': dict(DEFAULT_API_CACHE_TTLS),
+        'system_short_names': read_console_name_section(config, 'SYSTEM_NAMES'),
+        'typical_extensions': {name: value.lstrip('.')
+                               for name, value in read_console_name_section(config, 'SYSTEM_EXTENSIONS').items()},
+    }
+    try:
+        settings['max_workers'] = max(1, config.getint('FETCH', 'max_workers', fallback=DEFAULT_FETCH_MAX_WORKERS))
+        settings['requests_per_second'] = max(0.1, config.getfloat('FETCH', 'requests_per_second', fallback=DEFAULT_REQUESTS_PER_SECOND))
+        settings['http_pool_size'] = max(1, config.getint('FETCH', 'http_pool_size', fallback=DEFAULT_HTTP_POOL_SIZE))
+    except ValueError as e:
+        print(f"Warning: Invalid value in [FETCH] section of settings.ini, using defaults: {e}")
+    for endpoint, default_ttl in DEFAULT_API_CACHE_TTLS.items():
+        try:
+            settings['api_cache_ttls'][endpoint] = max(0, config.getint('API_CACHE', endpoint, fallback=default_ttl))
+        except ValueError as e:
+            print(f"Warning: Invalid value in [API_CACHE] section of settings.ini, using the default: {e}")
+    return settings
@@ -0,0 +1,570 @@
+"""DAT and RetroPie/Batocera collection writers (no Tk, shared by the GUI and the CLI)."""
+import os
+import re
+import time
+from datetime import datetime
+from functools import lru_cache
+
+from ra_sanitize import sanitize_dat_title, sanitize_rom_name, title_to_filename
+
+# Progress callbacks are limited to this many calls per second
+PROGRESS_FPS = 30
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# Collection flavours: (file name pattern, translation key of the per-game progress text)
+COLLECTION_KINDS = {
+    'retropie': ("custom-RetroAchievements-{}.cfg", "collection_creation_adding_game"),
+    'batocera': ("custom-RetroAchievements-{}-batocera.cfg", "batocera_collection_creation_adding_game"),
+}
+
+
+# Console name fragments (lower case) -> RetroPie/Batocera system folder, extended by [SYSTEM_NAMES] in settings.ini
+SYSTEM_SHORT_NAMES = {
+    "nes": "nes", "nintendo entertainment system": "nes", "famicom": "nes",
+    "snes": "snes", "super nintendo": "snes", "super famicom": "snes",
+    "mega drive": "megadrive", "sega genesis": "genesis", "genesis": "genesis", "megadrive": "megadrive",
+    "game boy": "gb", "gameboy": "gb",
+    "game boy color": "gbc", "gameboy color": "gbc",
+    "game boy advance": "gba", "gameboy advance": "gba",
+    "playstation": "psx", "psx": "psx", "ps1": "psx", "sony playstation": "psx",
+    "nintendo 64": "n64", "n64": "n64",
+    "pc engine": "pcengine", "turbografx-16": "pcengine", "turbografx": "pcengine", "tg-16": "pcengine",
+    "master system": "mastersystem", "sega master system": "mastersystem", "sms": "mastersystem",
+    "msx": "msx", "msx2": "msx",
+    "neo geo pocket": "ngp",
+    "neo geo pocket color": "ngpc", "ngpc": "ngpc",
+    "arcade": "arcade", "mame": "arcade",
+    "atari 2600": "atari2600", "vcs": "atari2600", "atari vcs": "atari2600",
+    "atari lynx": "lynx", "lynx": "lynx",
+    "wonderswan": "wonderswan",
+    "wonderswan color": "wonderswancolor",
+    "virtual boy": "virtualboy", "virtualboy": "virtualboy",
+    "sega 32x": "sega32x", "32x": "sega32x",
+    "sega cd": "segacd", "mega-cd": "segacd", "segacd": "segacd",
+    "atari jaguar": "jaguar", "jaguar": "jaguar",
+    "atari jaguar cd": "jaguarcd",
+    "dreamcast": "dreamcast", "sega dreamcast": "dreamcast",
+    "psp": "psp", "playstation portable": "psp",
+    "nds": "nds", "nintendo ds": "nds",
+    "gamecube": "gc", "nintendo gamecube": "gc", "ngc": "gc",
+    "wii": "wii", "nintendo wii": "wii",
+    "xbox": "xbox", "microsoft xbox": "xbox",
+    "playstation 2": "ps2", "ps2": "ps2", "sony playstation 2": "ps2",
+    "3do": "3do", "3do interactive multipayer": "3do",
+    "colecovision": "coleco",
+    "intellivision": "intellivision",
+    "vectrex": "vectrex",
+    "amstrad cpc": "amstradcpc",
+    "commodore 64": "c64", "c64": "c64",
+    "zx spectrum": "zxspectrum", "spectrum": "zxspectrum",
+}
+
+# Console name fragments (lower case) -> typical ROM extension, extended by [SYSTEM_EXTENSIONS] in settings.ini.
+# This is now less critical as the user provides the extension, but it's kept as a fallback
+# for generating a default filename base if no filename is available in the API data.
+TYPICAL_EXTENSIONS = {
+    "nes": "nes", "nintendo entertainment system": "nes", "famicom": "nes",
+    "snes": "sfc", "super nintendo": "sfc", "super famicom": "sfc",
+    "mega drive": "md", "sega genesis": "md", "genesis": "md", "megadrive": "md",
+    "game boy": "gb", "gameboy": "gb",
+    "game boy color": "gbc", "gameboy color": "gbc",
+    "game boy advance": "gba", "gameboy advance": "gba",
+    "playstation": "cue", "psx": "cue", "ps1": "cue", "sony playstation": "cue",
+    "nintendo 64": "n64", "n64": "z64", # N64 can be v64, z64, n64 - z64 is common
+    "pc engine": "pce", "turbografx-16": "pce", "turbografx": "pce", "tg-16": "pce",
+    "master system": "sms", "sega master system": "sms", "sms": "sms",
+    "msx": "rom", "msx2": "rom",
+    "neo geo pocket": "ngp",
+    "neo geo pocket color": "ngc", "ngpc": "ngc",
+    "arcade": "zip", "mame": "zip", # Arcade ROMs are typically zipped
+    "atari 2600": "a26", "vcs": "a26", "atari vcs": "a26",
+    "atari lynx": "lnx", "lynx": "lnx",
+    "wonderswan": "ws",
+    "wonderswan color": "wsc",
+    "virtual boy": "vb", "virtualboy": "vb",
+    "sega 32x": "32x", "32x": "32x",
+    "sega cd": "cue", "mega-cd": "cue", "segacd": "cue",
+    "atari jaguar": "j64", "jaguar": "j64", # Jaguar can be bin, j64
+    "atari jaguar cd": "cue",
+    "dreamcast": "gdi", "sega dreamcast": "gdi", # Dreamcast can be cdi, gdi, iso
+    "psp": "iso", "playstation portable": "iso", # PSP can be iso, cso
+    "nds": "nds", "nintendo ds": "nds",
+    "gamecube": "iso", "nintendo gamecube": "iso", "ngc": "iso", "dol": "dol", # GameCube can be iso, gcm, dol
+    "wii": "iso", "nintendo wii": "iso", "wbfs": "wbfs", # Wii can be iso, wbfs
+    "xbox": "iso", "microsoft xbox": "iso", # Xbox can be iso, xbe
+    "playstation 2": "iso", "ps2": "iso", "sony playstation 2": "iso", # PS2 can be iso, bin
+    "3do": "iso", "3do interactive multipayer": "iso",
+    "colecovision": "col",
+    "intellivision": "int",
+    "vectrex": "vec",
+    "amstrad cpc": "dsk",
+    "commodore 64": "d64", "c64": "d64",
+    "zx spectrum": "tzx", "spectrum": "tzx", # ZX Spectrum can be zx, tap, tzx, dsk, trd, scl, szx, etc.
+}
+
+
+class ConsoleNameIndex:
+    """Maps a console name to the value of the longest fragment it contains.
+
+    An exact (case-insensitive) name wins, otherwise every fragment that starts a
+    word of the name is a candidate and the longest one is used (the first of
+    equally long ones): "Nintendo Game Boy Color" is gbc, not gb, and "Genesis"
+    is not NES. All fragments are compiled into one regex when the index is built.
+    """
+
+    def __init__(self, table):
+        self.table = {key.lower(): value for key, value in table.items()}
+        fragments = sorted(self.table, key=lambda key: (-len(key), key))
+        # A lookahead finds the longest fragment at every word start, not just the leftmost match
+        self._pattern = re.compile("(?<![a-z0-9])(?=(" + "|".join(map(re.escape, fragments)) + "))") if fragments else None
+
+    def lookup(self, console_name):
+        """The value for console_name, or None if no fragment matches."""
+        console_name_lower = console_name.lower()
+        if console_name_lower in self.table:
+            return self.table[console_name_lower]
+        if self._pattern is None:
+            return None
+        best = max((match.group(1) for match in self._pattern.finditer(console_name_lower)), key=len, default=None)
+        return self.table[best] if best is not None else None
+
+
+_system_short_name_index = ConsoleNameIndex(SYSTEM_SHORT_NAMES)
+_typical_extension_index = ConsoleNameIndex(TYPICAL_EXTENSIONS)
+
+
+def _fallback_system_name(console_name):
+    sanitized = "".join(c for c in console_name if c.isalnum()).lower()
+    return sanitized if sanitized else "unknownsystem"
+
+
+def configure_console_names(system_short_names=None, typical_extensions=None):
+    """Rebuilds the name indexes with user entries (see ra_config.read_settings) added to the defaults."""
+    global _system_short_name_index, _typical_extension_index
+    _system_short_name_index = ConsoleNameIndex({**SYSTEM_SHORT_NAMES, **(system_short_names or {})})
+    _typical_extension_index = ConsoleNameIndex({**TYPICAL_EXTENSIONS, **(typical_extensions or {})})
+    get_system_short_name.cache_clear()
+    get_typical_extension.cache_clear()
+
+
+# Batch exports ask for the same few console names over and over
+@lru_cache(maxsize=512)
+def get_typical_extension(console_name):
+    return _typical_extension_index.lookup(console_name) or _fallback_system_name(console_name)
+
+
+@lru_cache(maxsize=512)
+def get_system_short_name(console_name):
+    return _system_short_name_index.lookup(console_name) or _fallback_system_name(console_name)
+
+
+def get_dat_filename(console_name):
+    return f"RetroAchievements - {console_name}.dat"
+
+
+def get_collection_filename(kind, console_name):
+    return COLLECTION_KINDS[kind][0].format(get_system_short_name(console_name))
+
+
+def filter_games_with_achievements(records):
+    """Games that have achievements AND hashes (meaning they are processable)."""
+    games = []
+    for game_data in records:
+        extended_info = game_data.get('extended_info')
+        if extended_info and extended_info.get('num_achievements', 0) > 0 and game_data.get('hashes'):
+            games.append(game_data)
+    return games
+
+
+class ExportCancelled(Exception):
+    """Raised by the writers when cancel_check() returned True; the unfinished file was removed."""
+
+
+class ProgressThrottle:
+    """Limits progress updates to a fixed frame rate; the first and last step are always due.
+
+    Building the progress text (translate + format) per game costs more than
+    writing the game, so exporters ask due() before creating it.
+    """
+
+    def __init__(self, fps=PROGRESS_FPS):
+        self.interval = 1.0 / fps
+        self._next_update = 0.0
+
+    def due(self, done, total):
+        now = time.monotonic()
+        if done >= total or now >= self._next_update:
+            self._next_update = now + self.interval
+            return True
+        return False
+
+
+def iter_dat_header(console_name, translate):
+    """Lines of the clrmamepro header block."""
+    yield "clrmamepro ("
+    yield f"\tname \"{console_name} - RetroAchievements\""
+    yield f"\tdescription \"{console_name} - RetroAchievements (RA Hashes - {datetime.now().strftime('%Y-%m-%d')})\""
+    yield f"\tversion \"{datetime.now().strftime('%Y%m%d-%H%M%S')}\""
+    yield f"\tcomment \"{translate('dat_comment')}\""
+    yield f"\tauthor \"{translate('dat_author')}\""
+    yield ")"
+    yield ""
+
+
+def iter_dat_game_lines(game_data, translate, include_achievements=True, include_patch_urls=True):
+    """Lines of one game block, nothing for games without hashes."""
+    game_title = game_data.get('title', f'Unbekanntes Spiel ID {game_data.get("id")}') # Keep fallback or translate
+    game_hashes = game_data.get('hashes', [])
+    extended_info = game_data.get('extended_info')
+
+    # Only include games that have at least one hash
+    if not game_hashes or not isinstance(game_hashes, list):
+        return
+
+    yield "\tgame ("
+    # Sanitize game title for DAT name/description
+    game_title_sanitized = sanitize_dat_title(game_title)
+    yield f'\t\tname "{game_title_sanitized}"'
+    yield f'\t\tdescription "{game_title_sanitized}"'
+
+    # Add extended info as comment if available and requested
+    comment_lines = []
+    if extended_info:
+        if include_achievements and extended_info.get('num_achievements', 0) > 0:
+            comment_lines.append(translate('dat_comment_achievements', extended_info.get('num_achievements', 0), extended_info.get('points', 0)))
+        if include_patch_urls and extended_info.get('patch_url'):
+            comment_lines.append(translate('dat_comment_patch_url', extended_info.get('patch_url'), extended_info.get('patch_md5', 'N/A')))
+
+    if comment_lines:
+        # Join comment lines, escaping internal quotes if necessary
+        # Simple approach: replace " with ' inside comments
+        combined_comment = " | ".join(comment_lines).replace('"', "'")
+        yield f'\t\tcomment "{combined_comment}"'
+
+    for file_hash_data in game_hashes:
+        if isinstance(file_hash_data, dict) and 'md5' in file_hash_data and file_hash_data.get('name'):
+            md5_hash = file_hash_data['md5']
+            filename = file_hash_data['name']
+            # Sanitize filename for DAT entry - remove problematic characters
+            sanitized_filename = sanitize_rom_name(filename)
+            if not sanitized_filename: sanitized_filename = "unknown_file" # Fallback if sanitization results in empty string
+
+            # Example: Add size="0" since RA API doesn't provide it easily with this call
+            yield "\t\trom ("
+            yield f'\t\t\tname "{sanitized_filename}"'
+            yield '\t\t\tsize "0"' # Placeholder, size not available
+            yield '\t\t\tcrc "00000000"' # Placeholder, CRC not available
+            yield f'\t\t\tmd5 "{md5_hash}"'
+            yield "\t\t)" # End rom
+
+    yield "\t)" # End game
+
+
+def get_collection_rom_filename(game_data, index, desired_extension):
+    """File name of a game in a collection: the first API file name, or one derived from the title,
+    with desired_extension (e.g. '.zip') applied.
+    """
+    game_title = game_data.get('title', f'Unbekanntes Spiel ID {game_data.get("id")}') # Keep fallback or translate
+    game_hashes = game_data.get('hashes', [])
+    rom_filename = ""
+    # Prioritize filename from hash data if available
+    if game_hashes and isinstance(game_hashes, list):
+        # Find the first hash entry with a filename
+        for hash_entry in game_hashes:
+            if isinstance(hash_entry, dict) and hash_entry.get('name'):
+                # The real file name on the device, so it is not sanitised like the DAT rom names
+                rom_filename = hash_entry['name']
+                break # Use the first found filename
+    # If no filename in hash data, generate a fallback
+    if not rom_filename:
+        rom_name_base = title_to_filename(game_title)
+        if not rom_name_base: rom_name_base = f"game_{game_data.get('id', index)}" # Keep fallback or translate
+        # Use the determined rom_name_base without an extension yet
+        rom_filename = rom_name_base
+
+    # Check if the filename already has an extension that matches the desired one
+    base_name, existing_ext = os.path.splitext(rom_filename)
+    if existing_ext.lower() != desired_extension.lower():
+        # If it doesn't match, replace or add the desired extension
+        rom_filename = base_name + desired_extension
+    return rom_filename
+
+
+class ExportGame:
+    """One game record as seen by the export sinks; shared derived values are computed once per game."""
+
+    __slots__ = ('data', 'index', 'title', 'hashes', 'has_hashes', 'has_achievements', '_rom_filenames')
+
+    def __init__(self, game_data, index):
+        self.data = game_data
+        self.index = index
+        self.title = game_data.get('title', f'Unbekanntes Spiel ID {game_data.get("id")}') # Keep fallback or translate
+        hashes = game_data.get('hashes', [])
+        self.hashes = hashes if isinstance(hashes, list) else []
+        self.has_hashes = bool(self.hashes)
+        extended_info = game_data.get('extended_info')
+        self.has_achievements = bool(extended_info) and extended_info.get('num_achievements', 0) > 0
+        self._rom_filenames = {}
+
+    def rom_filename(self, desired_extension):
+        """get_collection_rom_filename(), shared by all collection sinks with the same extension."""
+        rom_filename = self._rom_filenames.get(desired_extension)
+        if rom_filename is None:
+            rom_filename = get_collection_rom_filename(self.data, self.index, desired_extension)
+            self._rom_filenames[desired_extension] = rom_filename
+        return rom_filename
+
+
+class ExportSink:
+    """Base class of the output writers fed by an ExportPlan.
+
+    begin() opens the output, add_game(game) is called for every ExportGame in
+    order, finish() completes the output and returns the sink's result, abort()
+    removes unfinished output. Subclasses write to self.temp_output_path, which
+    replaces self.full_output_path in finish().
+    """
+
+    name = None
+
+    def __init__(self, full_output_path, newline=None):
+        self.full_output_path = full_output_path
+        self.temp_output_path = full_output_path + ".tmp"
+        self.newline = newline
+        self.file = None
+
+    def begin(self):
+        self.file = open(self.temp_output_path, "w", encoding="utf-8", newline=self.newline, buffering=WRITE_BUFFER_SIZE)
+
+    def add_game(self, game):
+        raise NotImplementedError
+
+    def progress_text(self, game, total, translate):
+        """Progress text when the sink is the only one of its plan."""
+        return translate("export_all_progress", game.title[:40], game.index + 1, total)
+
+    def result(self):
+        raise NotImplementedError
+
+    def finish(self):
+        self.file.close()
+        self.file = None
+        os.replace(self.temp_output_path, self.full_output_path)
+        return self.result()
+
+    def abort(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if os.path.exists(self.temp_output_path):
+            os.remove(self.temp_output_path)
+
+
+class DatSink(ExportSink):
+    """clrmamepro DAT file of all games with hashes.
+
+    result(): (full_output_path, games_with_hashes_count, games_with_achievements_count)
+    """
+
+    name = 'dat'
+
+    def __init__(self, console_name, output_dir, translate, include_achievements=True, include_patch_urls=True):
+        # No newline='' here as per user request - keep OS default
+        super().__init__(os.path.join(output_dir, get_dat_filename(console_name)))
+        self.console_name = console_name
+        self.translate = translate
+        self.include_achievements = include_achievements
+        self.include_patch_urls = include_patch_urls
+        self.games_with_hashes_count = 0
+        self.games_with_achievements_count = 0
+
+    def begin(self):
+        super().begin()
+        self.file.writelines(line + "\n" for line in iter_dat_header(self.console_name, self.translate)) # Always write '\n' for line breaks in DAT
+
+    def add_game(self, game):
+        if not game.has_hashes:
+            return
+        self.games_with_hashes_count += 1
+        if game.has_achievements:
+            self.games_with_achievements_count += 1
+        self.file.writelines(line + "\n" for line in iter_dat_game_lines(game.data, self.translate, self.include_achievements, self.include_patch_urls))
+
+    def progress_text(self, game, total, translate):
+        progress_key = "dat_creation_processing_game_progress" if game.has_hashes else "dat_creation_skipping_no_hashes_progress"
+        return translate(progress_key, game.title[:40], game.index + 1, total)
+
+    def result(self):
+        return self.full_output_path, self.games_with_hashes_count, self.games_with_achievements_count
+
+
+class CollectionSink(ExportSink):
+    """RetroPie or Batocera ('kind') custom collection of the games with achievements and hashes.
+
+    rom_base_path is the ROM folder on the target device, so it is not checked locally.
+    rom_files ({game_id: [path relative to the system ROM folder]}, see ra_scan.ScanReport)
+    restricts the collection to files that were found by a scan and uses their real names
+    instead of the API file name with rom_extension.
+    result(): (full_output_path, games_added_to_cfg)
+    """
+
+    def __init__(self, kind, console_name, output_dir, rom_base_path, rom_extension, rom_files=None):
+        # newline='' to ensure LF line endings for CFG file
+        super().__init__(os.path.join(output_dir, get_collection_filename(kind, console_name)), newline='')
+        self.name = kind
+        self.system_rom_path = os.path.normpath(os.path.join(rom_base_path, get_system_short_name(console_name))).replace(os.sep, '/')
+        # Get the desired extension
+        desired_extension = rom_extension.strip()
+        if not desired_extension.startswith('.'):
+            desired_extension = '.' + desired_extension # Ensure it starts with a dot
+        self.desired_extension = desired_extension
+        self.rom_files = rom_files
+        self.games_added_to_cfg = 0
+
+    def add_game(self, game):
+        # Only games that have achievements AND hashes (see filter_games_with_achievements)
+        if not (game.has_achievements and game.has_hashes):
+            return
+        if self.rom_files is not None:
+            # Every local dump of the game (e.g. several regions)
+            local_files = self.rom_files.get(str(game.data.get('id')), [])
+            for relative_path in local_files:
+                self.file.write(f"{self.system_rom_path}/{relative_path.replace(os.sep, '/')}\n")
+            if local_files:
+                self.games_added_to_cfg += 1
+            return
+        rom_filename = game.rom_filename(self.desired_extension)
+        self.file.write(f"{self.system_rom_path}/{os.path.normpath(rom_filename).replace(os.sep, '/')}\n")
+        self.games_added_to_cfg += 1
+
+    def progress_text(self, game, total, translate):
+        return translate(COLLECTION_KINDS[self.name][1], game.title[:40], game.index + 1, total)
+
+    def result(self):
+        return self.full_output_path, self.games_added_to_cfg
+
+
+class ExportPlan:
+    """Walks the records of one console once and feeds every sink (DAT, collections, ...) per game.
+
+    A sink that fails with OSError is aborted without stopping the others.
+    """
+
+    def __init__(self, records, sinks, translate):
+        self.records = records
+        self.sinks = list(sinks)
+        self.translate = translate
+
+    def run(self, progress_callback=None, cancel_check=None):
+        """Returns {sink.name: (result, error)} with error None or the OSError of that sink.
+
+        progress_callback(text, done, total) is called at most PROGRESS_FPS times per second;
+        raises ExportCancelled (after removing all unfinished files) if cancel_check() returns True.
+        """
+        total = len(self.records)
+        throttle = ProgressThrottle()
+        outcomes = {}
+        active = []
+
+        def fail(sink, error):
+            sink.abort()
+            outcomes[sink.name] = (None, error)
+            active.remove(sink)
+
+        for sink in self.sinks:
+            active.append(sink)
+            try:
+                sink.begin()
+            except OSError as e:
+                fail(sink, e)
+        try:
+            for index, game_data in enumerate(self.records):
+                if cancel_check and cancel_check():
+                    raise ExportCancelled(", ".join(sink.full_output_path for sink in active))
+                game = ExportGame(game_data, index)
+                for sink in list(active):
+                    try:
+                        sink.add_game(game)
+                    except OSError as e:
+                        fail(sink, e)
+                if progress_callback and throttle.due(index + 1, total):
+                    if len(self.sinks) == 1:
+                        text = self.sinks[0].progress_text(game, total, self.translate)
+                    else:
+                        text = self.translate("export_all_progress", game.title[:40], index + 1, total)
+                    progress_callback(text, index + 1, total)
+            for sink in list(active):
+                try:
+                    outcomes[sink.name] = (sink.finish(), None)
+                    active.remove(sink)
+                except OSError as e:
+                    fail(sink, e)
+        except BaseException:
+            for sink in active:
+                sink.abort()
+            raise
+        return outcomes
+
+
+def build_export_sinks(console_name, records, formats, settings, translate, rom_files=None):
+    """Sinks of the export formats ('dat', 'retropie', 'batocera') of one console, with the
+    output folders and options taken from the settings dict (see ra_config.read_settings).
+
+    Returns (sinks, skipped): collection formats are skipped if no game has achievements
+    and hashes. The output folders are created.
+    """
+    sinks = []
+    skipped = []
+    for export_format in formats:
+        if export_format == 'dat':
+            output_dir = settings['dat_save_path']
+            sinks.append(DatSink(console_name, output_dir, translate,
+                                 include_achievements=settings['include_achievements'],
+                                 include_patch_urls=settings['include_patch_urls']))
+        elif not filter_games_with_achievements(records):
+            skipped.append(export_format)
+            continue
+        else:
+            output_dir = settings['collection_cfg_save_path']
+            sinks.append(CollectionSink(export_format, console_name, output_dir,
+                                        settings[f'{export_format}_base_path'], settings['rom_extension'],
+                                        rom_files=rom_files))
+        os.makedirs(output_dir, exist_ok=True)
+    return sinks, skipped
+
+
+def _run_single_sink(sink, records, translate, progress_callback, cancel_check):
+    result, error = ExportPlan(records, [sink], translate).run(progress_callback, cancel_check)[sink.name]
+    if error is not None:
+        raise error
+    return result
+
+
+def write_dat_file(console_name, records, output_dir, translate,
+                   include_achievements=True, include_patch_urls=True, progress_callback=None, cancel_check=None):
+    """Writes the clrmamepro DAT file for one console (an ExportPlan with a single DatSink).
+
+    The game blocks are streamed into a buffered temporary file that replaces
+    the DAT at the end, so memory stays flat and a failed export leaves the
+    previous file in place.
+    translate(key, *args) provides the comment/author texts.
+    progress_callback(text, done, total) is called at most PROGRESS_FPS times per second.
+    Returns (full_output_path, games_with_hashes_count, games_with_achievements_count);
+    raises IOError if the file cannot be written and ExportCancelled if cancel_check() returns True.
+    """
+    sink = DatSink(console_name, output_dir, translate, include_achievements, include_patch_urls)
+    return _run_single_sink(sink, records, translate, progress_callback, cancel_check)
+
+
+def write_collection_file(kind, console_name, games, output_dir, rom_base_path, rom_extension,
+                          translate, progress_callback=None, rom_files=None, cancel_check=None):
+    """Writes a RetroPie or Batocera ('kind') custom collection (an ExportPlan with a single CollectionSink).
+
+    games should come from filter_games_with_achievements(); see CollectionSink for
+    rom_base_path and rom_files.
+    progress_callback(text, done, total) is called at most PROGRESS_FPS times per second.
+    Like write_dat_file, the file is written to a temporary file that replaces it at the end.
+    Returns (full_output_path, games_added_to_cfg); raises IOError if the file cannot be written
+    and ExportCancelled if cancel_check() returns True.
+    """
+    sink = CollectionSink(kind, console_name, output_dir, rom_base_path, rom_extension, rom_files)
+    return _run_single_sink(sink, games, translate, progress_callback, cancel_check)
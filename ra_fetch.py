@@ -0,0 +1,720 @@
+"""Per-game fetch engine used to build the console cache files."""
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+from ra_api import (API_GAME_LIST_URL, API_GET_GAME_HASHES_URL, API_GET_GAME_EXTENDED_URL,
+                    ApiRequestCancelled, ApiRequestError)
+
+
+_MD5_PATTERN = re.compile(r'[0-9a-fA-F]{32}')
+# A console has thousands of hashes but only a handful of label combinations ('nointro', 'redump', ...)
+_label_sets = {}
+
+
+def _shared_labels(labels):
+    """A new list of the interned strings of labels ([] for anything but a list)."""
+    if labels.__class__ is not list:
+        return []
+    key = tuple(labels)
+    try:
+        shared = _label_sets[key]
+    except KeyError:
+        shared = _label_sets[key] = tuple(sys.intern(label) if isinstance(label, str) else label for label in labels)
+    except TypeError: # Unhashable labels (never sent by the API) are kept as they are
+        return labels
+    return list(shared)
+
+
+def parse_game_hashes(game_hashes_data):
+    """Turns an API_GetGameHashes response into the cached 'hashes' list.
+
+    The whole Results batch is validated and lowercased in one pass; entries
+    without a 32 digit hex MD5 are dropped.
+    """
+    results_list = game_hashes_data.get('Results') if isinstance(game_hashes_data, dict) else None
+    if not isinstance(results_list, list):
+        return []
+    is_md5 = _MD5_PATTERN.fullmatch
+    return [{'md5': hash_md5.lower(),
+             'name': item.get('Name', 'Unknown Filename'),
+             'labels': _shared_labels(item.get('Labels', [])),
+             'status': item.get('Status')}
+            for item in results_list
+            if isinstance(item, dict) and isinstance(hash_md5 := item.get('MD5'), str) and is_md5(hash_md5)]
+
+
+def benchmark_parse_game_hashes(cache_store, rounds=5):
+    """Parses the games of cache_store, rebuilt as API responses, and returns
+    (games, hashes, best seconds of rounds) for python ra_fetch.py --parse-benchmark.
+    """
+    responses = []
+    for console_id in cache_store.cached_console_ids():
+        for record in cache_store.load(console_id) or []:
+            responses.append({'Results': [{'MD5': hash_entry['md5'].upper(), 'Name': hash_entry.get('name'),
+                                           'Labels': list(hash_entry.get('labels') or []),
+                                           'Status': hash_entry.get('status')}
+                                          for hash_entry in record.get('hashes', [])]})
+    best = float('inf')
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for response in responses:
+            parse_game_hashes(response)
+        best = min(best, time.perf_counter() - started)
+    return len(responses), sum(len(response['Results']) for response in responses), best
+
+
+def parse_extended_info(extended_data, include_achievements, include_patch_urls):
+    """Extracts the fields we keep from an API_GetGameExtended response."""
+    extended_info = {}
+    if extended_data and isinstance(extended_data, dict):
+        if include_achievements:
+            extended_info['num_achievements'] = extended_data.get('NumAchievements', 0)
+            extended_info['points'] = extended_data.get('Points', 0)
+        if include_patch_urls:
+            patch_data = extended_data.get('PatchData')
+            if isinstance(patch_data, dict):
+                extended_info['patch_url'] = patch_data.get('URL', '')
+                extended_info['patch_md5'] = patch_data.get('Hash', '')
+    return extended_info
+
+
+class GameFetchEngine:
+    """Fetches hashes and extended info for a game list on a bounded thread pool.
+
+    request_func(url, params, cancel_check=None) must be thread-safe, return the
+    decoded JSON and raise ApiRequestError when a request failed (ApiRequestCancelled
+    once cancel_check() is true); throttling is left to the rate limiter behind it.
+    """
+
+    def __init__(self, request_func, max_workers=4, include_achievements=True,
+                 include_patch_urls=True, cancel_check=None, log_func=print):
+        self.request_func = request_func
+        self.max_workers = max(1, int(max_workers))
+        self.include_achievements = include_achievements
+        self.include_patch_urls = include_patch_urls
+        self.cancel_check = cancel_check or (lambda: False)
+        self.log_func = log_func
+
+    def fetch_game(self, console_id_str, game_entry):
+        """Fetches one game and returns its cache record, or None if it has no usable hashes.
+
+        A failed hashes or extended info request raises ApiRequestError.
+        """
+        game_id_str = str(game_entry.get('ID'))
+        game_title = game_entry.get('Title', f'Unbekanntes Spiel ID {game_id_str}')
+        params = {'i': game_id_str, 'g': console_id_str}
+
+        game_hashes_data = self.request_func(API_GET_GAME_HASHES_URL, dict(params), cancel_check=self.cancel_check)
+
+        extended_info = {}
+        if (self.include_achievements or self.include_patch_urls) and not self.cancel_check():
+            extended_data = self.request_func(API_GET_GAME_EXTENDED_URL, dict(params), cancel_check=self.cancel_check)
+            extended_info = parse_extended_info(extended_data, self.include_achievements, self.include_patch_urls)
+
+        md5_list = parse_game_hashes(game_hashes_data)
+        if not md5_list:
+            return None
+
+        return {
+            'id': game_id_str, # Store ID as string in cached data
+            'title': game_title,
+            'hashes': md5_list,
+            'extended_info': extended_info if extended_info else None
+        }
+
+    @staticmethod
+    def is_fetchable(index, game_entry, skip_callback=None):
+        """False (after reporting it as skipped) for game list entries without a usable ID."""
+        if not isinstance(game_entry, dict):
+            if skip_callback:
+                skip_callback("data_fetch_skipping_invalid_entry", index, game_entry)
+            return False
+        if not game_entry.get('ID'):
+            if skip_callback:
+                skip_callback("data_fetch_skipping_missing_id", game_entry)
+            return False
+        return True
+
+    def run(self, console_id_str, game_list, progress_callback=None, skip_callback=None, result_callback=None,
+            failure_callback=None):
+        """Fetches all games and returns their records in game-list order.
+
+        progress_callback(done, total, game_title) is called from worker threads
+        as games finish; skip_callback(reason, *details) receives the entries
+        the sequential fetch used to report as skipped; result_callback(game_id_str, record)
+        receives every finished game (e.g. for checkpointing), record is None for a game
+        without usable hashes. A game whose requests failed does not finish, it goes
+        to failure_callback(game_id_str, error) instead.
+        On cancellation the records completed so far are returned.
+        """
+        total_games = len(game_list)
+        results = [None] * total_games
+        done_count = 0
+        done_lock = threading.Lock()
+
+        def report_done(game_title):
+            nonlocal done_count
+            with done_lock:
+                done_count += 1
+                done = done_count
+            if progress_callback:
+                progress_callback(done, total_games, game_title)
+
+        def work(index, game_entry):
+            game_title = game_entry.get('Title', f"Unbekanntes Spiel ID {game_entry.get('ID')}")
+            if self.cancel_check():
+                return
+            try:
+                try:
+                    record = self.fetch_game(console_id_str, game_entry)
+                except ApiRequestCancelled:
+                    return
+                except ApiRequestError as e:
+                    if failure_callback and not self.cancel_check():
+                        failure_callback(str(game_entry.get('ID')), e)
+                    return
+                if self.cancel_check():
+                    # Cancelled mid-game, the record may be missing its extended info
+                    return
+                if record is None and skip_callback:
+                    skip_callback("data_fetch_skipping_no_hashes", game_entry.get('ID'), game_title)
+                results[index] = record
+                if result_callback:
+                    result_callback(str(game_entry.get('ID')), record)
+            finally:
+                report_done(game_title)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ra-fetch")
+        try:
+            futures = []
+            for index, game_entry in enumerate(game_list):
+                if not self.is_fetchable(index, game_entry, skip_callback):
+                    report_done(game_entry.get('Title', '') if isinstance(game_entry, dict) else '')
+                    continue
+                futures.append(executor.submit(work, index, game_entry))
+
+            for future in as_completed(futures):
+                # Re-raise unexpected worker errors in the calling thread
+                future.result()
+                if self.cancel_check():
+                    self.log_func("DEBUG: Fetch engine detected cancellation flag, stopping.")
+                    break
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        return [record for record in results if record is not None]
+
+
+def _game_list_md5s(game_entry):
+    """Returns the lowercased md5 set of a game list entry fetched with h=1, or None."""
+    hashes = game_entry.get('Hashes')
+    if not isinstance(hashes, list):
+        return None
+    return {h.lower() for h in hashes if isinstance(h, str)}
+
+
+class DeltaRefreshPlan:
+    """Diff between a fresh API_GetGameList response and the cached records.
+
+    Only games that are new, whose hash list changed or whose achievement
+    count/points changed have to be fetched again; everything else is taken
+    over from the cache. Games no longer in the list are dropped on merge.
+    """
+
+    def __init__(self, game_list, cached_records, include_achievements=True):
+        self.game_list = [entry for entry in game_list if isinstance(entry, dict) and entry.get('ID')]
+        self.cached_by_id = {str(record.get('id')): record for record in cached_records if isinstance(record, dict)}
+        self.to_fetch = []
+        self.unchanged_ids = set()
+
+        listed_ids = set()
+        for entry in self.game_list:
+            game_id_str = str(entry['ID'])
+            listed_ids.add(game_id_str)
+            list_md5s = _game_list_md5s(entry)
+            if list_md5s is not None and not list_md5s:
+                # The list already tells us there are no hashes, nothing to fetch or keep
+                continue
+            cached = self.cached_by_id.get(game_id_str)
+            if cached is None or self._has_changed(entry, cached, list_md5s, include_achievements):
+                self.to_fetch.append(entry)
+            else:
+                self.unchanged_ids.add(game_id_str)
+
+        self.removed_ids = set(self.cached_by_id) - listed_ids
+
+    @staticmethod
+    def _has_changed(entry, cached, list_md5s, include_achievements):
+        if list_md5s is not None:
+            cached_md5s = {h.get('md5') for h in cached.get('hashes') or [] if isinstance(h, dict)}
+            if list_md5s != cached_md5s:
+                return True
+        if include_achievements:
+            extended_info = cached.get('extended_info') or {}
+            if 'num_achievements' not in extended_info:
+                # Cached without achievement info (option was off), fetch it now
+                return True
+            if 'NumAchievements' in entry and entry.get('NumAchievements') != extended_info.get('num_achievements'):
+                return True
+            if 'Points' in entry and entry.get('Points') != extended_info.get('points'):
+                return True
+        return False
+
+    def merge(self, fetched_records, finished_ids=None):
+        """Returns the refreshed cache records in the order of the fresh game list.
+
+        finished_ids are the games whose fetch finished, with or without a record
+        (default: the games of fetched_records). Games that should have been fetched
+        but did not finish keep their old cached record: after a cancelled fetch, and
+        when a request failed (ConsoleFetchJob.failed_ids are never finished). Only a
+        finished game without a record, whose hashes request succeeded without usable
+        hashes, is dropped.
+        """
+        fetched_by_id = {record['id']: record for record in fetched_records}
+        if finished_ids is None:
+            finished_ids = fetched_by_id
+        unfinished_ids = {str(entry['ID']) for entry in self.to_fetch} - set(finished_ids)
+        merged = []
+        for entry in self.game_list:
+            game_id_str = str(entry['ID'])
+            record = fetched_by_id.get(game_id_str)
+            if record is None and (game_id_str in self.unchanged_ids or game_id_str in unfinished_ids):
+                record = self.cached_by_id.get(game_id_str)
+                if record is not None and entry.get('Title') and record.get('title') != entry['Title']:
+                    record = dict(record, title=entry['Title'])
+            if record is not None:
+                merged.append(record)
+        return merged
+
+
+class FetchJournal:
+    """Append-only checkpoint file for a running fetch (console_<id>.partial.jsonl).
+
+    Completed game records are buffered and written to disk every few games or
+    seconds, so a cancelled or crashed fetch can later resume where it stopped.
+    The first line stores the fetch options; a journal written with different
+    options is discarded instead of resumed.
+    """
+
+    def __init__(self, path, checkpoint_every=25, checkpoint_interval_s=5.0):
+        self.path = path
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_interval_s = checkpoint_interval_s
+        self._lock = threading.Lock()
+        self._file = None
+        self._pending = []
+        self._last_checkpoint = time.monotonic()
+
+    @staticmethod
+    def _header(include_achievements, include_patch_urls):
+        return {'journal': 1, 'include_achievements': bool(include_achievements),
+                'include_patch_urls': bool(include_patch_urls)}
+
+    def load(self, include_achievements, include_patch_urls):
+        """Returns the checkpointed games as {game_id_str: record or None} (empty if there is nothing to resume).
+
+        None marks a game that was fetched but had no usable hashes.
+        """
+        if not os.path.isfile(self.path):
+            return {}
+        records = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                header = None
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash can leave a half written last line behind
+                        continue
+                    if header is None:
+                        header = entry
+                        if header != self._header(include_achievements, include_patch_urls):
+                            print(f"DEBUG: Discarding fetch journal with different options: {self.path}")
+                            self.discard()
+                            return {}
+                        continue
+                    if isinstance(entry, dict) and 'record' in entry and \
+                       (entry['record'] is None or isinstance(entry['record'], dict)):
+                        records[str(entry.get('id'))] = entry['record']
+        except OSError as e:
+            print(f"Warning: Could not read fetch journal {self.path}: {e}")
+            return {}
+        return records
+
+    def start(self, include_achievements, include_patch_urls):
+        """Opens the journal for appending, writing the header for a new journal."""
+        is_new = not os.path.isfile(self.path) or os.path.getsize(self.path) == 0
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if is_new:
+            self._file.write(json.dumps(self._header(include_achievements, include_patch_urls)) + "\n")
+            self._file.flush()
+        else:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    # Terminate a half written line left behind by a crash
+                    self._file.write("\n")
+        self._last_checkpoint = time.monotonic()
+
+    def add(self, game_id_str, record):
+        """Queues a finished game (record None: no usable hashes); checkpoints when enough
+        games or time have passed. Thread-safe.
+        """
+        with self._lock:
+            self._pending.append(json.dumps({'id': game_id_str, 'record': record}, ensure_ascii=False))
+            if len(self._pending) >= self.checkpoint_every or \
+               time.monotonic() - self._last_checkpoint >= self.checkpoint_interval_s:
+                self._checkpoint_locked()
+
+    def checkpoint(self):
+        with self._lock:
+            self._checkpoint_locked()
+
+    def _checkpoint_locked(self):
+        self._last_checkpoint = time.monotonic()
+        if self._file is None or not self._pending:
+            return
+        try:
+            self._file.write("\n".join(self._pending) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending = []
+        except OSError as e:
+            print(f"Warning: Could not write fetch journal {self.path}: {e}")
+
+    def close(self):
+        """Writes outstanding records and closes the file, keeping it for a later resume."""
+        with self._lock:
+            self._checkpoint_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def discard(self):
+        """Closes and deletes the journal (after the cache file was written)."""
+        with self._lock:
+            self._pending = []
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Warning: Could not remove fetch journal {self.path}: {e}")
+
+
+def combine_resumed_records(game_list, resumed_records, fetched_records):
+    """Returns resumed and freshly fetched records together in game-list order."""
+    by_id = {game_id_str: record for game_id_str, record in resumed_records.items() if record is not None}
+    for record in fetched_records:
+        by_id[record['id']] = record
+    combined = []
+    for entry in game_list:
+        if isinstance(entry, dict) and entry.get('ID'):
+            record = by_id.get(str(entry['ID']))
+            if record is not None:
+                combined.append(record)
+    return combined
+
+
+class ConsoleFetchJob:
+    """Fetch of one console's game list into cache records.
+
+    Combines the incremental DeltaRefreshPlan, resuming from the FetchJournal and
+    the GameFetchEngine run, so the GUI worker thread and the CLI share one flow.
+    """
+
+    def __init__(self, console_id, game_list, cached_records=None, journal_path=None,
+                 include_achievements=True, include_patch_urls=True, incremental=False):
+        self.console_id = str(console_id)
+        self.include_achievements = include_achievements
+        self.include_patch_urls = include_patch_urls
+        self.delta_plan = None
+        if incremental and cached_records:
+            self.delta_plan = DeltaRefreshPlan(game_list, cached_records, include_achievements)
+            # Only the new/changed games have to be fetched
+            game_list = self.delta_plan.to_fetch
+        self.game_list = game_list
+        self.pending = game_list
+        self.journal = FetchJournal(journal_path) if journal_path else None
+        self.resumed_records = {}
+        # Games whose fetch finished, including the ones without usable hashes (see DeltaRefreshPlan.merge)
+        self.finished_ids = set()
+        # Games whose requests failed; they are not checkpointed, so the next fetch tries them again
+        self.failed_ids = set()
+        # The first of their ApiRequestErrors, so a front end can report the failures once
+        self.first_error = None
+
+    @property
+    def up_to_date(self):
+        """True for an incremental refresh with nothing new or changed to download."""
+        return self.delta_plan is not None and not self.delta_plan.to_fetch
+
+    def resume(self):
+        """Loads the journal of an earlier, unfinished fetch and starts a new checkpoint.
+
+        Returns the number of resumed games; self.pending holds the games still to fetch.
+        """
+        if self.journal is None:
+            return 0
+        self.resumed_records = self.journal.load(self.include_achievements, self.include_patch_urls)
+        self.finished_ids.update(self.resumed_records)
+        if self.resumed_records:
+            self.pending = [entry for entry in self.game_list
+                            if not (isinstance(entry, dict) and str(entry.get('ID')) in self.resumed_records)]
+        self.journal.start(self.include_achievements, self.include_patch_urls)
+        return len(self.resumed_records)
+
+    def run(self, engine, progress_callback=None, skip_callback=None):
+        """Fetches the pending games with the engine and returns the complete cache records."""
+        try:
+            fetched_records = engine.run(self.console_id, self.pending,
+                                         progress_callback=progress_callback, skip_callback=skip_callback,
+                                         result_callback=self.game_finished, failure_callback=self.game_failed)
+            return self.complete(fetched_records)
+        finally:
+            if self.journal:
+                self.journal.close()
+
+    def game_finished(self, game_id_str, record):
+        """Notes a finished game (record None if it has no usable hashes) and checkpoints it. Thread-safe."""
+        self.finished_ids.add(game_id_str)
+        if self.journal:
+            self.journal.add(game_id_str, record)
+
+    def game_failed(self, game_id_str, error):
+        """Notes a game whose requests failed (error is the ApiRequestError). Thread-safe."""
+        self.failed_ids.add(game_id_str)
+        if self.first_error is None:
+            self.first_error = error
+
+    def complete(self, fetched_records):
+        """Adds resumed records and, for an incremental refresh, the unchanged cached ones."""
+        records = fetched_records
+        if self.resumed_records:
+            records = combine_resumed_records(self.game_list, self.resumed_records, records)
+        if self.delta_plan is not None:
+            # Incremental refresh: merge the re-fetched games into the cached records
+            records = self.delta_plan.merge(records, self.finished_ids)
+        return records
+
+    def discard_journal(self):
+        """Call once the records are saved to the cache file.
+
+        Not after failed games (see failed_ids): the journal keeps the fetched ones
+        so the next fetch only retries the failed games.
+        """
+        if self.journal:
+            self.journal.discard()
+
+
+def load_console_job(request_func, cache_store, console_id, incremental=False,
+                     include_achievements=True, include_patch_urls=True):
+    """Requests the game list of a console and returns its ConsoleFetchJob.
+
+    With incremental=True an existing cache file is refreshed by only fetching new/changed games.
+    Returns None if the game list could not be loaded.
+    """
+    console_id_str = str(console_id)
+    cached_records = None
+    if incremental:
+        try:
+            cached_records = cache_store.load(console_id_str)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable cache file for console {console_id_str}: {e}")
+    game_list_params = {'i': console_id_str}
+    if cached_records:
+        game_list_params['h'] = 1 # Include the md5 list per game so hash changes can be detected
+    game_list = request_func(API_GAME_LIST_URL, game_list_params)
+    if not isinstance(game_list, list):
+        return None
+    return ConsoleFetchJob(console_id_str, game_list, cached_records,
+                           journal_path=cache_store.get_journal_filename(console_id_str),
+                           include_achievements=include_achievements, include_patch_urls=include_patch_urls,
+                           incremental=bool(cached_records))
+
+
+class _GameCancelled(Exception):
+    """A game that was not started or was interrupted because of cancellation (its record is discarded)."""
+
+
+class _BatchConsole:
+    """Per-console state of a BatchFetchPipeline run."""
+
+    def __init__(self, console_id, job):
+        self.console_id = console_id
+        self.job = job
+        self.total = len(job.pending) if job else 0
+        self.done = 0
+        self.results = [None] * self.total
+
+
+class BatchFetchPipeline:
+    """Fetches several consoles through one shared worker pool and rate limiter.
+
+    Game lists are requested a few consoles ahead and the per-game tasks of all
+    consoles go through one bounded submission window in console order, so the
+    next console's games fill the pool while the previous one finishes instead
+    of the API budget idling between consoles. Each console is handed to
+    console_done_callback (e.g. to save its cache file) as soon as its last game
+    completes. All callbacks run in the thread that called run().
+    """
+
+    def __init__(self, engine, prepare_job, lookahead=2, cancel_check=None, log_func=print):
+        # prepare_job(console_id_str) -> ConsoleFetchJob or None, runs on the pool (see load_console_job)
+        self.engine = engine
+        self.prepare_job = prepare_job
+        self.lookahead = max(1, int(lookahead))
+        self.cancel_check = cancel_check or engine.cancel_check
+        self.log_func = log_func
+
+    def _fetch(self, console, index, game_entry):
+        if self.cancel_check():
+            raise _GameCancelled()
+        try:
+            record = self.engine.fetch_game(console.console_id, game_entry)
+        except ApiRequestCancelled:
+            raise _GameCancelled()
+        if self.cancel_check():
+            # Cancelled mid-game, the record may be missing its extended info
+            raise _GameCancelled()
+        return record
+
+    def run(self, console_ids, progress_callback=None, console_done_callback=None, skip_callback=None):
+        """Fetches all consoles; returns the number of consoles that completed.
+
+        progress_callback(console_id_str, done, total, game_title, batch_done, batch_total) reports
+        per-console and aggregate game progress (batch_total grows as game lists arrive).
+        console_done_callback(console_id_str, job, records, consoles_done, consoles_total) is called
+        once per console; job and records are None if its game list could not be loaded, games
+        whose requests failed are left out of records and noted in job.failed_ids.
+        skip_callback(console_id_str, reason, *details) receives skipped game list entries.
+        """
+        console_ids = [str(console_id) for console_id in console_ids]
+        consoles_total = len(console_ids)
+        consoles_done = 0
+        batch_done = 0
+        batch_total = 0
+        window = self.engine.max_workers * 2 # Enough queued work to keep every worker busy
+
+        to_prepare = deque(console_ids)
+        preparing = deque() # (console_id, future) in console order
+        game_queue = deque() # (console, index, game_entry)
+        in_flight = {} # future -> (console, index, game_entry)
+        active = []
+
+        def finish(console):
+            nonlocal consoles_done
+            consoles_done += 1
+            records = None
+            if console.job is not None:
+                records = console.job.complete([record for record in console.results if record is not None])
+                if console.job.journal:
+                    console.job.journal.close()
+            if console_done_callback:
+                console_done_callback(console.console_id, console.job, records, consoles_done, consoles_total)
+
+        executor = ThreadPoolExecutor(max_workers=self.engine.max_workers, thread_name_prefix="ra-batch")
+        try:
+            while not self.cancel_check():
+                # Request the next game lists ahead of time
+                while to_prepare and len(preparing) < self.lookahead:
+                    console_id = to_prepare.popleft()
+                    preparing.append((console_id, executor.submit(self.prepare_job, console_id)))
+
+                # Queue the games of prepared consoles (in order) while the window runs low
+                while preparing and preparing[0][1].done() and len(game_queue) < window:
+                    console_id, future = preparing.popleft()
+                    job = future.result()
+                    console = _BatchConsole(console_id, None)
+                    if job is not None:
+                        job.resume()
+                        console = _BatchConsole(console_id, job)
+                        for index, game_entry in enumerate(job.pending):
+                            if self.engine.is_fetchable(index, game_entry,
+                                                        (lambda *details, c=console_id: skip_callback(c, *details)) if skip_callback else None):
+                                game_queue.append((console, index, game_entry))
+                            else:
+                                console.done += 1
+                        batch_total += console.total
+                        batch_done += console.done
+                    if console.done >= console.total:
+                        # Nothing (left) to download for this console
+                        finish(console)
+                    else:
+                        active.append(console)
+
+                while game_queue and len(in_flight) < window:
+                    console, index, game_entry = game_queue.popleft()
+                    in_flight[executor.submit(self._fetch, console, index, game_entry)] = (console, index, game_entry)
+
+                if not in_flight and not preparing and not to_prepare:
+                    break
+
+                waiting_for = set(in_flight)
+                if preparing and not preparing[0][1].done():
+                    waiting_for.add(preparing[0][1])
+                completed, _ = wait(waiting_for, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    if future not in in_flight:
+                        continue # a game list, handled at the top of the loop
+                    console, index, game_entry = in_flight.pop(future)
+                    game_title = game_entry.get('Title', f"Unbekanntes Spiel ID {game_entry.get('ID')}")
+                    try:
+                        record = future.result()
+                    except _GameCancelled:
+                        continue
+                    except ApiRequestError as e:
+                        if self.cancel_check():
+                            continue
+                        console.job.game_failed(str(game_entry.get('ID')), e)
+                    else:
+                        if record is None and not self.cancel_check() and skip_callback:
+                            skip_callback(console.console_id, "data_fetch_skipping_no_hashes", game_entry.get('ID'), game_title)
+                        console.results[index] = record
+                        console.job.game_finished(str(game_entry.get('ID')), record)
+                    console.done += 1
+                    batch_done += 1
+                    if progress_callback:
+                        progress_callback(console.console_id, console.done, console.total, game_title, batch_done, batch_total)
+                    if console.done >= console.total:
+                        active.remove(console)
+                        finish(console)
+            if self.cancel_check():
+                self.log_func("DEBUG: Batch fetch detected cancellation flag, stopping.")
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            # Unfinished consoles keep their journal for a later resume
+            for console in active:
+                if console.job and console.job.journal:
+                    console.job.journal.close()
+        return consoles_done
+
+
+if __name__ == '__main__':
+    # python ra_fetch.py --parse-benchmark [cache folder] times parse_game_hashes on the cached consoles
+    # with the cache backend of settings.ini
+    if '--parse-benchmark' in sys.argv[1:]:
+        import configparser
+        from ra_cache import open_cache_store
+        from ra_config import read_settings
+
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        config = configparser.ConfigParser()
+        config.read(os.path.join(script_dir, "settings.ini"), encoding='utf-8')
+        args = [arg for arg in sys.argv[1:] if arg != '--parse-benchmark']
+        bench_cache_dir = args[0] if args else os.path.join(script_dir, "cache")
+        bench_store = open_cache_store(bench_cache_dir, read_settings(config, script_dir)['cache_backend'])
+        games, hashes, seconds = benchmark_parse_game_hashes(bench_store)
+        print(f"parse_game_hashes: {games} games, {hashes} hashes in {seconds * 1000:.1f} ms "
+              f"({hashes / seconds if seconds else 0:,.0f} hashes/s)")
@@ -0,0 +1,676 @@
+"""RetroAchievements-compatible ROM hashes, one strategy per console ID (no Tk).
+
+The game hashes of the RA API are not always the MD5 of the whole file: the
+rules below follow rcheevos (rc_hash), e.g. NES/FDS/Lynx/7800 headers and SNES
+copier headers are skipped, N64 dumps are hashed in big endian byte order and
+disc images are hashed from the boot files of their first data track.
+Consoles without a registered strategy use the MD5 of the whole file.
+The ROMs inside .zip and .7z archives are hashed while they are decompressed,
+without writing them to disk.
+"""
+import hashlib
+import lzma
+import mmap
+import os
+import queue
+import struct
+import threading
+import zipfile
+import zlib
+from array import array
+from collections import namedtuple
+
+# Files up to this size are read in chunks, bigger ones (disc images) are memory-mapped
+MMAP_THRESHOLD = 64 * 1024 * 1024
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Console IDs of the RA API
+CONSOLE_N64 = '2'
+CONSOLE_SNES = '3'
+CONSOLE_NES = '7'
+CONSOLE_PC_ENGINE = '8'
+CONSOLE_SEGA_CD = '9'
+CONSOLE_PLAYSTATION = '12'
+CONSOLE_LYNX = '13'
+CONSOLE_NINTENDO_DS = '18'
+CONSOLE_ARCADE = '27'
+CONSOLE_SATURN = '39'
+CONSOLE_ATARI_7800 = '51'
+CONSOLE_PC_ENGINE_CD = '76'
+CONSOLE_NINTENDO_DSI = '78'
+
+# Disc based consoles whose hash method is not implemented; the MD5 of the image would never match
+UNSUPPORTED_CONSOLES = {
+    '16': "GameCube", '21': "PlayStation 2", '40': "Dreamcast", '41': "PlayStation Portable",
+    '43': "3DO", '49': "PC-FX", '56': "Neo Geo CD", '77': "Atari Jaguar CD",
+}
+
+# Console of a file without a console ID, for extensions that belong to one console only
+EXTENSION_CONSOLES = {
+    '.nes': CONSOLE_NES, '.fds': CONSOLE_NES,
+    '.sfc': CONSOLE_SNES, '.smc': CONSOLE_SNES,
+    '.z64': CONSOLE_N64, '.n64': CONSOLE_N64, '.v64': CONSOLE_N64,
+    '.lnx': CONSOLE_LYNX, '.a78': CONSOLE_ATARI_7800, '.pce': CONSOLE_PC_ENGINE, '.nds': CONSOLE_NINTENDO_DS,
+}
+
+ARCHIVE_EXTENSIONS = ('.zip', '.7z')
+# Archive members that are never ROMs (readmes, scans, ...)
+ARCHIVE_SKIPPED_EXTENSIONS = {'.txt', '.nfo', '.diz', '.htm', '.html', '.url', '.pdf', '.jpg', '.jpeg', '.png', '.gif'}
+# Decompressed chunks waiting for the hasher of a 7z member, bounds the memory per member
+SEVEN_ZIP_QUEUE_CHUNKS = 8
+
+CD_SECTOR_DATA_SIZE = 2048
+_CD_SYNC = b'\x00' + b'\xff' * 10 + b'\x00'
+
+
+class RomHashError(ValueError):
+    """A file that cannot be hashed with the method of its console (wrong format, unsupported console)."""
+
+
+# method is stored with each hash in the RomHashCache, a changed method hashes the files again
+RomHasher = namedtuple('RomHasher', 'method func')
+
+_HASHERS = {}
+
+
+def register_hasher(console_ids, method):
+    """Decorator registering func(rom) -> md5 hex digest (rom is a RomSource) as the hash method of these console IDs."""
+    def decorator(func):
+        for console_id in console_ids:
+            _HASHERS[str(console_id)] = RomHasher(method, func)
+        return func
+    return decorator
+
+
+def md5_of_file(path, offset=0):
+    """MD5 hex digest of a whole file, or of everything after the first offset bytes."""
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size - offset >= MMAP_THRESHOLD:
+            # hashlib releases the GIL for large buffers and the OS does the read ahead
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                md5.update(view[offset:])
+        else:
+            f.seek(offset)
+            for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+                md5.update(chunk)
+    return md5.hexdigest()
+
+
+class RomSource:
+    """A ROM to hash: a file on disk or a member of an archive.
+
+    name is the file or member name (its extension can select the hash method),
+    size the uncompressed size and path the file on disk (None inside an archive).
+    open() returns a binary file object, which the hashers read front to back;
+    inside a 7z archive it cannot seek backwards.
+    """
+
+    def __init__(self, name, size, open_func, path=None):
+        self.name = name
+        self.size = size
+        self.open = open_func
+        self.path = path
+
+    @classmethod
+    def from_path(cls, path):
+        return cls(path, os.path.getsize(path), lambda: open(path, 'rb'), path)
+
+
+def _md5_of_stream(f, md5):
+    for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+        md5.update(chunk)
+    return md5.hexdigest()
+
+
+def _md5_without_header(rom, head_size, header_size_func):
+    """MD5 of rom without its first header_size_func(first head_size bytes) bytes."""
+    if rom.path is not None:
+        with open(rom.path, 'rb') as f:
+            head = f.read(head_size)
+        return md5_of_file(rom.path, header_size_func(head))
+    with rom.open() as f:
+        head = f.read(head_size)
+        return _md5_of_stream(f, hashlib.md5(head[header_size_func(head):]))
+
+
+def _hash_plain(rom):
+    if rom.path is not None:
+        return md5_of_file(rom.path)
+    with rom.open() as f:
+        return _md5_of_stream(f, hashlib.md5())
+
+
+PLAIN_HASHER = RomHasher('md5', _hash_plain)
+
+
+def get_hasher(console_id=None, path=None):
+    """The RomHasher of a console; without a console ID it is guessed from the extension of path."""
+    if console_id is None:
+        console_id = EXTENSION_CONSOLES.get(os.path.splitext(path or '')[1].lower())
+    if console_id is None:
+        return PLAIN_HASHER
+    return _HASHERS.get(str(console_id), PLAIN_HASHER)
+
+
+def rom_hash(path, console_id=None):
+    """The RetroAchievements hash (md5 hex digest) of a ROM or disc image file; raises OSError or RomHashError."""
+    return get_hasher(console_id, path).func(RomSource.from_path(path))
+
+
+def _read_at(f, offset, size):
+    f.seek(offset)
+    return f.read(size)
+
+
+def _unsupported(console_name):
+    def hash_unsupported(rom):
+        raise RomHashError(f"RetroAchievements hashes of {console_name} games are not supported")
+    return hash_unsupported
+
+
+for _console_id, _console_name in UNSUPPORTED_CONSOLES.items():
+    register_hasher([_console_id], 'unsupported')(_unsupported(_console_name))
+
+
+# --- Cartridge consoles ---
+
+@register_hasher([CONSOLE_NES], 'nes')
+def hash_nes(rom):
+    """iNES and FDS dumps without their 16 byte header."""
+    return _md5_without_header(rom, 16, lambda head: 16 if head[:4] in (b'NES\x1a', b'FDS\x1a') else 0)
+
+
+@register_hasher([CONSOLE_LYNX], 'lynx')
+def hash_lynx(rom):
+    """Lynx dumps without their 64 byte LYNX header."""
+    return _md5_without_header(rom, 64, lambda head: 64 if head[:5] == b'LYNX\x00' else 0)
+
+
+@register_hasher([CONSOLE_ATARI_7800], 'atari7800')
+def hash_atari_7800(rom):
+    """7800 dumps without their 128 byte A78 header."""
+    return _md5_without_header(rom, 128, lambda head: 128 if head[1:10] == b'ATARI7800' else 0)
+
+
+@register_hasher([CONSOLE_SNES], 'snes')
+def hash_snes(rom):
+    """SNES dumps without a 512 byte copier header (the ROM itself is a multiple of 8 KB)."""
+    header_size = 512 if rom.size % 8192 == 512 else 0
+    return _md5_without_header(rom, header_size, lambda head: header_size)
+
+
+@register_hasher([CONSOLE_N64], 'n64')
+def hash_n64(rom):
+    """N64 dumps in big endian (.z64) byte order; .v64 (16 bit swapped) and .n64 (little endian) are converted."""
+    with rom.open() as f:
+        first_chunk = f.read(READ_CHUNK_SIZE)
+        first_byte = first_chunk[:1]
+        if first_byte == b'\x80':
+            word_type = None
+        elif first_byte == b'\x37':
+            word_type = 'H'
+        elif first_byte == b'\x40':
+            word_type = 'I'
+        else:
+            raise RomHashError(f"Not a Nintendo 64 ROM: {rom.name}")
+        md5 = hashlib.md5()
+        chunk = first_chunk
+        while chunk:
+            if word_type is not None:
+                words = array(word_type)
+                usable = len(chunk) - len(chunk) % words.itemsize
+                words.frombytes(chunk[:usable])
+                words.byteswap()
+                chunk = words.tobytes() + chunk[usable:]
+            md5.update(chunk)
+            chunk = f.read(READ_CHUNK_SIZE)
+    return md5.hexdigest()
+
+
+@register_hasher([CONSOLE_NINTENDO_DS, CONSOLE_NINTENDO_DSI], 'nds')
+def hash_nintendo_ds(rom):
+    """The first 0x160 header bytes, the ARM9 and ARM7 code and the 0xA00 byte icon of a DS ROM."""
+    md5 = hashlib.md5()
+    with rom.open() as f:
+        offset = 0
+        header = f.read(0x200)
+        if header[:4] == b'\x2e\x00\x00\xea' and header[0xb0:0xb4] == b'\x44\x46\x96\x00':
+            # SuperCard dumps have an extra 512 byte header
+            offset = 0x200
+            header = f.read(0x200)
+        if len(header) < 0x160:
+            raise RomHashError(f"Not a Nintendo DS ROM: {rom.name}")
+        arm9_addr, = struct.unpack_from('<I', header, 0x20)
+        arm9_size, = struct.unpack_from('<I', header, 0x2c)
+        arm7_addr, = struct.unpack_from('<I', header, 0x30)
+        arm7_size, = struct.unpack_from('<I', header, 0x3c)
+        icon_addr, = struct.unpack_from('<I', header, 0x68)
+        if arm9_size + arm7_size > 16 * 1024 * 1024:
+            raise RomHashError(f"ARM9 and ARM7 code of {rom.name} exceed 16 MB, not a Nintendo DS ROM")
+        ranges = [(arm9_addr + offset, arm9_size), (arm7_addr + offset, arm7_size), (icon_addr + offset, 0xa00)]
+        # Read in file order, so an archive member is decompressed only once
+        position = offset + 0x200
+        parts = {}
+        for start, size in sorted(set(ranges)):
+            if start >= position:
+                f.seek(start - position, os.SEEK_CUR)
+            else:
+                f.seek(start)
+            parts[start, size] = f.read(size)
+            position = start + len(parts[start, size])
+        md5.update(header[:0x160])
+        md5.update(parts[ranges[0]])
+        md5.update(parts[ranges[1]])
+        md5.update(parts[ranges[2]].ljust(0xa00, b'\x00'))
+    return md5.hexdigest()
+
+
+@register_hasher([CONSOLE_ARCADE], 'arcade')
+def hash_arcade(rom):
+    """Arcade sets are identified by their file name (the MAME/FBNeo set name) without the extension."""
+    return hashlib.md5(os.path.splitext(os.path.basename(rom.name))[0].encode('utf-8')).hexdigest()
+
+
+# --- Disc images ---
+
+def is_disc_image(rom):
+    """True for .cue and .iso files and for .bin files in the raw 2352 byte sector format."""
+    ext = os.path.splitext(rom.name)[1].lower()
+    if ext in ('.cue', '.iso'):
+        return True
+    if ext != '.bin':
+        return False
+    with rom.open() as f:
+        return f.read(12) == _CD_SYNC
+
+
+def _disc_path(rom):
+    # The tracks of a .cue are separate files and the file system needs random access
+    if rom.path is None:
+        raise RomHashError(f"Disc images inside archives are not supported: {rom.name}")
+    return rom.path
+
+
+class CdTrack:
+    """The first data track of a disc image (.cue with its .bin files, a raw .bin or an .iso).
+
+    read_sector(n) returns the 2048 data bytes of sector n, counted from the start of the track.
+    """
+
+    def __init__(self, path):
+        self.path, self.start, self.sector_size, self.data_offset = self._locate(path)
+
+    @classmethod
+    def _locate(cls, path):
+        ext = os.path.splitext(path)[1].lower()
+        if ext == '.cue':
+            return cls._parse_cue(path)
+        if ext == '.iso':
+            return path, 0, CD_SECTOR_DATA_SIZE, 0
+        # Raw image: the sync pattern tells the sector layout, its mode byte where the data starts
+        with open(path, 'rb') as f:
+            head = f.read(16)
+        if head[:12] == _CD_SYNC:
+            return path, 0, 2352, 16 if head[15] == 1 else 24
+        return path, 0, CD_SECTOR_DATA_SIZE, 0
+
+    @staticmethod
+    def _parse_cue(path):
+        # Only the first data track is needed: FILE, TRACK nn MODEx/size and its INDEX 01
+        layouts = {'MODE1/2048': (2048, 0), 'MODE1/2352': (2352, 16), 'MODE2/2336': (2336, 8),
+                   'MODE2/2352': (2352, 24)}
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            lines = f.read().splitlines()
+        current_file = None
+        layout = None
+        for line in lines:
+            words = line.strip().split()
+            if not words:
+                continue
+            keyword = words[0].upper()
+            if keyword == 'FILE':
+                name = line.strip()[5:].rsplit(None, 1)[0].strip().strip('"')
+                current_file = os.path.join(os.path.dirname(path), name)
+            elif keyword == 'TRACK' and len(words) >= 3:
+                layout = layouts.get(words[2].upper())
+            elif keyword == 'INDEX' and len(words) >= 3 and words[1] == '01' and layout is not None:
+                minutes, seconds, frames = (int(value) for value in words[2].split(':'))
+                sector_size, data_offset = layout
+                start = ((minutes * 60 + seconds) * 75 + frames) * sector_size
+                return current_file, start, sector_size, data_offset
+        raise RomHashError(f"No data track in {path}")
+
+    def __enter__(self):
+        self._file = open(self.path, 'rb')
+        return self
+
+    def __exit__(self, *exc_info):
+        self._file.close()
+
+    def read_sector(self, sector):
+        data = _read_at(self._file, self.start + sector * self.sector_size + self.data_offset, CD_SECTOR_DATA_SIZE)
+        if len(data) < CD_SECTOR_DATA_SIZE:
+            raise RomHashError(f"Sector {sector} is beyond the end of {self.path}")
+        return data
+
+    def read_file(self, sector, size):
+        """size bytes starting at sector, as a list of sector data chunks."""
+        chunks = []
+        while size > 0:
+            chunks.append(self.read_sector(sector)[:size])
+            size -= CD_SECTOR_DATA_SIZE
+            sector += 1
+        return chunks
+
+    def find_file(self, name):
+        """(sector, size) of a file in the ISO 9660 file system of the track; name may contain
+        backslash separated folders. Returns None if it does not exist.
+        """
+        volume_descriptor = self.read_sector(16)
+        if volume_descriptor[1:6] != b'CD001':
+            raise RomHashError(f"No ISO 9660 file system in {self.path}")
+        sector, size = struct.unpack_from('<I', volume_descriptor, 158)[0], struct.unpack_from('<I', volume_descriptor, 166)[0]
+        parts = [part for part in name.replace('/', '\\').split('\\') if part]
+        for depth, part in enumerate(parts):
+            entry = self._find_entry(sector, size, part.upper(), want_directory=depth < len(parts) - 1)
+            if entry is None:
+                return None
+            sector, size = entry
+        return sector, size
+
+    def _find_entry(self, sector, size, name, want_directory):
+        for chunk in self.read_file(sector, size):
+            position = 0
+            # Records never cross a sector boundary, a 0 length pads the rest of the sector
+            while position < len(chunk) and chunk[position]:
+                record = chunk[position:position + chunk[position]]
+                position += chunk[position]
+                entry_name = record[33:33 + record[32]].decode('ascii', 'replace').upper().split(';')[0]
+                if entry_name == name and bool(record[25] & 2) == want_directory:
+                    return struct.unpack_from('<I', record, 2)[0], struct.unpack_from('<I', record, 10)[0]
+        return None
+
+
+@register_hasher([CONSOLE_SEGA_CD, CONSOLE_SATURN], 'segacd')
+def hash_sega_cd(rom):
+    """The first 512 bytes of the first data sector, which hold the Sega CD/Saturn disc header."""
+    path = _disc_path(rom)
+    with CdTrack(path) as track:
+        header = track.read_sector(0)[:512]
+    if header[:16] not in (b'SEGADISCSYSTEM  ', b'SEGA SEGASATURN '):
+        raise RomHashError(f"Not a Sega CD or Saturn disc: {path}")
+    return hashlib.md5(header).hexdigest()
+
+
+def find_playstation_executable(system_cnf):
+    """The executable named by the BOOT line of a SYSTEM.CNF, without 'cdrom:', leading backslashes and ';1'."""
+    for line in system_cnf.decode('ascii', 'replace').splitlines():
+        key, _, value = line.partition('=')
+        if key.strip() != 'BOOT':
+            continue
+        value = value.strip()
+        if value.startswith('cdrom:'):
+            value = value[len('cdrom:'):]
+        name = value.lstrip('\\').split(';')[0].split()
+        return name[0] if name else None
+    return None
+
+
+@register_hasher([CONSOLE_PLAYSTATION], 'psx')
+def hash_playstation(rom):
+    """The name and content of the boot executable (from SYSTEM.CNF, else PSX.EXE)."""
+    path = _disc_path(rom)
+    with CdTrack(path) as track:
+        location = track.find_file('SYSTEM.CNF')
+        if location is not None:
+            executable = find_playstation_executable(b''.join(track.read_file(*location)))
+            if executable is None:
+                raise RomHashError(f"No BOOT entry in SYSTEM.CNF of {path}")
+        else:
+            executable = 'PSX.EXE'
+        location = track.find_file(executable)
+        if location is None:
+            raise RomHashError(f"Boot executable {executable} not found in {path}")
+        sector, size = location
+        first_sector = track.read_sector(sector)
+        if first_sector[:8] == b'PS-X EXE':
+            # The size in the executable header leaves out the 2048 byte header itself
+            size = struct.unpack_from('<I', first_sector, 28)[0] + CD_SECTOR_DATA_SIZE
+        md5 = hashlib.md5(executable.encode('ascii', 'replace'))
+        for chunk in track.read_file(sector, size):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+@register_hasher([CONSOLE_PC_ENGINE_CD], 'pcecd')
+def hash_pc_engine_cd(rom):
+    """The title from the boot sector and the boot program sectors it points to."""
+    path = _disc_path(rom)
+    with CdTrack(path) as track:
+        boot_sector = track.read_sector(1)
+        if boot_sector[32:55] != b'PC Engine CD-ROM SYSTEM':
+            raise RomHashError(f"Not a PC Engine CD: {path}")
+        program_sector = int.from_bytes(boot_sector[0:3], 'big')
+        md5 = hashlib.md5(boot_sector[106:128])
+        for sector in range(program_sector, program_sector + boot_sector[3]):
+            md5.update(track.read_sector(sector))
+    return md5.hexdigest()
+
+
+@register_hasher([CONSOLE_PC_ENGINE], 'pce')
+def hash_pc_engine(rom):
+    """HuCards without a 512 byte header (the ROM itself is a multiple of 128 KB); disc images as PC Engine CD."""
+    if is_disc_image(rom):
+        return hash_pc_engine_cd(rom)
+    header_size = 512 if rom.size % 0x20000 == 512 else 0
+    return _md5_without_header(rom, header_size, lambda head: header_size)
+
+
+# --- Archives ---
+
+def _is_rom_member(name):
+    return os.path.splitext(name)[1].lower() not in ARCHIVE_SKIPPED_EXTENSIONS
+
+
+def hash_archive(path, console_id=None):
+    """Hashes the ROMs inside a .zip or .7z file without extracting them to disk.
+
+    Returns [(member name, md5 or None, error or None)] in archive order; arcade
+    sets (console 27) are hashed by the archive name, as [(None, md5, None)].
+    Raises OSError or RomHashError if the archive itself cannot be read.
+    """
+    if get_hasher(console_id, path).method == 'arcade':
+        return [(None, hash_arcade(RomSource.from_path(path)), None)]
+    if os.path.splitext(path)[1].lower() == '.7z':
+        return _hash_seven_zip(path, console_id)
+    return _hash_zip(path, console_id)
+
+
+def _hash_member(rom, console_id):
+    try:
+        return rom.name, get_hasher(console_id, rom.name).func(rom), None
+    except (OSError, RomHashError, zipfile.BadZipFile, zlib.error, lzma.LZMAError, EOFError,
+            NotImplementedError, RuntimeError) as e:
+        # RuntimeError: encrypted zip member, NotImplementedError: unsupported compression
+        return rom.name, None, str(e)
+
+
+def _hash_zip(path, console_id):
+    try:
+        with zipfile.ZipFile(path) as archive:
+            # ZipFile.open streams a member through the decompressor in READ_CHUNK_SIZE reads
+            return [_hash_member(RomSource(info.filename, info.file_size, lambda info=info: archive.open(info)),
+                                 console_id)
+                    for info in archive.infolist() if not info.is_dir() and _is_rom_member(info.filename)]
+    except zipfile.BadZipFile as e:
+        raise RomHashError(f"Not a valid zip file: {path} ({e})")
+
+
+class _SevenZipMemberReader:
+    """File object over the chunks py7zr decompresses in another thread.
+
+    read() blocks until enough data arrived; seek() only moves forward. The first
+    READ_CHUNK_SIZE bytes are kept, so rewind() can start over for a hasher that
+    opens the ROM again after a look at its header (e.g. is_disc_image).
+    """
+
+    def __init__(self):
+        self._chunks = queue.Queue(SEVEN_ZIP_QUEUE_CHUNKS)
+        self._buffer = bytearray()
+        self._head = bytearray()
+        self._position = 0
+        self._eof = False
+
+    def put(self, chunk):
+        """Adds decompressed data, None marks the end of the member."""
+        self._chunks.put(chunk)
+
+    def _fill(self, size):
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            chunk = self._chunks.get()
+            if chunk is None:
+                self._eof = True
+            else:
+                self._buffer += chunk
+
+    def read(self, size=-1):
+        self._fill(size)
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        if self._position < READ_CHUNK_SIZE:
+            self._head += data[:READ_CHUNK_SIZE - self._position]
+        self._position += len(data)
+        return data
+
+    def rewind(self):
+        """Starts reading from the beginning again, as long as only the kept head was read."""
+        if self._position > len(self._head):
+            raise RomHashError("Cannot read a 7z archive member twice")
+        self._buffer[:0] = self._head
+        self._head = bytearray()
+        self._position = 0
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        target = offset if whence == os.SEEK_SET else self._position + offset
+        if whence not in (os.SEEK_SET, os.SEEK_CUR) or target < self._position:
+            raise RomHashError("Cannot seek backwards in a 7z archive member")
+        while self._position < target and self.read(min(target - self._position, READ_CHUNK_SIZE)):
+            pass
+        return self._position
+
+    def drain(self):
+        """Consumes the rest of the member, so the writing thread never blocks."""
+        while not self._eof:
+            self._buffer.clear()
+            self._fill(READ_CHUNK_SIZE)
+        self._buffer.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class _SevenZipHashWriter:
+    """Write side of a 7z member for py7zr: hashes the member in its own thread while it is decompressed."""
+
+    def __init__(self, rom, console_id):
+        self.name = rom.name
+        self.reader = _SevenZipMemberReader()
+        self.result = None
+        self._written = 0
+        self._complete = False
+        self._opened = False
+        rom.open = self._open
+        self._thread = threading.Thread(target=self._run, args=(rom, console_id), daemon=True)
+        self._thread.start()
+
+    def _open(self):
+        # Every open() of the ROM reads the member from its start
+        if self._opened:
+            self.reader.rewind()
+        self._opened = True
+        return self.reader
+
+    def _run(self, rom, console_id):
+        try:
+            self.result = _hash_member(rom, console_id)
+        except Exception as e: # Any failure of a hasher must still leave a result for this member
+            self.result = (self.name, None, str(e))
+        finally:
+            self.reader.drain()
+
+    def write(self, data):
+        # py7zr does not reuse its buffers, only writable ones need a copy
+        self.reader.put(data if isinstance(data, bytes) else bytes(data))
+        self._written += len(data)
+        return len(data)
+
+    def read(self, size=None):
+        return b''
+
+    def seek(self, offset, whence=0):
+        return self._written
+
+    def seekable(self):
+        # py7zr rewinds seekable writers after the extraction
+        return False
+
+    def flush(self):
+        pass
+
+    def size(self):
+        return self._written
+
+    def close(self):
+        # Only called by py7zr when the member was decompressed completely
+        self._complete = True
+        self.finish()
+
+    def finish(self, error=None):
+        """Ends the member and waits for its hash; a member cut off by a failed extraction gets the error."""
+        if self._thread.is_alive():
+            self.reader.put(None)
+            self._thread.join()
+        if not self._complete:
+            self.result = (self.name, None, error or "Not extracted completely")
+
+
+def _hash_seven_zip(path, console_id):
+    try:
+        import py7zr # Optional, only needed for .7z archives
+        from py7zr.exceptions import ArchiveError, PasswordRequired
+    except ImportError:
+        raise RomHashError(f"Hashing 7z archives needs the py7zr package (pip install py7zr): {path}")
+
+    class WriterFactory(py7zr.io.WriterFactory):
+        def __init__(self, sizes):
+            self.sizes = sizes
+            self.writers = []
+
+        def create(self, filename):
+            writer = _SevenZipHashWriter(RomSource(filename, self.sizes.get(filename, 0), None), console_id)
+            self.writers.append(writer)
+            return writer
+
+    try:
+        with py7zr.SevenZipFile(path, 'r') as archive:
+            members = [info for info in archive.list() if not info.is_directory and _is_rom_member(info.filename)]
+            factory = WriterFactory({info.filename: info.uncompressed for info in members})
+            error = None
+            try:
+                archive.extract(targets=[info.filename for info in members], factory=factory)
+            except (ArchiveError, PasswordRequired, lzma.LZMAError, EOFError, ValueError) as e:
+                error = f"Could not decompress {path}: {e}"
+            finally:
+                for writer in factory.writers:
+                    writer.finish(error)
+    except (ArchiveError, PasswordRequired) as e:
+        raise RomHashError(f"Not a valid 7z file: {path} ({e})")
+    results = {writer.name: writer.result for writer in factory.writers}
+    return [results.get(info.filename, (info.filename, None, error or "Not extracted")) for info in members]
@@ -0,0 +1,128 @@
+"""Cache of API responses with per-endpoint TTLs and ETag/Last-Modified revalidation (no Tk)."""
+import json
+import os
+import sqlite3
+import time
+import zlib
+from collections import namedtuple
+
+from ra_api import (API_USER_PROFILE_URL, API_CONSOLE_IDS_URL, API_GAME_LIST_URL,
+                    API_GET_GAME_HASHES_URL, API_GET_GAME_EXTENDED_URL)
+from ra_cache import connect_sqlite
+
+# settings.ini [API_CACHE] key of each endpoint
+API_CACHE_ENDPOINTS = {
+    os.path.basename(API_CONSOLE_IDS_URL): 'console_ids',
+    os.path.basename(API_GAME_LIST_URL): 'game_list',
+    os.path.basename(API_GET_GAME_HASHES_URL): 'game_hashes',
+    os.path.basename(API_GET_GAME_EXTENDED_URL): 'game_extended',
+    os.path.basename(API_USER_PROFILE_URL): 'user_profile',
+}
+
+# Credentials never become part of a cache key, the cached data is the same for every user
+_SECRET_PARAMS = ('z', 'y')
+
+CachedResponse = namedtuple('CachedResponse', 'key data etag last_modified fresh')
+
+
+def response_cache_key(url, params):
+    """endpoint?sorted non-secret params, e.g. 'API_GetGameList.php?h=1&i=7'."""
+    endpoint = os.path.basename(url.split('?')[0])
+    query = "&".join(f"{name}={value}" for name, value in sorted((params or {}).items())
+                     if name not in _SECRET_PARAMS)
+    return f"{endpoint}?{query}"
+
+
+class ApiResponseCache:
+    """Response bodies of earlier API requests, kept in cache/api_responses.sqlite.
+
+    ttls maps the [API_CACHE] keys of API_CACHE_ENDPOINTS to seconds; an endpoint
+    with 0 (or missing) is never cached. Within its TTL a response is served
+    without any request. After that it is only kept if the server sent an ETag or
+    Last-Modified header, so ApiClient can revalidate it with a conditional request
+    and reuse the body on a 304 answer. A broken cache database only costs the
+    requests it would have saved, its errors are printed and ignored.
+    With revalidate, every cached response counts as stale.
+    """
+
+    DB_FILENAME = "api_responses.sqlite"
+
+    def __init__(self, cache_dir, ttls, revalidate=False):
+        self.cache_dir = cache_dir
+        self.db_path = os.path.join(cache_dir, self.DB_FILENAME)
+        self.ttls = dict(ttls)
+        self.revalidate = revalidate
+        self._ready = False
+
+    def _connect(self):
+        if not self._ready:
+            # Created on first use, so starting the program does not touch the cache folder
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with connect_sqlite(self.db_path) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("CREATE TABLE IF NOT EXISTS responses ("
+                             " key TEXT PRIMARY KEY, body BLOB NOT NULL, etag TEXT, last_modified TEXT,"
+                             " stored_at REAL NOT NULL) WITHOUT ROWID")
+            self._ready = True
+        return connect_sqlite(self.db_path)
+
+    def ttl(self, url):
+        return self.ttls.get(API_CACHE_ENDPOINTS.get(os.path.basename(url.split('?')[0])), 0)
+
+    def lookup(self, url, params):
+        """The CachedResponse of a request, or None if there is nothing usable."""
+        ttl = self.ttl(url)
+        if ttl <= 0:
+            return None
+        key = response_cache_key(url, params)
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT body, etag, last_modified, stored_at FROM responses WHERE key = ?",
+                                   (key,)).fetchone()
+            if row is None:
+                return None
+            body, etag, last_modified, stored_at = row
+            fresh = not self.revalidate and time.time() - stored_at < ttl
+            if not fresh and not etag and not last_modified:
+                return None
+            return CachedResponse(key, json.loads(zlib.decompress(body)), etag, last_modified, fresh)
+        except (sqlite3.Error, OSError, zlib.error, ValueError) as e:
+            print(f"Warning: Could not read '{key}' from the API response cache: {e}")
+            return None
+
+    @staticmethod
+    def validators(entry):
+        """Request headers that ask the server to answer 304 if entry is still current."""
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def store(self, url, params, content, headers):
+        """Keeps the raw body of a successful response (content, bytes) with its validators."""
+        if self.ttl(url) <= 0:
+            return
+        key = response_cache_key(url, params)
+        self._write("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                    (key, zlib.compress(content), headers.get('ETag'), headers.get('Last-Modified'), time.time()))
+
+    def touch(self, entry):
+        """Marks a revalidated (304) entry as fresh again."""
+        self._write("UPDATE responses SET stored_at = ? WHERE key = ?", (time.time(), entry.key))
+
+    def _write(self, sql, values):
+        try:
+            with self._connect() as conn:
+                conn.execute(sql, values)
+                conn.commit()
+        except (sqlite3.Error, OSError) as e:
+            print(f"Warning: Could not update the API response cache '{self.db_path}': {e}")
+
+    def clear(self):
+        if not os.path.exists(self.db_path):
+            return
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+            conn.commit()
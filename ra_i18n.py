@@ -0,0 +1,185 @@
+"""Loading and formatting of the lang/<code>.ini translations (no Tk)."""
+import configparser
+import json
+import os
+import re
+
+# Bumped when the layout of the compiled catalogue files changes
+CATALOG_CACHE_VERSION = 1
+
+# One %-conversion of a translation ("%%" is matched too, but takes no argument)
+_FORMAT_SPEC_RE = re.compile(r"%(?:\([^)]*\))?[#0\- +]*(?:\*|\d+)?(?:\.(?:\*|\d+))?[hlL]?([diouxXeEfFgGcrsa%])")
+
+
+def load_translations(lang_dir, lang_code):
+    """Returns the [Translations] section of lang/<lang_code>.ini as a dict, or None if it cannot be loaded."""
+    lang_file = os.path.join(lang_dir, f"{lang_code}.ini")
+    if not os.path.exists(lang_file):
+        return None
+    lang_config = configparser.ConfigParser()
+    try:
+        with open(lang_file, 'r', encoding='utf-8') as f:
+            lang_config.read_file(f)
+    except Exception as e:
+        print(f"Error reading language file '{lang_file}': {e}")
+        return None
+    if 'Translations' not in lang_config:
+        print(f"Warning: '{lang_file}' is missing the '[Translations]' section.")
+        return None
+    return dict(lang_config['Translations'])
+
+
+def read_language_name(lang_file):
+    """Name from the [Language] section at the top of a language file, without parsing the
+    translations; None if the section has no name.
+    """
+    in_language_section = False
+    with open(lang_file, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('['):
+                if in_language_section:
+                    break # The name is only looked for in [Language]
+                in_language_section = line.lower() == '[language]'
+            elif in_language_section and '=' in line:
+                key, value = line.split('=', 1)
+                if key.strip().lower() == 'name':
+                    return value.strip()
+    return None
+
+
+def format_translation(translations, key, *args):
+    """Looks up a translation key and formats it with args."""
+    translation = translations.get(key, f"MISSING_TRANSLATION:{key}")
+    try:
+        # Apply arguments if any
+        if args:
+             # Use %s formatting for simplicity with configparser values
+             # Note: configparser reads values as strings, so formatting with %s is generally safe
+             # For numbers (like %d, %.2f), the translation string must contain the correct format specifier
+             return translation % args
+        return translation
+    except (TypeError, ValueError) as e:
+        # Handle cases where formatting fails (e.g., wrong number/type of args)
+        print(f"Warning: Failed to format translation for key '{key}' with args {args}. Translation: '{translation}'. Error: {e}")
+        return translation # Return the raw translation string
+
+
+def count_format_args(template):
+    """Number of arguments a translation takes (its %-conversions without %%)."""
+    return sum(1 for match in _FORMAT_SPEC_RE.finditer(template) if match.group(1) != '%')
+
+
+class MessageCatalog:
+    """Translations compiled once when a language is loaded.
+
+    The argument count of every message is determined up front, so format()
+    only applies % when the arguments fit and reports a mismatch once per key
+    instead of on every call. With unescape_newlines, the literal \\n of the
+    ini files is turned into line breaks here instead of after each format.
+    """
+
+    def __init__(self, translations, unescape_newlines=False, arg_counts=None):
+        self.translations = translations
+        self.messages = {}
+        # arg_counts can come from a compiled catalogue file (see load_catalog)
+        self.arg_counts = dict(arg_counts) if arg_counts is not None else {}
+        for key, template in translations.items():
+            if unescape_newlines:
+                template = template.replace('\\n', '\n')
+            self.messages[key] = template
+            if arg_counts is None:
+                self.arg_counts[key] = count_format_args(template)
+        self._reported_keys = set()
+
+    def __contains__(self, key):
+        return key in self.messages
+
+    def format(self, key, *args):
+        """Same result as format_translation() for the loaded language."""
+        template = self.messages.get(key)
+        if template is None:
+            return f"MISSING_TRANSLATION:{key}"
+        if not args:
+            return template
+        if len(args) == self.arg_counts[key]:
+            try:
+                return template % args
+            except (TypeError, ValueError) as e:
+                error = e
+        else:
+            error = f"expects {self.arg_counts[key]} arguments"
+        if key not in self._reported_keys:
+            self._reported_keys.add(key)
+            print(f"Warning: Failed to format translation for key '{key}' with args {args}. Translation: '{template}'. Error: {error}")
+        return template
+
+    def lazy(self, key, *args):
+        """A LazyMessage, formatted only when it is turned into a string."""
+        return LazyMessage(self, key, args)
+
+
+class LazyMessage:
+    """A translation whose formatting is deferred until str(), e.g. until a progress label is drawn.
+
+    Progress callbacks create one per game; most are replaced by a newer one
+    before the UI shows them and are never formatted.
+    """
+
+    __slots__ = ('catalog', 'key', 'args')
+
+    def __init__(self, catalog, key, args):
+        self.catalog = catalog
+        self.key = key
+        self.args = args
+
+    def __str__(self):
+        return self.catalog.format(self.key, *self.args)
+
+
+def _compiled_catalog_path(cache_dir, lang_code):
+    return os.path.join(cache_dir, f"lang_{lang_code}.catalog.json")
+
+
+def load_catalog(lang_dir, lang_code, cache_dir=None, unescape_newlines=False):
+    """MessageCatalog of lang/<lang_code>.ini, or None if it cannot be loaded.
+
+    With cache_dir, the compiled catalogue is kept in cache_dir/lang_<code>.catalog.json
+    and used instead of parsing the ini file again as long as the file's mtime and
+    size are unchanged.
+    """
+    lang_file = os.path.join(lang_dir, f"{lang_code}.ini")
+    try:
+        source_stat = os.stat(lang_file)
+    except OSError:
+        return None
+    source = [source_stat.st_mtime_ns, source_stat.st_size]
+
+    compiled_file = _compiled_catalog_path(cache_dir, lang_code) if cache_dir else None
+    if compiled_file:
+        try:
+            with open(compiled_file, 'r', encoding='utf-8') as f:
+                compiled = json.load(f)
+            if compiled.get('version') == CATALOG_CACHE_VERSION and compiled.get('source') == source:
+                return MessageCatalog(compiled['translations'], unescape_newlines, compiled['arg_counts'])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass # Missing or outdated, compiled again below
+
+    translations = load_translations(lang_dir, lang_code)
+    if translations is None:
+        return None
+    catalog = MessageCatalog(translations)
+    if compiled_file:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            temp_file = compiled_file + ".tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'version': CATALOG_CACHE_VERSION, 'source': source,
+                           'translations': translations, 'arg_counts': catalog.arg_counts}, f, ensure_ascii=False)
+            os.replace(temp_file, compiled_file)
+        except OSError as e:
+            print(f"Warning: Could not save the compiled language file '{compiled_file}': {e}")
+    if unescape_newlines:
+        # The arg counts do not change, only the line breaks
+        catalog = MessageCatalog(translations, unescape_newlines, catalog.arg_counts)
+    return catalog
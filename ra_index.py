@@ -0,0 +1,205 @@
+"""Global MD5 index over all cached consoles (cache/hash_index.sqlite), no Tk.
+
+Answers "which RA game does this hash belong to?" with indexed lookups
+instead of loading and scanning every console's cache.
+"""
+import json
+import os
+import time
+
+from ra_cache import connect_sqlite, pack_md5, unpack_md5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS consoles (
+    console_id TEXT PRIMARY KEY,
+    console_name TEXT,
+    source_saved_at REAL NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS games (
+    console_id TEXT NOT NULL,
+    game_id TEXT NOT NULL,
+    title TEXT,
+    num_achievements INTEGER,
+    PRIMARY KEY (console_id, game_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS hashes (
+    md5 BLOB NOT NULL,
+    console_id TEXT NOT NULL,
+    game_id TEXT NOT NULL,
+    name TEXT,
+    labels TEXT,
+    PRIMARY KEY (md5, console_id, game_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS hashes_by_game ON hashes (console_id, game_id);
+CREATE TABLE IF NOT EXISTS hash_labels (
+    label TEXT NOT NULL,
+    md5 BLOB NOT NULL,
+    console_id TEXT NOT NULL,
+    game_id TEXT NOT NULL,
+    PRIMARY KEY (label, md5, console_id, game_id)
+) WITHOUT ROWID;
+"""
+
+_MATCH_COLUMNS = ("h.md5, h.console_id, c.console_name, h.game_id, g.title, h.name, h.labels, g.num_achievements"
+                  " FROM hashes h"
+                  " JOIN consoles c ON c.console_id = h.console_id"
+                  " LEFT JOIN games g ON g.console_id = h.console_id AND g.game_id = h.game_id")
+
+
+def normalize_md5(md5):
+    """Lower case hex digest without surrounding whitespace."""
+    return md5.strip().lower()
+
+
+def _match_from_row(row):
+    md5, console_id, console_name, game_id, title, name, labels, num_achievements = row
+    return {
+        'md5': unpack_md5(md5),
+        'console_id': console_id,
+        'console_name': console_name or f"ID {console_id}",
+        'game_id': game_id,
+        'title': title,
+        'name': name,
+        'labels': json.loads(labels) if labels else [],
+        'num_achievements': num_achievements
+    }
+
+
+class HashIndex:
+    """SQLite index of the cached hashes, keyed by md5, game ID, console ID and label.
+
+    The index is derived data: sync() re-indexes consoles whose cache was saved
+    after they were indexed and drops consoles that are no longer cached.
+    """
+
+    DB_FILENAME = "hash_index.sqlite"
+
+    def __init__(self, cache_dir):
+        self.db_path = os.path.join(cache_dir, self.DB_FILENAME)
+        os.makedirs(cache_dir, exist_ok=True)
+        with connect_sqlite(self.db_path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def sync(self, cache_store, console_names=None):
+        """Brings the index up to date with cache_store; returns the number of re-indexed consoles.
+
+        console_names ({console_id: name}) is stored for the lookup results, a
+        console keeps its previous name if it is not in the mapping.
+        """
+        console_names = console_names or {}
+        cached_ids = set(cache_store.cached_console_ids())
+        with connect_sqlite(self.db_path) as conn:
+            indexed = {console_id: (console_name, saved_at) for console_id, console_name, saved_at
+                       in conn.execute("SELECT console_id, console_name, source_saved_at FROM consoles")}
+
+        for console_id in set(indexed) - cached_ids:
+            self.remove_console(console_id)
+
+        reindexed = 0
+        for console_id in sorted(cached_ids):
+            saved_at = cache_store.saved_at(console_id)
+            old_name, indexed_saved_at = indexed.get(console_id, (None, None))
+            console_name = console_names.get(console_id, old_name)
+            if saved_at is not None and saved_at == indexed_saved_at:
+                if console_name != old_name:
+                    with connect_sqlite(self.db_path) as conn:
+                        conn.execute("UPDATE consoles SET console_name = ? WHERE console_id = ?", (console_name, console_id))
+                        conn.commit()
+                continue
+            try:
+                records = cache_store.load(console_id)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not index cache of console {console_id}: {e}")
+                continue
+            self.index_console(console_id, records or [], saved_at or 0.0, console_name)
+            reindexed += 1
+        return reindexed
+
+    def index_console(self, console_id, records, source_saved_at, console_name=None):
+        """Replaces the console's entries with the hashes of its cache records."""
+        console_id = str(console_id)
+        game_rows = []
+        hash_rows = {}
+        label_rows = set()
+        for record in records:
+            game_id = str(record.get('id'))
+            extended_info = record.get('extended_info') or {}
+            game_rows.append((console_id, game_id, record.get('title'), extended_info.get('num_achievements')))
+            for hash_entry in record.get('hashes') or []:
+                if not isinstance(hash_entry, dict) or not hash_entry.get('md5'):
+                    continue
+                md5 = pack_md5(normalize_md5(hash_entry['md5']))
+                labels = hash_entry.get('labels') if isinstance(hash_entry.get('labels'), list) else []
+                hash_rows[(md5, game_id)] = (md5, console_id, game_id, hash_entry.get('name'),
+                                             json.dumps(labels, ensure_ascii=False))
+                label_rows.update((str(label), md5, console_id, game_id) for label in labels)
+
+        with connect_sqlite(self.db_path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._delete_console(conn, console_id)
+            conn.executemany("INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?)", game_rows)
+            conn.executemany("INSERT INTO hashes VALUES (?, ?, ?, ?, ?)", hash_rows.values())
+            conn.executemany("INSERT INTO hash_labels VALUES (?, ?, ?, ?)", label_rows)
+            conn.execute("INSERT INTO consoles VALUES (?, ?, ?, ?)", (console_id, console_name, source_saved_at, time.time()))
+            conn.commit()
+
+    def remove_console(self, console_id):
+        with connect_sqlite(self.db_path) as conn:
+            self._delete_console(conn, str(console_id))
+            conn.commit()
+
+    @staticmethod
+    def _delete_console(conn, console_id):
+        for table in ('hash_labels', 'hashes', 'games', 'consoles'):
+            conn.execute(f"DELETE FROM {table} WHERE console_id = ?", (console_id,))
+
+    def indexed_console_ids(self):
+        with connect_sqlite(self.db_path) as conn:
+            return [row[0] for row in conn.execute("SELECT console_id FROM consoles")]
+
+    def lookup(self, md5):
+        """All games (possibly on several consoles) that list the hash, as match dicts."""
+        return self.lookup_many([md5]).get(normalize_md5(md5), [])
+
+    def lookup_many(self, md5s):
+        """{md5: [match, ...]} for a batch of hashes; hashes without a match are left out.
+
+        Each match has the keys md5, console_id, console_name, game_id, title,
+        name, labels and num_achievements.
+        """
+        packed = {pack_md5(normalize_md5(md5)) for md5 in md5s if md5 and md5.strip()}
+        matches = {}
+        if not packed:
+            return matches
+        with connect_sqlite(self.db_path) as conn:
+            # Join against a temp table, so a batch of thousands is one indexed query
+            conn.execute("CREATE TEMP TABLE lookup (md5 BLOB PRIMARY KEY) WITHOUT ROWID")
+            conn.executemany("INSERT INTO lookup VALUES (?)", ((md5,) for md5 in packed))
+            rows = conn.execute(f"SELECT {_MATCH_COLUMNS} JOIN lookup l ON l.md5 = h.md5"
+                                " ORDER BY h.md5, CAST(h.console_id AS INTEGER), h.game_id").fetchall()
+        for row in rows:
+            match = _match_from_row(row)
+            matches.setdefault(match['md5'], []).append(match)
+        return matches
+
+    def lookup_game(self, console_id, game_id):
+        """Match dicts of all hashes of one game."""
+        with connect_sqlite(self.db_path) as conn:
+            rows = conn.execute(f"SELECT {_MATCH_COLUMNS} WHERE h.console_id = ? AND h.game_id = ?",
+                                (str(console_id), str(game_id))).fetchall()
+        return [_match_from_row(row) for row in rows]
+
+    def lookup_label(self, label, console_id=None):
+        """Match dicts of all hashes with the label (e.g. 'nointro'), optionally of one console."""
+        query = (f"SELECT {_MATCH_COLUMNS} JOIN hash_labels hl"
+                 " ON hl.md5 = h.md5 AND hl.console_id = h.console_id AND hl.game_id = h.game_id"
+                 " WHERE hl.label = ?")
+        params = [label]
+        if console_id is not None:
+            query += " AND hl.console_id = ?"
+            params.append(str(console_id))
+        with connect_sqlite(self.db_path) as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [_match_from_row(row) for row in rows]
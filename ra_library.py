@@ -0,0 +1,150 @@
+"""Export of many cached consoles at once on a process pool, with a JSON manifest (no Tk)."""
+import json
+import os
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+from ra_cache import open_cache_store
+from ra_export import ExportPlan, build_export_sinks, configure_console_names
+
+MANIFEST_FILENAME = "RetroAchievements - export manifest.json"
+
+# Per worker process, set by _init_export_worker
+_worker_state = {}
+
+
+def _translate(key, *args):
+    return _worker_state['message_catalog'].format(key, *args)
+
+
+def _init_export_worker(cache_dir, cache_backend, message_catalog, settings):
+    # Ctrl+C is handled by the main process, which lets the running consoles finish
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # LibraryExporter.run already migrated the JSON cache files in the main process
+    _worker_state['cache_store'] = open_cache_store(cache_dir, cache_backend, migrate_json=False)
+    _worker_state['message_catalog'] = message_catalog
+    _worker_state['settings'] = settings
+    # Spawned workers do not inherit the [SYSTEM_NAMES]/[SYSTEM_EXTENSIONS] entries of the main process
+    configure_console_names(settings.get('system_short_names'), settings.get('typical_extensions'))
+
+
+def _export_worker(console_id, console_name, formats):
+    """Loads one console from the cache and writes all formats in one ExportPlan; returns its summary dict."""
+    started = time.perf_counter()
+    summary = {
+        'console_id': console_id,
+        'console_name': console_name,
+        'games': 0,
+        'outcomes': {},
+        'skipped': [],
+        'error': None
+    }
+    try:
+        records = _worker_state['cache_store'].load(console_id, hash_details=False)
+        if records:
+            summary['games'] = len(records)
+            sinks, summary['skipped'] = build_export_sinks(console_name, records, formats,
+                                                           _worker_state['settings'], _translate)
+            if sinks:
+                outcomes = ExportPlan(records, sinks, _translate).run()
+                # Exceptions are passed back as text, they do not always pickle
+                summary['outcomes'] = {name: (result, None if error is None else str(error))
+                                       for name, (result, error) in outcomes.items()}
+        else:
+            summary['error'] = _translate("dat_creation_no_data_warning_text", console_name)
+    except Exception as e: # One broken console (sqlite3.Error, bad record, ...) must not stop the others
+        summary['error'] = str(e) or type(e).__name__
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+class LibraryExporter:
+    """Writes the DAT/collection files of many consoles in parallel, one console per worker process.
+
+    Each worker opens the cache itself, so only the console IDs travel to the
+    workers and only the small summary dicts come back.
+    """
+
+    def __init__(self, cache_dir, cache_backend, message_catalog, settings, max_workers=None):
+        self.cache_dir = cache_dir
+        self.cache_backend = cache_backend
+        self.message_catalog = message_catalog
+        self.settings = settings
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def run(self, consoles, formats, result_callback=None, cancel_check=None):
+        """Exports [(console_id, console_name)] and returns their summary dicts in console order.
+
+        A summary has the keys console_id, console_name, games, outcomes ({format:
+        (result, error text or None)} like ExportPlan.run), skipped (formats without
+        games), error (the console could not be loaded) and seconds.
+        result_callback(summary, done, total) is called in the calling thread for each
+        finished console; if cancel_check() returns True, no new consoles are started.
+        """
+        consoles = list(consoles)
+        summaries = {}
+        # Migrate JSON cache files once here, the workers open the store without migrating
+        open_cache_store(self.cache_dir, self.cache_backend)
+        pending = list(reversed(consoles))
+        initargs = (self.cache_dir, self.cache_backend, self.message_catalog, self.settings)
+        with ProcessPoolExecutor(max_workers=min(self.max_workers, max(1, len(consoles))),
+                                 initializer=_init_export_worker, initargs=initargs) as executor:
+            in_flight = set()
+            while pending or in_flight:
+                while pending and len(in_flight) < self.max_workers * 2 and not (cancel_check and cancel_check()):
+                    console_id, console_name = pending.pop()
+                    in_flight.add(executor.submit(_export_worker, console_id, console_name, list(formats)))
+                if not in_flight:
+                    break
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    summary = future.result()
+                    summaries[summary['console_id']] = summary
+                    if result_callback:
+                        result_callback(summary, len(summaries), len(consoles))
+        return [summaries[console_id] for console_id, _ in consoles if console_id in summaries]
+
+
+def write_export_manifest(path, summaries, formats):
+    """Writes the JSON manifest of a library export (the files written per console, their counts
+    and errors); returns the number of consoles with an error.
+    """
+    consoles = []
+    failed = 0
+    for summary in summaries:
+        outputs = {}
+        for name, (result, error) in summary['outcomes'].items():
+            if error is not None:
+                outputs[name] = {'error': error}
+            elif name == 'dat':
+                outputs[name] = {'path': os.path.abspath(result[0]), 'games_with_hashes': result[1],
+                                 'games_with_achievements': result[2]}
+            else:
+                outputs[name] = {'path': os.path.abspath(result[0]), 'games_added': result[1]}
+        errors = [output['error'] for output in outputs.values() if 'error' in output]
+        if summary['error'] is not None:
+            errors.insert(0, summary['error'])
+        failed += bool(errors)
+        consoles.append({
+            'console_id': summary['console_id'],
+            'console_name': summary['console_name'],
+            'games': summary['games'],
+            'outputs': outputs,
+            'skipped': summary['skipped'],
+            'errors': errors,
+            'seconds': summary['seconds']
+        })
+    manifest = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'formats': list(formats),
+        'consoles_exported': len(consoles) - failed,
+        'consoles_failed': failed,
+        'consoles': consoles
+    }
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(temp_path, path)
+    return failed
@@ -0,0 +1,62 @@
+"""Thread-safe progress channel from worker threads to the UI thread (no Tk)."""
+import threading
+
+# How often the UI applies the posted progress (20 Hz)
+PROGRESS_TICK_MS = 50
+
+
+class ProgressChannel:
+    """Workers post events, the UI thread drains them on a fixed tick.
+
+    update(key, *values) is for state like a label text or a progress bar
+    value: a newer update replaces the pending one with the same key, so a
+    tick applies at most one update per key however many games finished in
+    between. call(func, *args) is for things that must all happen, in order
+    (saving a finished console, error dialogs); they run after the updates,
+    so a completion call is not overwritten by an older progress text.
+    close() marks the end of the operation, the UI stops after draining the
+    remaining events.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._updates = {}
+        self._calls = []
+        self._closed = False
+        # Counters for the debug output
+        self.updates_posted = 0
+        self.updates_applied = 0
+        self.calls_posted = 0
+        self.ticks = 0
+
+    def update(self, key, *values):
+        with self._lock:
+            self._updates[key] = values
+            self.updates_posted += 1
+
+    def call(self, func, *args):
+        with self._lock:
+            self._calls.append((func, args))
+            self.calls_posted += 1
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+
+    @property
+    def closed(self):
+        with self._lock:
+            return self._closed
+
+    def drain(self):
+        """Returns and clears the pending ([(func, args), ...], {key: values})."""
+        with self._lock:
+            calls, self._calls = self._calls, []
+            updates, self._updates = self._updates, {}
+            self.updates_applied += len(updates)
+            self.ticks += 1
+        return calls, updates
+
+    def stats_text(self):
+        return (f"{self.updates_posted} progress updates posted, {self.updates_applied} applied in "
+                f"{self.ticks} ticks, {self.calls_posted} calls")
@@ -0,0 +1,47 @@
+"""Name sanitising shared by the DAT and collection exporters (no Tk).
+
+Every output format has a precomputed deletion table, so a name is cleaned
+by bytes.translate in one C-level pass. Only ASCII characters are ever kept,
+anything else is dropped while encoding.
+"""
+import string
+from functools import lru_cache
+
+# Characters kept in the rom names of a DAT file
+ROM_NAME_CHARS = string.ascii_letters + string.digits + " -_.,()[]{}!@#$%^&'~`+"
+# Characters kept when a collection file name has to be made from the game title
+TITLE_FILENAME_CHARS = string.ascii_letters + string.digits + " -_"
+
+# Exports of all consoles sanitise the same names for the DAT and both collections
+NAME_CACHE_SIZE = 4096
+
+
+def deletion_table(allowed):
+    """The bytes that bytes.translate(None, table) removes to keep only allowed."""
+    return bytes(code for code in range(256) if chr(code) not in allowed)
+
+
+_ROM_NAME_DELETE = deletion_table(ROM_NAME_CHARS)
+_TITLE_FILENAME_DELETE = deletion_table(TITLE_FILENAME_CHARS)
+_DAT_TITLE_TABLE = str.maketrans({'"': "'", '&': 'and'})
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def sanitize_dat_title(title):
+    """Game name/description of a DAT entry: double quotes become single ones, '&' becomes 'and'."""
+    return title.translate(_DAT_TITLE_TABLE)
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def sanitize_rom_name(filename):
+    """A ROM file name reduced to ROM_NAME_CHARS ('' if nothing is left)."""
+    return filename.encode('ascii', 'ignore').translate(None, _ROM_NAME_DELETE).decode('ascii')
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def title_to_filename(title):
+    """File name base made from a game title: TITLE_FILENAME_CHARS with '&' as 'and' and
+    spaces as underscores ('' if nothing is left).
+    """
+    name = title.encode('ascii', 'ignore').replace(b'&', b'and').translate(None, _TITLE_FILENAME_DELETE)
+    return name.strip().replace(b" ", b"_").decode('ascii')
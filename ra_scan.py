@@ -0,0 +1,260 @@
+"""Local ROM folder scanner: parallel RA hashing and matching against the cached RA hashes (no Tk)."""
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from ra_cache import connect_sqlite
+from ra_hash import ARCHIVE_EXTENSIONS, RomHashError, get_hasher, hash_archive, rom_hash
+from ra_index import normalize_md5
+
+
+def is_archive(path):
+    return os.path.splitext(path)[1].lower() in ARCHIVE_EXTENSIONS
+
+
+def _hash_method(console_id, path, member):
+    return get_hasher(console_id, member or path).method
+
+
+def _hash_worker(path, console_id):
+    # Runs in the worker processes, errors are returned instead of raised.
+    # Returns the path and [(archive member or None, md5, error)]
+    try:
+        if is_archive(path):
+            return path, hash_archive(path, console_id)
+        return path, [(None, rom_hash(path, console_id), None)]
+    except (OSError, RomHashError) as e:
+        return path, [(None, None, str(e))]
+
+
+def iter_rom_files(root, extensions=None):
+    """Yields (path, os.stat_result) of the files below root; extensions is an optional set like {'.nes', '.zip'}."""
+    extensions = {ext.lower() if ext.startswith('.') else '.' + ext.lower() for ext in extensions} if extensions else None
+    for dirpath, dirnames, filenames in os.walk(root):
+        # Skip hidden folders (.git, .Trash, ...)
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        for filename in sorted(filenames):
+            if filename.startswith('.'):
+                continue
+            if extensions is not None and os.path.splitext(filename)[1].lower() not in extensions:
+                continue
+            path = os.path.join(dirpath, filename)
+            try:
+                yield path, os.stat(path)
+            except OSError:
+                continue
+
+
+class RomHashCache:
+    """Sidecar index (path, archive member, size, mtime, inode, hash method) -> md5 of earlier scans,
+    kept in cache/rom_hashes.sqlite.
+
+    A file is only hashed again if one of the three stat values or its hash
+    method (see ra_hash.RomHasher) changed, so the ROM folders themselves are
+    never written to. member is '' for files that are not archives.
+    """
+
+    DB_FILENAME = "rom_hashes.sqlite"
+
+    def __init__(self, cache_dir):
+        self.db_path = os.path.join(cache_dir, self.DB_FILENAME)
+        os.makedirs(cache_dir, exist_ok=True)
+        with connect_sqlite(self.db_path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(rom_hashes)")}
+            if columns and 'member' not in columns:
+                # Databases of earlier versions have one row per file, and only plain MD5s before the method column
+                conn.execute("ALTER TABLE rom_hashes RENAME TO rom_hashes_old")
+            conn.execute("CREATE TABLE IF NOT EXISTS rom_hashes ("
+                         " path TEXT NOT NULL, member TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+                         " inode INTEGER NOT NULL, md5 TEXT NOT NULL, method TEXT NOT NULL,"
+                         " PRIMARY KEY (path, member)) WITHOUT ROWID")
+            if columns and 'member' not in columns:
+                method = 'method' if 'method' in columns else "'md5'"
+                conn.execute("INSERT INTO rom_hashes SELECT path, '', size, mtime_ns, inode, md5, "
+                             f"{method} FROM rom_hashes_old")
+                conn.execute("DROP TABLE rom_hashes_old")
+                conn.commit()
+
+    @staticmethod
+    def _folder_range(root):
+        # All paths below root sort between "root/" and "root0" ("0" follows both separators)
+        prefix = os.path.join(os.path.abspath(root), '')
+        return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+    def load_folder(self, root):
+        """{path: [(member, size, mtime_ns, inode, md5, method), ...]} of the known files below root."""
+        with connect_sqlite(self.db_path) as conn:
+            rows = conn.execute("SELECT path, member, size, mtime_ns, inode, md5, method FROM rom_hashes"
+                                " WHERE path >= ? AND path < ? ORDER BY path, member",
+                                self._folder_range(root)).fetchall()
+        known = {}
+        for path, *values in rows:
+            known.setdefault(path, []).append(tuple(values))
+        return known
+
+    def store(self, entries):
+        """Replaces the rows of the files in (path, member, size, mtime_ns, inode, md5, method) entries."""
+        with connect_sqlite(self.db_path) as conn:
+            # An archive may have lost members since its last scan
+            conn.executemany("DELETE FROM rom_hashes WHERE path = ?", {(entry[0],) for entry in entries})
+            conn.executemany("INSERT OR REPLACE INTO rom_hashes VALUES (?, ?, ?, ?, ?, ?, ?)", entries)
+            conn.commit()
+
+    def prune(self, root, existing_paths):
+        """Drops the entries below root whose file no longer exists; returns how many were removed.
+
+        existing_paths are the files the scan saw. The others are checked on disk, a scan
+        filtered by extension must not drop the hashes of the files it skipped.
+        """
+        stale = [(path,) for path in self.load_folder(root)
+                 if path not in existing_paths and not os.path.exists(path)]
+        with connect_sqlite(self.db_path) as conn:
+            conn.executemany("DELETE FROM rom_hashes WHERE path = ?", stale)
+            conn.commit()
+        return len(stale)
+
+    def clear(self):
+        with connect_sqlite(self.db_path) as conn:
+            conn.execute("DELETE FROM rom_hashes")
+            conn.commit()
+
+
+class RomScanner:
+    """Hashes the files of a ROM folder on a process pool (all cores by default).
+
+    The files are hashed with the RA method of console_id (see ra_hash); without
+    one, the method is chosen by file extension, e.g. headerless for .nes files.
+    The ROMs inside .zip/.7z archives are hashed in memory, each archive in one worker.
+
+    Results are dicts with the keys path, relative_path, member, size, md5, error and
+    cached (md5 is None and error the message if a file could not be read;
+    cached is True if the md5 came from the RomHashCache). An archive gives one
+    result per ROM inside, with its name as member (None for other files).
+    """
+
+    # Hashed entries are written to the RomHashCache in batches of this size,
+    # so a cancelled scan of a big library does not lose its progress
+    HASH_CACHE_BATCH_SIZE = 500
+
+    def __init__(self, max_workers=None, use_processes=True, hash_cache=None, console_id=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.use_processes = use_processes
+        self.hash_cache = hash_cache
+        self.console_id = console_id
+
+    def scan(self, root, extensions=None, progress_callback=None, cancel_check=None):
+        """Returns the results of all files below root, in path order.
+
+        Files whose size, mtime and inode match the hash cache are not read again;
+        entries of deleted files are pruned from it.
+        progress_callback(path, done, total) is called in the calling thread after each file;
+        if cancel_check() returns True, no new files are started and the finished ones are returned.
+        """
+        root = os.path.abspath(root)
+        files = list(iter_rom_files(root, extensions))
+        stats = dict(files)
+        results = {}
+
+        def add_results(path, hashes, cached=False):
+            results[path] = [{
+                'path': path,
+                'relative_path': os.path.relpath(path, root),
+                'member': member,
+                'size': stats[path].st_size,
+                'md5': md5,
+                'error': error,
+                'cached': cached
+            } for member, md5, error in hashes]
+            if progress_callback:
+                progress_callback(path, len(results), len(files))
+
+        pending = []
+        known = {}
+        if self.hash_cache is not None:
+            known = self.hash_cache.load_folder(root)
+            self.hash_cache.prune(root, stats)
+        for path, st in files:
+            entries = known.get(path)
+            if entries and all(entry[1:4] == (st.st_size, st.st_mtime_ns, st.st_ino)
+                               and entry[5] == _hash_method(self.console_id, path, entry[0]) for entry in entries):
+                add_results(path, [(entry[0] or None, entry[4], None) for entry in entries], cached=True)
+            else:
+                pending.append((path, st))
+        # Biggest first (popped from the end), so one huge disc image at the end does not leave the other cores idle
+        pending.sort(key=lambda item: item[1].st_size)
+
+        new_entries = []
+        executor_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+        with executor_class(max_workers=self.max_workers) as executor:
+            in_flight = set()
+            # Bounded window instead of submitting every file of a 2 TB library at once
+            window = self.max_workers * 4
+            while pending or in_flight:
+                while pending and len(in_flight) < window and not (cancel_check and cancel_check()):
+                    path, _ = pending.pop()
+                    in_flight.add(executor.submit(_hash_worker, path, self.console_id))
+                if not in_flight:
+                    break
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, hashes = future.result()
+                    add_results(path, hashes)
+                    # Archives with an unreadable member are hashed again next time
+                    if hashes and all(md5 is not None for _, md5, _ in hashes):
+                        st = stats[path]
+                        new_entries.extend((path, member or '', st.st_size, st.st_mtime_ns, st.st_ino, md5,
+                                            _hash_method(self.console_id, path, member)) for member, md5, _ in hashes)
+                if self.hash_cache is not None and len(new_entries) >= self.HASH_CACHE_BATCH_SIZE:
+                    self.hash_cache.store(new_entries)
+                    new_entries = []
+        if self.hash_cache is not None and new_entries:
+            self.hash_cache.store(new_entries)
+        return [result for path, _ in files for result in results.get(path, ())]
+
+
+class ScanReport:
+    """Scanned files split into matched / unmatched / unreadable ones.
+
+    matched is a list of (scanned_file, [match, ...]) with the HashIndex match dicts.
+    """
+
+    def __init__(self, matched, unmatched, errors):
+        self.matched = matched
+        self.unmatched = unmatched
+        self.errors = errors
+
+    @property
+    def with_achievements(self):
+        """Matched files where at least one matching game has achievements."""
+        return [(scanned, matches) for scanned, matches in self.matched
+                if any((match.get('num_achievements') or 0) > 0 for match in matches)]
+
+    def rom_files_by_game(self, console_id):
+        """{game_id: [relative_path, ...]} of the files matching games of one console."""
+        rom_files = {}
+        for scanned, matches in self.matched:
+            for match in matches:
+                if match['console_id'] != str(console_id):
+                    continue
+                paths = rom_files.setdefault(match['game_id'], [])
+                # Several ROMs of one archive can match the same game
+                if scanned['relative_path'] not in paths:
+                    paths.append(scanned['relative_path'])
+        return rom_files
+
+
+def match_scanned_files(scanned_files, hash_index, console_id=None):
+    """Matches scan results against a (synced) HashIndex, optionally only games of one console."""
+    matches_by_md5 = hash_index.lookup_many([f['md5'] for f in scanned_files if f['md5']])
+    matched, unmatched, errors = [], [], []
+    for scanned in scanned_files:
+        if scanned['md5'] is None:
+            errors.append(scanned)
+            continue
+        matches = [match for match in matches_by_md5.get(normalize_md5(scanned['md5']), [])
+                   if console_id is None or match['console_id'] == str(console_id)]
+        if matches:
+            matched.append((scanned, matches))
+        else:
+            unmatched.append(scanned)
+    return ScanReport(matched, unmatched, errors)
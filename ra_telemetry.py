@@ -0,0 +1,145 @@
+"""Structured per-request API telemetry: a rotating JSONL log and run summaries (no Tk)."""
+import json
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+TELEMETRY_FILENAME = "api_requests.jsonl"
+# api_requests.jsonl is rotated at this size, keeping TELEMETRY_BACKUP_COUNT old files (.1, .2, ...)
+TELEMETRY_MAX_BYTES = 5 * 1024 * 1024
+TELEMETRY_BACKUP_COUNT = 3
+
+# Record fields that are added up for the run summary
+_SUMMED_FIELDS = ('retries', 'rate_limited', 'bytes', 'backoff_s', 'limiter_wait_s', 'network_s', 'parse_s')
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list (0.0 for an empty one)."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+class RequestTelemetry:
+    """Collects one record per API call and appends it as a JSON line to log_dir/api_requests.jsonl.
+
+    A record has the keys time, endpoint, outcome ('ok', 'error' or 'cancelled'), error
+    (translation key), status (HTTP status of the last attempt), retries, rate_limited
+    (429 answers), limiter_wait_s, backoff_s (429/timeout pauses), network_s (connect + wait + transfer
+    of all attempts), parse_s (JSON decoding), total_s, bytes and cache_hit.
+    Only running totals and the latencies of the current run (since start_run)
+    are kept in memory for summary(). Without log_dir nothing is written to disk.
+    """
+
+    def __init__(self, log_dir=None, max_bytes=TELEMETRY_MAX_BYTES, backup_count=TELEMETRY_BACKUP_COUNT):
+        self.log_path = os.path.join(log_dir, TELEMETRY_FILENAME) if log_dir else None
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+        self._logger = None
+        self.start_run()
+
+    def _get_logger(self):
+        # Created on the first record, so a run without API calls leaves no log folder behind
+        if self._logger is None and self.log_path:
+            try:
+                os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                handler = RotatingFileHandler(self.log_path, maxBytes=self.max_bytes,
+                                              backupCount=self.backup_count, encoding='utf-8')
+            except OSError as e:
+                print(f"Warning: Could not open the API telemetry log '{self.log_path}': {e}")
+                self.log_path = None
+                return None
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger = logging.getLogger(f"{__name__}.{id(self)}")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    def start_run(self):
+        """Starts a new run for summary() (e.g. when a fetch begins)."""
+        with self._lock:
+            self._totals = dict.fromkeys(_SUMMED_FIELDS, 0)
+            self._errors = 0
+            self._cache_hits = 0
+            self._requests = 0
+            self._latencies = []
+            self._run_started = time.monotonic()
+
+    def record(self, **fields):
+        """Adds the record of one API call (thread-safe)."""
+        fields = dict(time=datetime.now().isoformat(timespec='milliseconds'), **fields)
+        with self._lock:
+            for key in _SUMMED_FIELDS:
+                self._totals[key] += fields.get(key, 0)
+            self._errors += fields.get('outcome') == 'error'
+            self._cache_hits += bool(fields.get('cache_hit'))
+            self._requests += 1
+            if fields.get('status') is not None:
+                # Answers from the response cache without a request would pull the percentiles to 0
+                self._latencies.append(fields.get('network_s', 0.0))
+            logger = self._get_logger()
+        if logger is not None:
+            logger.info(json.dumps(fields, ensure_ascii=False))
+
+    def summary(self):
+        """Totals of the current run: requests, errors, retries, rate_limited, cache_hits, bytes,
+        duration_s, requests_per_second, p50_ms/p95_ms/max_ms (network latency of a call),
+        backoff_s, limiter_wait_s, network_s and parse_s.
+        """
+        with self._lock:
+            totals = dict(self._totals)
+            errors = self._errors
+            cache_hits = self._cache_hits
+            requests = self._requests
+            latencies = sorted(self._latencies)
+            duration_s = time.monotonic() - self._run_started
+        return {
+            'requests': requests,
+            'errors': errors,
+            'retries': totals['retries'],
+            'rate_limited': totals['rate_limited'],
+            'cache_hits': cache_hits,
+            'bytes': totals['bytes'],
+            'duration_s': round(duration_s, 3),
+            'requests_per_second': round(requests / duration_s, 3) if duration_s > 0 else 0.0,
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+            'max_ms': round(latencies[-1] * 1000, 1) if latencies else 0.0,
+            'backoff_s': round(totals['backoff_s'], 3),
+            'limiter_wait_s': round(totals['limiter_wait_s'], 3),
+            'network_s': round(totals['network_s'], 3),
+            'parse_s': round(totals['parse_s'], 3),
+        }
+
+    def write_summary(self, **context):
+        """Appends the run summary (plus context such as the consoles) to the log and returns it."""
+        summary = self.summary()
+        logger = self._get_logger() if summary['requests'] else None
+        if logger is not None:
+            logger.info(json.dumps(dict(time=datetime.now().isoformat(timespec='milliseconds'),
+                                        type='run_summary', **context, **summary), ensure_ascii=False))
+        return summary
+
+    def close(self):
+        if self._logger is not None:
+            for handler in list(self._logger.handlers):
+                handler.close()
+                self._logger.removeHandler(handler)
+            self._logger = None
+
+
+def format_summary(summary, translate):
+    """Two-line text of a summary() for dialogs and the CLI."""
+    return "\n".join([
+        translate("api_timing_summary", summary['requests'], summary['duration_s'], summary['requests_per_second'],
+                  summary['errors'], summary['retries'], summary['rate_limited'], summary['cache_hits']),
+        translate("api_timing_latency", summary['p50_ms'], summary['p95_ms'], summary['backoff_s'],
+                  summary['limiter_wait_s'], summary['bytes'] / (1024 * 1024)),
+    ])
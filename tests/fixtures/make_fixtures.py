@@ -0,0 +1,144 @@
+"""Rebuilds the small ROM and disc image fixtures of test_ra_hash.py.
+
+python tests/fixtures/make_fixtures.py writes the files next to this script
+and prints the digest every fixture must hash to. The digests are worked out
+here from the rcheevos rules (which bytes count), not with ra_hash, so the
+tests compare ra_hash against an independent result.
+"""
+import hashlib
+import os
+import struct
+
+FIXTURE_DIR = os.path.dirname(os.path.abspath(__file__))
+SECTOR_SIZE = 2048
+CD_SYNC = b'\x00' + b'\xff' * 10 + b'\x00'
+
+
+def payload(label, size):
+    """size reproducible pseudo-random bytes (sha256 blocks, the same with every Python version)."""
+    data = b''.join(hashlib.sha256(f"{label}:{block}".encode('ascii')).digest() for block in range(size // 32 + 1))
+    return data[:size]
+
+
+def md5(*parts):
+    digest = hashlib.md5()
+    for part in parts:
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def cartridges():
+    """{file name: (content, expected digest)} of the header and byte order rules."""
+    rom = payload('cart', 4096)
+    z64 = b'\x80\x37\x12\x40' + payload('n64', 4092)
+    v64 = bytearray(z64)
+    v64[0::2], v64[1::2] = z64[1::2], z64[0::2]
+    n64 = b''.join(z64[i:i + 4][::-1] for i in range(0, len(z64), 4))
+    snes = payload('snes', 8192)
+    return {
+        'game.nes': (b'NES\x1a' + bytes([1, 0, 0, 0]) + bytes(8) + rom, md5(rom)),
+        'headerless.nes': (rom, md5(rom)),
+        'game.lnx': (b'LYNX\x00' + bytes(59) + rom, md5(rom)),
+        'game.a78': (b'\x01ATARI7800' + bytes(118) + rom, md5(rom)),
+        'game.smc': (bytes(512) + snes, md5(snes)),
+        'game.sfc': (snes, md5(snes)),
+        'game.z64': (z64, md5(z64)),
+        'game.v64': (bytes(v64), md5(z64)),
+        'game.n64': (n64, md5(z64)),
+    }
+
+
+def nintendo_ds():
+    """A DS ROM whose ARM9, ARM7 and icon are not in header order, with filler around them."""
+    arm9, arm7 = payload('arm9', 0x600), payload('arm7', 0x300)
+    icon = payload('icon', 0xa00)
+    header = bytearray(payload('nds-header', 0x200))
+    layout = {0x20: 0x1100, 0x2c: len(arm9), 0x30: 0x280, 0x3c: len(arm7), 0x68: 0x600}
+    for field, value in layout.items():
+        struct.pack_into('<I', header, field, value)
+    rom = bytearray(payload('nds-filler', 0x1800))
+    rom[:0x200] = header
+    rom[0x280:0x580] = arm7
+    rom[0x600:0x1000] = icon
+    rom[0x1100:0x1700] = arm9
+    return {'game.nds': (bytes(rom), md5(bytes(header[:0x160]), arm9, arm7, icon))}
+
+
+def _directory_record(name, sector, size, directory=False):
+    name = name.encode('ascii')
+    record = bytearray(33 + len(name) + (len(name) + 1) % 2)
+    record[0] = len(record)
+    struct.pack_into('<I', record, 2, sector)
+    struct.pack_into('>I', record, 6, sector)
+    struct.pack_into('<I', record, 10, size)
+    struct.pack_into('>I', record, 14, size)
+    record[25] = 2 if directory else 0
+    record[32] = len(name)
+    record[33:33 + len(name)] = name
+    return bytes(record)
+
+
+def playstation():
+    """An ISO 9660 image whose SYSTEM.CNF boots SLUS_012.34 from a sub folder.
+
+    The hash starts with the boot path as SYSTEM.CNF names it, folder included.
+    A decoy PSX.EXE sits in the root, it must not be hashed while SYSTEM.CNF names another executable.
+    """
+    code = payload('psx-exe', 1500)
+    executable = bytearray(b'PS-X EXE' + bytes(SECTOR_SIZE - 8))
+    struct.pack_into('<I', executable, 28, len(code))
+    # The padding after the code is part of the file but not of the hash
+    executable = bytes(executable) + code + bytes(500)
+    system_cnf = b'BOOT = cdrom:\\GAME\\SLUS_012.34;1\r\nTCB = 4\r\nEVENT = 10\r\n'
+    decoy = b'PS-X EXE' + payload('decoy', 100)
+
+    sectors = {}
+    root = (_directory_record('\x00', 17, SECTOR_SIZE, True) + _directory_record('\x01', 17, SECTOR_SIZE, True)
+            + _directory_record('GAME', 18, SECTOR_SIZE, True) + _directory_record('PSX.EXE;1', 20, len(decoy))
+            + _directory_record('SYSTEM.CNF;1', 19, len(system_cnf)))
+    game = (_directory_record('\x00', 18, SECTOR_SIZE, True) + _directory_record('\x01', 17, SECTOR_SIZE, True)
+            + _directory_record('SLUS_012.34;1', 21, len(executable)))
+    volume_descriptor = bytearray(SECTOR_SIZE)
+    volume_descriptor[0:6] = b'\x01CD001'
+    volume_descriptor[156:190] = _directory_record('\x00', 17, SECTOR_SIZE, True)
+    sectors[16] = bytes(volume_descriptor)
+    sectors[17], sectors[18], sectors[19], sectors[20] = root, game, system_cnf, decoy
+    for index in range(0, len(executable), SECTOR_SIZE):
+        sectors[21 + index // SECTOR_SIZE] = executable[index:index + SECTOR_SIZE]
+    image = b''.join(sectors.get(sector, b'').ljust(SECTOR_SIZE, b'\x00') for sector in range(max(sectors) + 1))
+    return {'psx.iso': (image, md5(b'GAME\\SLUS_012.34', executable[:SECTOR_SIZE + len(code)]))}
+
+
+def pc_engine_cd():
+    """A PC Engine CD data track as .iso and as a raw MODE1/2352 .bin behind a .cue.
+
+    The boot sector (sector 1) points to a two sector boot program at sector 2.
+    """
+    boot_sector = bytearray(SECTOR_SIZE)
+    boot_sector[0:3] = (2).to_bytes(3, 'big')
+    boot_sector[3] = 2
+    boot_sector[32:55] = b'PC Engine CD-ROM SYSTEM'
+    boot_sector[106:128] = b'RADATOOL TEST DISC    '
+    program = payload('pce-boot', 2 * SECTOR_SIZE)
+    image = bytes(SECTOR_SIZE) + bytes(boot_sector) + program + payload('pce-data', SECTOR_SIZE)
+    raw = b''.join(CD_SYNC + bytes(3) + b'\x01' + image[index:index + SECTOR_SIZE] + bytes(288)
+                   for index in range(0, len(image), SECTOR_SIZE))
+    cue = b'FILE "pcecd.bin" BINARY\r\n  TRACK 01 MODE1/2352\r\n    INDEX 01 00:00:00\r\n'
+    expected = md5(bytes(boot_sector[106:128]), program)
+    return {'pcecd.iso': (image, expected), 'pcecd.bin': (raw, None), 'pcecd.cue': (cue, expected)}
+
+
+def fixtures():
+    """{file name: (content, expected digest or None for a file only used through another one)}."""
+    result = {}
+    for group in (cartridges, nintendo_ds, playstation, pc_engine_cd):
+        result.update(group())
+    return result
+
+
+if __name__ == '__main__':
+    for name, (content, expected) in sorted(fixtures().items()):
+        with open(os.path.join(FIXTURE_DIR, name), 'wb') as f:
+            f.write(content)
+        if expected is not None:
+            print(f"    '{name}': '{expected}',")
@@ -0,0 +1,112 @@
+"""Known-digest tests of the RetroAchievements hash rules in ra_hash.py.
+
+The fixtures in tests/fixtures are built by tests/fixtures/make_fixtures.py,
+which also prints the digests below. Run with python -m unittest discover tests
+(or pytest) from the repository folder.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ra_hash # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# The digest every fixture must hash to, worked out by make_fixtures.py from the rules
+EXPECTED_DIGESTS = {
+    'game.a78': '725480b81b2e204a7f76a77f0d860926',
+    'game.lnx': '725480b81b2e204a7f76a77f0d860926',
+    'game.n64': '824f538e45b7162a4d57b1590e4a5d69',
+    'game.nds': 'e8e36c23619ef67ce588c8bfab570f1e',
+    'game.nes': '725480b81b2e204a7f76a77f0d860926',
+    'game.sfc': '368b4b374359750883cf24580b069dcf',
+    'game.smc': '368b4b374359750883cf24580b069dcf',
+    'game.v64': '824f538e45b7162a4d57b1590e4a5d69',
+    'game.z64': '824f538e45b7162a4d57b1590e4a5d69',
+    'headerless.nes': '725480b81b2e204a7f76a77f0d860926',
+    'pcecd.cue': '61f04ba7bdd50c79f1e0226a6547057b',
+    'pcecd.iso': '61f04ba7bdd50c79f1e0226a6547057b',
+    'psx.iso': '7d50173528061e97141a56092e9156d1',
+}
+
+
+def fixture(name):
+    return os.path.join(FIXTURE_DIR, name)
+
+
+class CartridgeHashTest(unittest.TestCase):
+
+    def test_headers_are_skipped(self):
+        # The console comes from the extension, like a scan without --console
+        for name in ('game.nes', 'headerless.nes', 'game.lnx', 'game.a78', 'game.smc', 'game.sfc'):
+            with self.subTest(name=name):
+                self.assertEqual(ra_hash.rom_hash(fixture(name)), EXPECTED_DIGESTS[name])
+
+    def test_console_id_picks_the_rule(self):
+        self.assertEqual(ra_hash.rom_hash(fixture('game.nes'), ra_hash.CONSOLE_NES), EXPECTED_DIGESTS['game.nes'])
+        self.assertEqual(ra_hash.rom_hash(fixture('game.smc'), int(ra_hash.CONSOLE_SNES)), EXPECTED_DIGESTS['game.smc'])
+        # Without a rule the whole file counts, header included
+        self.assertNotEqual(ra_hash.rom_hash(fixture('game.nes'), '4'), EXPECTED_DIGESTS['game.nes'])
+        self.assertEqual(ra_hash.rom_hash(fixture('game.nes'), '4'), ra_hash.md5_of_file(fixture('game.nes')))
+
+    def test_n64_byte_orders(self):
+        for name in ('game.z64', 'game.v64', 'game.n64'):
+            with self.subTest(name=name):
+                self.assertEqual(ra_hash.rom_hash(fixture(name)), EXPECTED_DIGESTS['game.z64'])
+
+    def test_n64_rejects_unknown_byte_order(self):
+        with self.assertRaises(ra_hash.RomHashError):
+            ra_hash.rom_hash(fixture('game.nes'), ra_hash.CONSOLE_N64)
+
+    def test_nintendo_ds_header_code_and_icon(self):
+        self.assertEqual(ra_hash.rom_hash(fixture('game.nds')), EXPECTED_DIGESTS['game.nds'])
+        self.assertEqual(ra_hash.rom_hash(fixture('game.nds'), ra_hash.CONSOLE_NINTENDO_DSI), EXPECTED_DIGESTS['game.nds'])
+
+    def test_zip_members_hash_like_files(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        archive = os.path.join(temp_dir, 'roms.zip')
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('readme.txt', 'not a rom')
+            zf.write(fixture('game.v64'), 'game.v64')
+        self.assertEqual(ra_hash.hash_archive(archive), [('game.v64', EXPECTED_DIGESTS['game.z64'], None)])
+
+
+class DiscHashTest(unittest.TestCase):
+
+    def test_playstation_boots_the_system_cnf_executable(self):
+        self.assertEqual(ra_hash.rom_hash(fixture('psx.iso'), ra_hash.CONSOLE_PLAYSTATION), EXPECTED_DIGESTS['psx.iso'])
+
+    def test_find_playstation_executable(self):
+        cases = {
+            b'BOOT = cdrom:\\SLUS_012.34;1\r\nTCB = 4\r\n': 'SLUS_012.34',
+            b'BOOT=cdrom:\\\\GAME\\SCES_000.01;1 \n': 'GAME\\SCES_000.01',
+            b'TCB = 4\nBOOT = cdrom:SLPS_000.02;1 arg\n': 'SLPS_000.02',
+            b'TCB = 4\nEVENT = 10\n': None,
+        }
+        for system_cnf, expected in cases.items():
+            with self.subTest(system_cnf=system_cnf):
+                self.assertEqual(ra_hash.find_playstation_executable(system_cnf), expected)
+
+    def test_pc_engine_cd_boot_sector(self):
+        for name in ('pcecd.iso', 'pcecd.cue'):
+            with self.subTest(name=name):
+                self.assertEqual(ra_hash.rom_hash(fixture(name), ra_hash.CONSOLE_PC_ENGINE_CD), EXPECTED_DIGESTS[name])
+        # A PC Engine disc scanned as HuCard console is still hashed as CD
+        self.assertEqual(ra_hash.rom_hash(fixture('pcecd.cue'), ra_hash.CONSOLE_PC_ENGINE), EXPECTED_DIGESTS['pcecd.cue'])
+        self.assertTrue(ra_hash.is_disc_image(ra_hash.RomSource.from_path(fixture('pcecd.bin'))))
+
+    def test_wrong_disc_type_is_an_error(self):
+        with self.assertRaises(ra_hash.RomHashError):
+            ra_hash.rom_hash(fixture('pcecd.iso'), ra_hash.CONSOLE_PLAYSTATION)
+        with self.assertRaises(ra_hash.RomHashError):
+            ra_hash.rom_hash(fixture('psx.iso'), ra_hash.CONSOLE_PC_ENGINE_CD)
+
+
+if __name__ == '__main__':
+    unittest.main()